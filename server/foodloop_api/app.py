@@ -1,21 +1,45 @@
 from fastapi import FastAPI, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from PIL import Image
 import numpy as np
 import google.generativeai as genai
-import io
 import os
+import asyncio
 from dotenv import load_dotenv
 import time
 from typing import List, Dict, Any, Optional
 import json
+import re
+from contextlib import asynccontextmanager
+from image_features import extract_features_array
+from jobs import DEFAULT_DB_PATH as DEFAULT_JOB_DB, CallbackURLError, JobQueue, JobQueueFullError, check_callback_url
+from ingest import InvalidImageError, LLMPayloadTooLargeError, UploadTooLargeError, decode_image, read_upload
+from llm_gateway import LLMGateway, QueueFullError, LLMTimeoutError
+from llm_router import LLMRouter, NoProviderAvailableError, NoProvidersConfiguredError
+from reference_cache import ReferenceCache
+from reference_pack import DEFAULT_PACK_PATH, ReferencePack, parse_reference_json, reference_prompt
+from result_cache import ResultCache, content_key, perceptual_hash
+from metrics import instrument, metrics_response, stage, track_cache
+from payload import assessment_prompt, llm_image, log_payload
+from workers import cpu_pool
 
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    JOB_QUEUE.start()
+    yield
+    # Unfinished jobs go back to the queue and resume on the next start
+    await JOB_QUEUE.stop()
+    # Process pools outlive the server otherwise
+    cpu_pool.shutdown()
+
 # Initialize FastAPI
 app = FastAPI(title="Food Quality Assessment API", 
               description="An API for assessing food quality using computer vision and Gemini AI",
-              version="1.0.0")
+              version="1.0.0",
+              lifespan=lifespan)
 
 # CORS Middleware
 app.add_middleware(
@@ -26,12 +50,91 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure Gemini
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-gemini_model = genai.GenerativeModel("gemini-2.5-pro-preview-03-25")
+# Request latency and in-flight gauge for /metrics (PROFILE_SAMPLE_RATE enables the slow-request profiler)
+instrument(app)
+
+# Gemini models to route between (fastest healthy first, see llm_router.py), each behind its own gateway
+GEMINI_MODELS = [m.strip() for m in os.getenv("GEMINI_MODELS", "gemini-2.5-pro-preview-03-25").split(",") if m.strip()]
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "60"))
+
+# Configure Gemini (set FAKE_GEMINI_LATENCY to run against the local stand-in)
+if os.getenv("FAKE_GEMINI_LATENCY"):
+    from fake_gemini import FakeGeminiModel
+    gemini_models = {model: FakeGeminiModel(latency=float(os.getenv("FAKE_GEMINI_LATENCY"))) for model in GEMINI_MODELS}
+    gemini_request_options = {}
+else:
+    from google.api_core.retry import Retry
+    # GEMINI_API_ENDPOINT points the SDK at another host over REST, e.g. fake_providers.py
+    if os.getenv("GEMINI_API_ENDPOINT"):
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"), transport="rest",
+                        client_options={"api_endpoint": os.getenv("GEMINI_API_ENDPOINT")})
+    else:
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    gemini_models = {model: genai.GenerativeModel(model) for model in GEMINI_MODELS}
+    # Without a retry deadline the SDK keeps retrying 5xx answers for minutes, holding a gateway slot
+    gemini_request_options = {"retry": Retry(timeout=GEMINI_TIMEOUT)}
+
+# All Gemini calls go through a gateway: off the event loop, bounded and timed out
+gemini_gateways = {
+    model: LLMGateway(
+        gemini_model,
+        max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "4")),
+        max_queue=int(os.getenv("GEMINI_MAX_QUEUE", "16")),
+        timeout=GEMINI_TIMEOUT,
+        name=model,
+        request_options=gemini_request_options,
+    )
+    for model, gemini_model in gemini_models.items()
+}
+
+def gateway_provider(gateway: LLMGateway):
+    async def call(request):
+        contents, options = request
+        return await gateway.generate_content(contents, **options)
+    return call
+
+# Reference data and assessments each get a router (ROUTER_REFERENCE_* / ROUTER_ASSESS_*) that
+# hedges slow calls onto the next model and stops calling a failing one for a while
+GEMINI_PROVIDERS = {model: gateway_provider(gateway) for model, gateway in gemini_gateways.items()}
+reference_router = LLMRouter.from_env("reference", GEMINI_PROVIDERS, ",".join(GEMINI_MODELS),
+                                      default_timeout=GEMINI_TIMEOUT)
+assessment_router = LLMRouter.from_env("assess", GEMINI_PROVIDERS, ",".join(GEMINI_MODELS),
+                                       default_timeout=GEMINI_TIMEOUT)
+
+# Cache for storing food reference data (bounded, TTL'd, optionally on disk and shared by workers)
+FOOD_REFERENCE_CACHE = ReferenceCache(
+    max_entries=int(os.getenv("REFERENCE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("REFERENCE_CACHE_TTL", str(7 * 24 * 3600))),
+    negative_ttl=float(os.getenv("REFERENCE_CACHE_NEGATIVE_TTL", "300")),
+    db_path=os.getenv("REFERENCE_CACHE_DB") or None,
+)
+
+# Reference data built offline for every known food (build_reference_pack.py), checked before Gemini
+REFERENCE_PACK = ReferencePack.load(os.getenv("REFERENCE_PACK_PATH", DEFAULT_PACK_PATH))
+
+# Cache of finished assessments keyed on image content, so re-uploads skip Gemini
+ASSESSMENT_CACHE = ResultCache(
+    max_entries=int(os.getenv("RESULT_CACHE_SIZE", "2048")),
+    perceptual=os.getenv("RESULT_CACHE_PERCEPTUAL", "false").lower() == "true",
+    max_distance=int(os.getenv("RESULT_CACHE_MAX_DISTANCE", "6")),
+    max_ttl=float(os.getenv("RESULT_CACHE_MAX_TTL", str(12 * 3600))),
+    shelf_life_fraction=float(os.getenv("RESULT_CACHE_SHELF_LIFE_FRACTION", "0.05")),
+)
+track_cache("reference", FOOD_REFERENCE_CACHE)
+track_cache("reference_pack", REFERENCE_PACK)
+track_cache("assessment", ASSESSMENT_CACHE)
 
-# Cache for storing food reference data
-FOOD_REFERENCE_CACHE = {}
+# Largest number of images accepted by /predict/batch
+MAX_BATCH_IMAGES = int(os.getenv("MAX_BATCH_IMAGES", "16"))
+
+# Used when Gemini cannot provide reference data
+DEFAULT_REFERENCE_DATA = {
+    "hsv_range": {"h": [0, 360], "s": [0, 100], "v": [0, 100]},
+    "brightness_range": [0, 255],
+    "vibrancy_range": [0, 100],
+    "spoilage_indicators": ["unusual color", "mold", "discoloration"],
+    "shelf_life": 7
+}
 
 # Utility functions
 def calculate_avg_hsv(image: Image.Image):
@@ -76,116 +179,69 @@ def detect_mold_patterns(image: Image.Image):
         ([100, 100, 100], [180, 180, 180])  # Gray range
     ]
     
-    # Calculate percentage of pixels that might be mold
+    # Calculate percentage of pixels that might be mold (each pixel counted once)
     total_pixels = arr.shape[0] * arr.shape[1]
-    mold_pixels = 0
+    mold_mask = np.zeros(arr.shape[:2], dtype=bool)
     
     for lower, upper in mold_colors:
-        mask = np.all((arr >= lower) & (arr <= upper), axis=2)
-        mold_pixels += np.sum(mask)
+        mold_mask |= np.all((arr >= lower) & (arr <= upper), axis=2)
+    mold_pixels = np.sum(mold_mask)
     
     mold_percentage = round((mold_pixels / total_pixels) * 100, 2)
     return mold_percentage
 
-def get_reference_data(food_name: str) -> Dict[str, Any]:
-    """Get reference data for a specific food item from cache or generate it"""
-    if food_name in FOOD_REFERENCE_CACHE:
-        return FOOD_REFERENCE_CACHE[food_name]
-    
-    # Generate reference data using Gemini
-    prompt = f"""
-    I need reference data for a food quality assessment system for "{food_name}".
-    Please provide the following information in JSON format:
-    
-    1. Expected HSV ranges (hue, saturation, value) for fresh {food_name}
-    2. Expected brightness range
-    3. Expected vibrancy range
-    4. Common visual indicators of spoilage or staleness
-    5. Typical shelf life in days
-    
-    Format the response as valid JSON only, no explanations.
-    """
-    
-    try:
-        response = gemini_model.generate_content(prompt)
-        reference_data = json.loads(response.text)
-        FOOD_REFERENCE_CACHE[food_name] = reference_data
-        return reference_data
-    except Exception as e:
-        # Fallback with default values if Gemini fails
-        return {
-            "hsv_range": {"h": [0, 360], "s": [0, 100], "v": [0, 100]},
-            "brightness_range": [0, 255],
-            "vibrancy_range": [0, 100],
-            "spoilage_indicators": ["unusual color", "mold", "discoloration"],
-            "shelf_life": 7
-        }
+async def generate_reference_data(food_name: str) -> Dict[str, Any]:
+    """Generate reference data for a food item using Gemini"""
+    outcome = await reference_router.call((reference_prompt(food_name), {}))
+    return parse_reference_json(outcome["result"].text)
+
+async def get_reference_data(food_name: str) -> Dict[str, Any]:
+    """Get reference data for a specific food item from the pack, the cache or Gemini"""
+    packed = REFERENCE_PACK.get(food_name)
+    if packed is not None:
+        return packed
+    # Concurrent misses share one Gemini call; failures fall back to (briefly cached) defaults
+    return await FOOD_REFERENCE_CACHE.get_or_load(
+        food_name, generate_reference_data, DEFAULT_REFERENCE_DATA, passthrough=(QueueFullError,)
+    )
 
-def analyze_with_gemini(image_bytes, name: str, visual_features: Dict):
+async def analyze_with_gemini(image_bytes: bytes, name: str, visual_features: Dict):
     """Analyze food quality with Gemini, using system instruction prompt engineering"""
     
     # First, get reference data for this food type
-    ref_data = get_reference_data(name)
-    
-    # Create a comprehensive prompt with clear instructions and constraints
-    prompt = f"""
-    # Food Quality Assessment System
-    
-    You are FoodQualityGPT, a specialized AI food safety inspector with expertise in visual food quality assessment.
-    Your task is to analyze food images to determine if they appear fresh and safe to eat.
-    
-    ## Assessment Framework
-    1. OBJECTIVE ANALYSIS: First analyze the quantitative visual measurements against reference values
-    2. VISUAL INSPECTION: Then analyze the actual image for signs of spoilage or quality issues
-    3. CONFIDENCE SCORING: Assign a confidence score to your assessment
-    
-    ## Food Item: {name}
+    with stage("reference_data"):
+        ref_data = await get_reference_data(name)
     
-    ## Visual Measurements:
-    - HSV: {visual_features['avg_hsv']}
-    - Brightness: {visual_features['brightness']}
-    - Vibrancy: {visual_features['vibrancy']}
-    - Mold Indicator: {visual_features['mold_percentage']}%
+    # Compact, token-budgeted prompt; the reply format parsed below is unchanged
+    prompt = assessment_prompt(name, visual_features, ref_data)
+    log_payload("assessment", prompt, image_bytes)
     
-    ## Reference Values for {name}:
-    {json.dumps(ref_data, indent=2)}
-    
-    ## Critical Rules:
-    - If you detect ANY signs of mold, spoilage, or food safety risks, you MUST classify as "BAD"
-    - Default to safety when uncertain - if confidence is below 70%, classify as "BAD"
-    - Do NOT be swayed by aesthetic qualities - focus ONLY on food safety and freshness
-    
-    ## Output Format Requirements:
-    You MUST return a valid JSON object with these fields:
-    - assessment: Either "GOOD" or "BAD"
-    - confidence: Number between 0-100
-    - reasoning: Brief explanation (max 100 words)
-    - recommendations: Brief safety advice
-    
-    Determine if this {name} appears fresh and safe to eat based on visual analysis.
-    Return ONLY valid JSON with no additional text or explanation outside the JSON structure.
-    """
-    
-    # Convert image bytes to the format the Gemini API expects
+    # Budget-sized JPEG (see payload.py), in the format the Gemini API expects
     image_part = {"mime_type": "image/jpeg", "data": image_bytes}
     
     # Make API call with the image and text prompt
-    response = gemini_model.generate_content(
-        contents=[prompt, image_part],
-        generation_config={
-            "temperature": 0.2,  # Lower temperature for more consistent outputs
-            "top_p": 0.95,
-            "top_k": 40,
-        }
-    )
+    with stage("llm_assessment"):
+        outcome = await assessment_router.call((
+            [prompt, image_part],
+            {"generation_config": {
+                "temperature": 0.2,  # Lower temperature for more consistent outputs
+                "top_p": 0.95,
+                "top_k": 40,
+            }},
+        ))
+    response = outcome["result"]
     
     try:
         # Parse JSON response
-        result = json.loads(response.text)
+        with stage("json_parse"):
+            result = json.loads(response.text)
         return result
     except json.JSONDecodeError:
-        # If not valid JSON, try to extract JSON from the text
-        text = response.text
+        return repair_json_response(response.text)
+
+def repair_json_response(text: str) -> Dict[str, Any]:
+    """Best-effort JSON from a reply wrapped in prose or code fences"""
+    with stage("json_repair"):
         try:
             # Look for JSON pattern
             start_idx = text.find('{')
@@ -196,13 +252,106 @@ def analyze_with_gemini(image_bytes, name: str, visual_features: Dict):
         except:
             pass
             
-        # Fallback if JSON parsing fails
-        return {
-            "assessment": "BAD",
-            "confidence": 0,
-            "reasoning": "Error in analysis. Unable to determine food quality.",
-            "recommendations": "Please retry with a clearer image or consult a human expert."
-        }
+    # Fallback if JSON parsing fails
+    return {
+        "assessment": "BAD",
+        "confidence": 0,
+        "reasoning": "Error in analysis. Unable to determine food quality.",
+        "recommendations": "Please retry with a clearer image or consult a human expert."
+    }
+
+def shelf_life_days(ref_data: Dict[str, Any]) -> Optional[float]:
+    """Best-effort shelf life in days from Gemini's free-form reference data"""
+    for key, value in ref_data.items():
+        if "shelf_life" in key:
+            match = re.search(r"\d+(\.\d+)?", json.dumps(value))
+            return float(match.group()) if match else None
+    return None
+
+def busy_response(error: Exception):
+    """503 with a Retry-After hint when a queue is full or every model is unavailable"""
+    return JSONResponse(status_code=503, content={"error": str(error)}, headers={"Retry-After": "5"})
+
+# Status each failure would get from /predict, reported per item by /predict/batch
+ERROR_STATUS = (
+    ((UploadTooLargeError, LLMPayloadTooLargeError), 413),
+    (InvalidImageError, 400),
+    ((QueueFullError, NoProviderAvailableError, NoProvidersConfiguredError), 503),
+    (LLMTimeoutError, 504),
+)
+
+def error_status(error: BaseException) -> int:
+    return next((status for kinds, status in ERROR_STATUS if isinstance(error, kinds)), 500)
+
+async def assess_image(contents: bytes, name: str) -> Dict[str, Any]:
+    """Full assessment of one uploaded image: cache lookup, features, Gemini"""
+    cache_key = content_key(contents, name)
+
+    # Same bytes (or, in perceptual mode, a near-identical photo) were assessed recently.
+    # Exact-match hits return before the image is even decoded.
+    upload = None
+    phash = None
+    if ASSESSMENT_CACHE.perceptual:
+        with stage("decode"):
+            upload = await asyncio.to_thread(decode_image, contents)
+        phash = await asyncio.to_thread(perceptual_hash, upload.image)
+    with stage("cache_lookup"):
+        cached = ASSESSMENT_CACHE.get(cache_key, name, phash)
+    if cached is not None:
+        return {**cached, "cached": True}
+
+    # One reduced-resolution decode feeds both the features and the LLM payload
+    if upload is None:
+        with stage("decode"):
+            upload = await asyncio.to_thread(decode_image, contents)
+    with stage("features"):
+        visual_features = await cpu_pool.run(extract_features_array, upload.array())
+    with stage("llm_payload"):
+        image_bytes = await asyncio.to_thread(llm_image, upload)
+    
+    # Analyze with Gemini
+    result = await analyze_with_gemini(image_bytes, name, visual_features)
+    
+    # Return complete assessment
+    assessment = {
+        "food_name": name,
+        "assessment": result.get("assessment", "UNKNOWN"),
+        "confidence": result.get("confidence", 0),
+        "reasoning": result.get("reasoning", "Not provided"),
+        "recommendations": result.get("recommendations", "Not provided"),
+        "visual_features": visual_features
+    }
+
+    # Only cache real verdicts, never the parse-failure fallback
+    if assessment["assessment"] in ("GOOD", "BAD") and assessment["confidence"]:
+        ref_data = await get_reference_data(name)
+        ttl = ASSESSMENT_CACHE.ttl_for(shelf_life_days(ref_data), assessment["assessment"])
+        ASSESSMENT_CACHE.put(cache_key, name, assessment, ttl, phash)
+
+    return assessment
+
+async def run_assessment_job(payload: Dict[str, Any], contents: bytes) -> Dict[str, Any]:
+    return await assess_image(contents, payload["name"])
+
+# Job mode: POST /jobs answers at once, a fixed pool of workers runs the assessments.
+# SQLite (JOB_DB, data/jobs.db by default, created on startup) keeps queued jobs across restarts
+# and lets every uvicorn worker share the queue.
+JOB_QUEUE = JobQueue(
+    run_assessment_job,
+    db_path=os.getenv("JOB_DB", DEFAULT_JOB_DB),
+    workers=int(os.getenv("JOB_WORKERS", "4")),
+    max_depth=int(os.getenv("JOB_QUEUE_DEPTH", "500")),
+    max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "4")),
+    backoff=float(os.getenv("JOB_RETRY_BACKOFF", "2")),
+    max_backoff=float(os.getenv("JOB_RETRY_MAX_BACKOFF", "60")),
+    lease=float(os.getenv("JOB_LEASE", "300")),
+    result_ttl=float(os.getenv("JOB_RESULT_TTL", str(24 * 3600))),
+    callback_timeout=float(os.getenv("JOB_CALLBACK_TIMEOUT", "10")),
+    # Callbacks go to public addresses only, plus these trusted hosts (".example.com" covers subdomains)
+    callback_hosts=os.getenv("JOB_CALLBACK_HOSTS", "").split(","),
+    # Provider trouble is worth another try later; bad images and the like are not
+    retry_on=(QueueFullError, LLMTimeoutError, NoProviderAvailableError),
+)
 
 # API routes
 @app.post("/predict")
@@ -210,51 +359,118 @@ async def predict_with_gemini(file: UploadFile = File(...), name: str = Form(...
     """Predict food quality from image"""
     try:
         # Read and process image
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
-        
-        # Calculate visual features
-        avg_hsv = calculate_avg_hsv(image)
-        brightness = calculate_brightness(image)
-        vibrancy = calculate_vibrancy(image)
-        mold_percentage = detect_mold_patterns(image)
-        
-        # Prepare features dictionary
-        visual_features = {
-            "avg_hsv": avg_hsv,
-            "brightness": brightness,
-            "vibrancy": vibrancy,
-            "mold_percentage": mold_percentage
-        }
-        
-        # Analyze with Gemini
-        result = analyze_with_gemini(contents, name, visual_features)
-        
-        # Return complete assessment
-        return {
-            "food_name": name,
-            "assessment": result.get("assessment", "UNKNOWN"),
-            "confidence": result.get("confidence", 0),
-            "reasoning": result.get("reasoning", "Not provided"),
-            "recommendations": result.get("recommendations", "Not provided"),
-            "visual_features": visual_features
-        }
+        with stage("upload"):
+            contents = await read_upload(file)
+        return await assess_image(contents, name)
     
+    except (UploadTooLargeError, LLMPayloadTooLargeError) as e:
+        return JSONResponse(status_code=413, content={"error": str(e)})
+    except InvalidImageError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except (QueueFullError, NoProviderAvailableError) as e:
+        return busy_response(e)
+    except NoProvidersConfiguredError as e:
+        return JSONResponse(status_code=503, content={"error": str(e)})
+    except LLMTimeoutError as e:
+        return JSONResponse(status_code=504, content={"error": str(e)})
     except Exception as e:
         return {"error": str(e)}
 
+@app.post("/predict/batch")
+async def predict_batch_with_gemini(files: List[UploadFile] = File(...), names: List[str] = Form(...)):
+    """Assess several images at once; results come back in upload order"""
+    if len(files) != len(names):
+        return JSONResponse(status_code=400, content={"error": "Send exactly one name per file"})
+    if len(files) > MAX_BATCH_IMAGES:
+        return JSONResponse(status_code=413, content={"error": f"At most {MAX_BATCH_IMAGES} images per batch"})
+
+    # An oversized file fails only its own item
+    async def read_and_assess(file: UploadFile, name: str) -> Dict[str, Any]:
+        with stage("upload"):
+            contents = await read_upload(file)
+        return await assess_image(contents, name)
+
+    # Features are extracted in parallel and Gemini calls overlap (still bounded by the gateway)
+    outcomes = await asyncio.gather(
+        *(read_and_assess(file, name) for file, name in zip(files, names)), return_exceptions=True
+    )
+
+    results = []
+    for index, (name, outcome) in enumerate(zip(names, outcomes)):
+        if isinstance(outcome, BaseException):
+            results.append({"index": index, "food_name": name, "error": str(outcome),
+                            "status": error_status(outcome)})
+        else:
+            results.append({"index": index, **outcome})
+    return {"results": results}
+
+@app.post("/jobs", status_code=202)
+async def submit_job(file: UploadFile = File(...), name: str = Form(...), priority: int = Form(0),
+                     callback_url: Optional[str] = Form(None)):
+    """Queue an assessment and return its job ID at once; higher priority runs first"""
+    if callback_url:
+        try:
+            await asyncio.to_thread(check_callback_url, callback_url, JOB_QUEUE.callback_hosts)
+        except CallbackURLError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+    try:
+        with stage("upload"):
+            contents = await read_upload(file)
+        job = await JOB_QUEUE.submit({"name": name}, contents, priority, callback_url)
+    except UploadTooLargeError as e:
+        return JSONResponse(status_code=413, content={"error": str(e)})
+    except JobQueueFullError as e:
+        return busy_response(e)
+    return {**job, "status_url": f"/jobs/{job['job_id']}"}
+
+@app.get("/jobs/stats")
+async def job_stats():
+    """Jobs by status and the queue's depth limit"""
+    return await JOB_QUEUE.snapshot()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of a job, with the assessment once it is done"""
+    job = await JOB_QUEUE.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown job"})
+    return job
+
 @app.get("/info/{food_name}")
 async def get_food_info(food_name: str):
     """Get reference information about a specific food item"""
     try:
-        reference_data = get_reference_data(food_name)
+        reference_data = await get_reference_data(food_name)
         return {
             "food_name": food_name,
             "reference_data": reference_data
         }
+    except (QueueFullError, NoProviderAvailableError) as e:
+        return busy_response(e)
+    except NoProvidersConfiguredError as e:
+        return JSONResponse(status_code=503, content={"error": str(e)})
     except Exception as e:
         return {"error": str(e)}
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the reference data and assessment caches"""
+    return {
+        "reference_pack": REFERENCE_PACK.snapshot(),
+        "reference_cache": FOOD_REFERENCE_CACHE.snapshot(),
+        "assessment_cache": ASSESSMENT_CACHE.snapshot(),
+    }
+
+@app.get("/router/stats")
+async def router_stats():
+    """Rolling latency, error rate and breaker state per Gemini model"""
+    return {"reference": reference_router.snapshot(), "assessment": assessment_router.snapshot()}
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: stage timings, Gemini calls, cache ratios, in-flight requests"""
+    return metrics_response()
+
 @app.get("/")
 async def root():
     """API root endpoint with basic information"""
@@ -263,7 +479,14 @@ async def root():
         "version": "1.0.0",
         "endpoints": [
             {"path": "/predict", "method": "POST", "description": "Assess food quality from image"},
+            {"path": "/predict/batch", "method": "POST", "description": "Assess several images in one request"},
+            {"path": "/jobs", "method": "POST", "description": "Queue an assessment, get a job ID back"},
+            {"path": "/jobs/{job_id}", "method": "GET", "description": "Job status and result"},
+            {"path": "/jobs/stats", "method": "GET", "description": "Job queue depth by status"},
             {"path": "/info/{food_name}", "method": "GET", "description": "Get reference data for food"},
+            {"path": "/cache/stats", "method": "GET", "description": "Cache hit/miss counters"},
+            {"path": "/router/stats", "method": "GET", "description": "Per-model latency and circuit state"},
+            {"path": "/metrics", "method": "GET", "description": "Prometheus metrics"},
         ]
     }
 
@@ -0,0 +1,269 @@
+"""Bulk audit of a directory of food photos: features plus local EfficientNet, resumable.
+
+Images are streamed from the directory tree. Each one is decoded and its
+features extracted (app.py's extract_features) on a pool of worker processes.
+Model inputs go through main.py's EfficientNet classifier in batches. Rows are
+appended to the output as each batch finishes, so the output is also the
+checkpoint: run the same command again after an interruption and images
+already written are skipped (delete the output to start over).
+
+The output is a CSV file, or a directory of Parquet part files when the path
+ends in .parquet (pandas needs pyarrow or fastparquet for that).
+
+Usage (from server/foodloop_api):
+    python audit_cli.py /data/donations --output audit.csv
+    python audit_cli.py /data/donations --output audit.parquet --workers 8 --batch-size 64
+    python audit_cli.py /data/donations --output features.csv --no-model
+"""
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+import numpy as np
+from PIL import Image
+
+from image_features import extract_features
+from ingest import decode_image
+from workers import available_cores
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+COLUMNS = ["path", "bytes", "width", "height", "hue", "saturation", "value", "brightness", "vibrancy",
+           "mold_percentage", "dominant_colors", "label", "produce", "freshness", "confidence",
+           "fresh_probability", "error"]
+
+
+def iter_images(root: str, extensions: Iterable[str] = IMAGE_EXTENSIONS) -> Iterator[str]:
+    """Image paths under ``root``, relative to it, in a stable order; nothing is listed up front"""
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(files):
+            if name.lower().endswith(tuple(extensions)):
+                yield os.path.relpath(os.path.join(directory, name), root)
+
+
+# Worker processes
+
+_model_input_size = None
+
+
+def _init_worker(model_input_size):
+    global _model_input_size
+    _model_input_size = model_input_size
+
+
+def analyze_file(root: str, path: str):
+    """Runs in a worker: decode once, extract features and the model input for one image"""
+    row: Dict[str, Any] = {"path": path}
+    try:
+        with open(os.path.join(root, path), "rb") as f:
+            raw = f.read()
+        row["bytes"] = len(raw)
+        upload = decode_image(raw)
+        row["width"], row["height"] = upload.original_size
+        features = extract_features(upload.image)
+        row["hue"], row["saturation"], row["value"] = features["avg_hsv"]
+        row.update({key: features[key] for key in ("brightness", "vibrancy", "mold_percentage")})
+        row["dominant_colors"] = json.dumps(features["dominant_colors"], separators=(",", ":"))
+        model_input = None
+        if _model_input_size is not None:
+            # Same resize as main.preprocess_for_model; uint8 keeps the hand-off to the parent small
+            model_input = np.asarray(upload.image.resize(_model_input_size, Image.Resampling.BILINEAR))
+        return row, model_input
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+        return row, None
+
+
+# Output writers: append-only, and readable back for resuming
+
+class CSVOutput:
+    def __init__(self, path: str):
+        self.path = path
+        fresh = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not fresh:
+            self._drop_partial_line()
+        self._file = open(path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=COLUMNS)
+        if fresh:
+            self._writer.writeheader()
+
+    def _drop_partial_line(self):
+        """A run killed mid-write can leave half a row; cut it off so it is redone"""
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def done_paths(self) -> Set[str]:
+        with open(self.path, newline="", encoding="utf-8") as f:
+            return {row["path"] for row in csv.DictReader(f)}
+
+    def write(self, rows: List[Dict[str, Any]]):
+        self._writer.writerows(rows)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetOutput:
+    """A directory of part files; each holds ``part_rows`` rows (a partial part is lost on a crash)"""
+
+    def __init__(self, path: str, part_rows: int = 1000):
+        self.path = path
+        self.part_rows = part_rows
+        self._pending: List[Dict[str, Any]] = []
+        os.makedirs(path, exist_ok=True)
+        self._next_part = len(self._parts())
+
+    def _parts(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.path, "part-*.parquet")))
+
+    def done_paths(self) -> Set[str]:
+        import pandas as pd
+        return {path for part in self._parts() for path in pd.read_parquet(part, columns=["path"])["path"]}
+
+    def write(self, rows: List[Dict[str, Any]]):
+        self._pending.extend(rows)
+        if len(self._pending) >= self.part_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        import pandas as pd
+        part = os.path.join(self.path, f"part-{self._next_part:05d}.parquet")
+        pd.DataFrame(self._pending, columns=COLUMNS).to_parquet(part + ".tmp", index=False)
+        os.replace(part + ".tmp", part)
+        self._next_part += 1
+        self._pending = []
+
+    def close(self):
+        self.flush()
+
+
+def open_output(path: str):
+    return ParquetOutput(path) if path.endswith(".parquet") else CSVOutput(path)
+
+
+# Driver
+
+class Progress:
+    def __init__(self, every: float):
+        self.every = every
+        self.start = self._last_time = time.perf_counter()
+        self.done = self.errors = self._last_done = 0
+
+    def add(self, rows: List[Dict[str, Any]]):
+        self.done += len(rows)
+        self.errors += sum(1 for row in rows if row.get("error"))
+        now = time.perf_counter()
+        if now - self._last_time >= self.every:
+            recent = (self.done - self._last_done) / (now - self._last_time)
+            print(f"{self.done} images ({self.errors} errors), {recent:.1f} images/s now, "
+                  f"{self.rate():.1f} images/s overall", file=sys.stderr, flush=True)
+            self._last_time, self._last_done = now, self.done
+
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self.start
+        return self.done / elapsed if elapsed else 0.0
+
+
+def classify(service, rows, inputs):
+    """main.py's batched EfficientNet over the rows that decoded"""
+    ready = [(row, x) for row, x in zip(rows, inputs) if x is not None]
+    if not ready:
+        return
+    predictions = service.classify_batch([x.astype(np.float32) for _, x in ready])
+    for (row, _), prediction in zip(ready, predictions):
+        row.update({key: prediction[key] for key in ("label", "produce", "freshness", "confidence",
+                                                       "fresh_probability")})
+
+
+def run(root: str, output, service, workers: int, batch_size: int, progress: Progress,
+        skip: Optional[Set[str]] = None):
+    paths = (path for path in iter_images(root) if not skip or path not in skip)
+    model_input_size = service.MODEL_INPUT_SIZE if service is not None else None
+    context = multiprocessing.get_context("spawn")
+    # Enough work in flight to keep every worker busy while a batch is classified, and no more
+    window = max(workers * 4, batch_size * 2)
+    rows, inputs = [], []
+    with context.Pool(workers, initializer=_init_worker, initargs=(model_input_size,)) as pool:
+        in_flight = deque()
+        while True:
+            while len(in_flight) < window:
+                path = next(paths, None)
+                if path is None:
+                    break
+                in_flight.append(pool.apply_async(analyze_file, (root, path)))
+            if not in_flight:
+                break
+            row, model_input = in_flight.popleft().get()
+            rows.append(row)
+            inputs.append(model_input)
+            if len(rows) >= batch_size:
+                flush(output, service, rows, inputs, progress)
+                rows, inputs = [], []
+        flush(output, service, rows, inputs, progress)
+
+
+def flush(output, service, rows, inputs, progress):
+    if not rows:
+        return
+    if service is not None:
+        classify(service, rows, inputs)
+    output.write(rows)
+    progress.add(rows)
+
+
+def load_classifier():
+    """main.py with its EfficientNet loaded (locally or through INFERENCE_SERVER)"""
+    import main as service
+    try:
+        service.backends.get("efficientnet")
+    except Exception as e:
+        sys.exit(f"Could not load the EfficientNet model ({type(e).__name__}: {e}); "
+                 "set EFFICIENTNET_MODEL_PATH or INFERENCE_SERVER, or run with --no-model")
+    return service
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("--output", required=True, help="CSV file, or a directory ending in .parquet")
+    parser.add_argument("--workers", type=int, default=available_cores(), help="decode/feature processes")
+    parser.add_argument("--batch-size", type=int, default=32, help="images per model batch and per write")
+    parser.add_argument("--no-model", action="store_true", help="features only, skip EfficientNet")
+    parser.add_argument("--progress-every", type=float, default=5.0, help="seconds between progress lines")
+    args = parser.parse_args()
+
+    service = None if args.no_model else load_classifier()
+    output = open_output(args.output)
+    done = output.done_paths()
+    if done:
+        print(f"resuming: {len(done)} images already in {args.output}", file=sys.stderr)
+
+    progress = Progress(args.progress_every)
+    interrupted = False
+    try:
+        run(args.directory, output, service, args.workers, args.batch_size, progress, done)
+    except KeyboardInterrupt:
+        interrupted = True
+    finally:
+        output.close()
+    print(f"{progress.done} images ({progress.errors} errors) in {time.perf_counter() - progress.start:.1f}s, "
+          f"{progress.rate():.1f} images/s", file=sys.stderr)
+    if interrupted:
+        sys.exit("interrupted; run the same command again to resume")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger("foodloop.backends")
+
+
+class BackendDisabledError(Exception):
+    """Raised when a route needs a backend this deployment has not enabled"""
+
+
+class Backends:
+    """Registry of heavy dependencies (ML frameworks, LLM SDKs) loaded on first use.
+
+    Each loader runs at most once, guarded by its own lock, the first time
+    ``get`` asks for it or when ``warm_up`` preloads it. Only the names in
+    ``enabled`` may be loaded at all, so an LLM-only worker never imports
+    TensorFlow.
+    """
+
+    def __init__(self, loaders: Dict[str, Callable[[], Any]], enabled: Optional[Iterable[str]] = None):
+        self._loaders = dict(loaders)
+        self.enabled = set(self._loaders if enabled is None else enabled)
+        unknown = self.enabled - set(self._loaders)
+        if unknown:
+            raise ValueError(f"Unknown backends: {', '.join(sorted(unknown))}")
+        self._locks = {name: threading.Lock() for name in self._loaders}
+        self._loaded: Dict[str, Any] = {}
+        self._load_seconds: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    def get(self, name: str) -> Any:
+        if name in self._loaded:
+            return self._loaded[name]
+        if name not in self.enabled:
+            raise BackendDisabledError(f"The '{name}' backend is not enabled on this server")
+        with self._locks[name]:
+            if name not in self._loaded:
+                start = time.perf_counter()
+                try:
+                    self._loaded[name] = self._loaders[name]()
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+                self._errors.pop(name, None)
+                self._load_seconds[name] = round(time.perf_counter() - start, 3)
+        return self._loaded[name]
+
+    def warm_up_names(self, spec: str) -> List[str]:
+        """Backends to warm up from a comma-separated list ("all" for every enabled one).
+
+        Unknown names raise ``ValueError``. Disabled ones are dropped with a
+        warning: they can never load, so readiness would wait on them forever.
+        """
+        names = [name.strip() for name in spec.split(",") if name.strip()]
+        if names == ["all"]:
+            return sorted(self.enabled)
+        unknown = [name for name in names if name not in self._loaders]
+        if unknown:
+            raise ValueError(f"Unknown backends to warm up: {', '.join(unknown)}")
+        disabled = [name for name in names if name not in self.enabled]
+        if disabled:
+            logger.warning("Not warming up disabled backends: %s", ", ".join(disabled))
+        return [name for name in names if name in self.enabled]
+
+    def warm_up(self, names: Iterable[str]):
+        """Load the given backends now; failures are recorded in ``status`` instead of raised"""
+        for name in names:
+            try:
+                self.get(name)
+            except Exception:
+                pass
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "enabled": name in self.enabled,
+                "loaded": name in self._loaded,
+                "load_seconds": self._load_seconds.get(name),
+                "error": self._errors.get(name),
+            }
+            for name in self._loaders
+        }
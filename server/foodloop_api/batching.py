@@ -0,0 +1,88 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from metrics import REGISTRY
+
+_batchers = []
+REGISTRY.collect("foodloop_batch_queue_depth", "Items waiting for the next model batch", "gauge", ["model"],
+                 lambda: {(batcher.name,): batcher._queue.qsize() if batcher._queue is not None else 0
+                          for batcher in _batchers})
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-item requests into batches for one model call.
+
+    ``submit`` queues an item and waits for its result. A background task takes
+    the first queued item, keeps collecting until ``max_batch_size`` items are
+    waiting or ``max_wait_ms`` has passed, then runs ``predict_batch`` once on a
+    dedicated thread and hands each caller its own result. While one batch runs
+    the next one fills up, so batches grow with load.
+    """
+
+    def __init__(self, predict_batch: Callable[[List[Any]], Sequence[Any]],
+                 max_batch_size: int = 16, max_wait_ms: float = 5.0, name: str = "batcher"):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.stats = {"batches": 0, "items": 0, "max_batch_size_seen": 0, "errors": 0}
+        _batchers.append(self)
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self) -> List[tuple]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # Callers that gave up (client disconnected) don't need a slot
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                continue
+            self.stats["batches"] += 1
+            self.stats["items"] += len(batch)
+            self.stats["max_batch_size_seen"] = max(self.stats["max_batch_size_seen"], len(batch))
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self.predict_batch, [item for item, _ in batch]
+                )
+            except Exception as e:
+                self.stats["errors"] += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def snapshot(self) -> Dict[str, Any]:
+        batches = self.stats["batches"]
+        return {**self.stats, "avg_batch_size": round(self.stats["items"] / batches, 2) if batches else 0.0,
+                "max_batch_size": self.max_batch_size, "max_wait_ms": self.max_wait * 1000}
@@ -0,0 +1,47 @@
+"""Per-image cost of ``cv_image_stats`` (main.py's OpenCV HSV/brightness/vibrancy).
+
+Times the decode the routes do (PIL -> NumPy BGR) separately from
+the stats themselves, across the shared image sizes. For throughput on the
+worker pool see bench_cpu_pool.py.
+
+Usage (from server/foodloop_api):
+    python benchmarks/bench_analyze_image.py --repeat 20
+"""
+import argparse
+import io
+
+import numpy as np
+from PIL import Image
+
+from common import SIZES, percentiles, synthetic_jpeg, time_calls, write_results
+
+from image_features import cv_image_stats
+
+
+def decode_bgr(data: bytes):
+    return np.array(Image.open(io.BytesIO(data)).convert("RGB"))[:, :, ::-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(SIZES), help=f"subset of {', '.join(SIZES)}")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = []
+    for size_name in (name.strip() for name in args.sizes.split(",") if name.strip()):
+        width, height = SIZES[size_name]
+        data = synthetic_jpeg(width, height)
+        img_np = decode_bgr(data)
+        for stage, call in (("decode", lambda: decode_bgr(data)),
+                            ("analyze_image", lambda: cv_image_stats(img_np))):
+            stats = percentiles(time_calls(call, args.repeat))
+            results.append({"function": stage, "size": size_name, "width": width, "height": height, **stats})
+            print(f"{size_name:>6} {stage:<14} p50 {stats['p50']:9.2f} ms  p95 {stats['p95']:9.2f} ms")
+
+    write_results("analyze_image", results, args.output, repeat=args.repeat)
+
+
+if __name__ == "__main__":
+    main()
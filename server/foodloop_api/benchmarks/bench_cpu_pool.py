@@ -0,0 +1,103 @@
+"""Multi-image throughput of the CPU pool (workers.py) as it grows to the core count.
+
+Decodes the images the way ingest.py does, then pushes all of them through
+``CPUPool.run`` at once for each pool kind and size. It reports images/s,
+speedup over a one-worker pool of the same kind, and scaling efficiency
+(speedup / workers, where 1.0 is linear). The "process-pickle" mode turns
+shared memory off, which shows what the shared-memory hand-off saves.
+
+Usage (from server/foodloop_api):
+    python benchmarks/bench_cpu_pool.py --images 64 --image-size 2mp
+    python benchmarks/bench_cpu_pool.py --task cv_stats --modes thread --workers 1,2,4,8
+"""
+import argparse
+import asyncio
+import time
+
+from common import SIZES, synthetic_jpeg, write_results
+
+import workers
+from image_features import cv_image_stats, extract_features_array, hsv_summary
+from ingest import decode_image
+from workers import CPUPool, available_cores
+
+TASKS = {"features": extract_features_array, "cv_stats": cv_image_stats, "hsv": hsv_summary}
+MODES = ("inline", "thread", "process", "process-pickle")
+
+
+def default_workers():
+    cores = available_cores()
+    sizes = [1]
+    while sizes[-1] * 2 < cores:
+        sizes.append(sizes[-1] * 2)
+    return sizes + [cores] if cores > 1 else sizes
+
+
+async def run_all(pool, fn, arrays):
+    await asyncio.gather(*(pool.run(fn, array) for array in arrays))
+
+
+def measure(mode, size, fn, arrays, repeat):
+    """Best-of-``repeat`` wall time for one pass over every image"""
+    if mode == "inline":
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for array in arrays:
+                fn(array)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    workers.SHARED_MEMORY_MIN_BYTES = float("inf") if mode == "process-pickle" else 64 * 1024
+    pool = CPUPool("thread" if mode == "thread" else "process", size)
+    try:
+        pool.warm_up()
+        asyncio.run(run_all(pool, fn, arrays[:size]))  # imports and caches inside the workers
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            asyncio.run(run_all(pool, fn, arrays))
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+    finally:
+        pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--task", choices=sorted(TASKS), default="features")
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--image-size", choices=sorted(SIZES), default="2mp")
+    parser.add_argument("--modes", default=",".join(MODES), help=f"subset of {', '.join(MODES)}")
+    parser.add_argument("--workers", default=",".join(map(str, default_workers())),
+                        help="pool sizes to try (default: powers of two up to the core count)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    width, height = SIZES[args.image_size]
+    arrays = [decode_image(synthetic_jpeg(width, height, seed=i)).array() for i in range(args.images)]
+    fn = TASKS[args.task]
+    print(f"{args.images} x {arrays[0].shape[1]}x{arrays[0].shape[0]} images, task {args.task}, "
+          f"{available_cores()} cores")
+
+    results = []
+    for mode in (m.strip() for m in args.modes.split(",") if m.strip()):
+        sizes = [1] if mode == "inline" else [int(s) for s in args.workers.split(",")]
+        baseline = None
+        for size in sizes:
+            elapsed = measure(mode, size, fn, arrays, args.repeat)
+            baseline = baseline or elapsed
+            speedup = baseline / elapsed
+            results.append({"function": args.task, "mode": mode, "workers": size, "seconds": round(elapsed, 4),
+                            "items_per_second": round(args.images / elapsed, 1), "speedup": round(speedup, 2),
+                            "scaling_efficiency": round(speedup / size, 2)})
+            print(f"{mode:<15} {size:3d} workers  {args.images / elapsed:8.1f} images/s  "
+                  f"speedup {speedup:5.2f}  efficiency {speedup / size:4.2f}")
+
+    write_results("cpu_pool", results, args.output, images=args.images, image_size=args.image_size,
+                  cores=available_cores())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Per-image cost of the app.py feature extractors, from thumbnail to 12 MP.
+
+Times each legacy ``calculate_*`` / ``detect_mold_patterns`` helper on the
+full-size decoded image, and ``extract_features`` starting from the JPEG bytes
+(decode + downscale included, as in /predict).
+
+Usage (from server/foodloop_api):
+    python benchmarks/bench_features.py --repeat 5
+"""
+import argparse
+import io
+import os
+
+# app.py configures Gemini at import time; the stand-in keeps this offline
+os.environ.setdefault("FAKE_GEMINI_LATENCY", "0")
+
+from PIL import Image  # noqa: E402
+
+from common import SIZES, percentiles, synthetic_jpeg, time_calls, write_results  # noqa: E402
+
+import app  # noqa: E402
+from image_features import FEATURE_MAX_SIDE, extract_features  # noqa: E402
+
+LEGACY = {
+    "calculate_avg_hsv": app.calculate_avg_hsv,
+    "calculate_brightness": app.calculate_brightness,
+    "calculate_vibrancy": app.calculate_vibrancy,
+    "calculate_color_distribution": app.calculate_color_distribution,
+    "detect_mold_patterns": app.detect_mold_patterns,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(SIZES), help=f"subset of {', '.join(SIZES)}")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-legacy-above", type=int, default=0,
+                        help="skip the legacy helpers above this many megapixels (0 runs all)")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = []
+    for size_name in (name.strip() for name in args.sizes.split(",") if name.strip()):
+        width, height = SIZES[size_name]
+        data = synthetic_jpeg(width, height)
+        image = Image.open(io.BytesIO(data)).convert("RGB")
+        megapixels = width * height / 1e6
+
+        candidates = {"extract_features": lambda: extract_features(Image.open(io.BytesIO(data)))}
+        if not args.skip_legacy_above or megapixels <= args.skip_legacy_above:
+            candidates.update({name: (lambda fn=fn: fn(image)) for name, fn in LEGACY.items()})
+
+        for name, call in candidates.items():
+            stats = percentiles(time_calls(call, args.repeat))
+            results.append({"function": name, "size": size_name, "width": width, "height": height, **stats})
+            print(f"{size_name:>6} {name:<30} p50 {stats['p50']:9.2f} ms  p95 {stats['p95']:9.2f} ms")
+
+    write_results("features", results, args.output, repeat=args.repeat, feature_max_side=FEATURE_MAX_SIDE)
+
+
+if __name__ == "__main__":
+    main()
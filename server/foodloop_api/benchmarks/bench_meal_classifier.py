@@ -0,0 +1,96 @@
+"""Throughput of the DistilBERT meal-type classifier: direct batches, per-request and micro-batched.
+
+The cascade's cheap tiers are bypassed (``predict_model_batch``) so every item
+reaches the model.
+
+Usage (from server/foodloop_api):
+    MEAL_CLASSIFIER_PATH=./fine_tuned_food_classifier \
+        python benchmarks/bench_meal_classifier.py --requests 512 --concurrency 64
+"""
+import argparse
+import asyncio
+import csv
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import API_DIR, percentiles, write_results
+
+import finalfoodclassifier as service  # noqa: E402
+from batching import MicroBatcher  # noqa: E402
+
+
+def load_texts(count):
+    with open(os.path.join(API_DIR, "expanded_food_items.csv"), newline="", encoding="utf-8") as f:
+        texts = [row["text"] for row in csv.DictReader(f)]
+    return [texts[i % len(texts)] for i in range(count)]
+
+
+def bench_direct(texts, batch_size):
+    """Forward passes of exactly ``batch_size`` items, back to back"""
+    timings = []
+    for i in range(0, len(texts), batch_size):
+        start = time.perf_counter()
+        service.predict_model_batch(texts[i:i + batch_size])
+        timings.append(time.perf_counter() - start)
+    return sum(timings), timings
+
+
+def bench_per_request(texts, concurrency):
+    """Unbatched path: one forward pass per request on the endpoint threadpool"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda text: service.predict_model_batch([text]), texts))
+    return time.perf_counter() - start
+
+
+async def bench_batched(texts, concurrency, max_batch_size, max_wait_ms):
+    batcher = MicroBatcher(service.predict_model_batch, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(text):
+        async with limit:
+            return await batcher.submit(text)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(text) for text in texts))
+    return time.perf_counter() - start, batcher.snapshot()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--batch-sizes", default="8,16,32,64")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--direct-batch-sizes", default="1,8,32,128")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    texts = load_texts(args.requests)
+    service.predict_model_batch(texts[:8])  # warm-up
+
+    results = []
+    for batch_size in (int(size) for size in args.direct_batch_sizes.split(",")):
+        elapsed, timings = bench_direct(texts, batch_size)
+        results.append({"mode": "direct", "batch_size": batch_size, "seconds": elapsed,
+                        "items_per_second": len(texts) / elapsed, "batch_latency_ms": percentiles(timings)})
+        print(f"direct (batch {batch_size:3d}) {len(texts) / elapsed:9.1f} items/s")
+
+    elapsed = bench_per_request(texts, args.concurrency)
+    results.append({"mode": "per_request", "seconds": elapsed, "items_per_second": len(texts) / elapsed})
+    print(f"per-request       {len(texts) / elapsed:9.1f} items/s")
+
+    for batch_size in (int(size) for size in args.batch_sizes.split(",")):
+        elapsed, stats = asyncio.run(bench_batched(texts, args.concurrency, batch_size, args.max_wait_ms))
+        results.append({"mode": "batched", "max_batch_size": batch_size, "seconds": elapsed,
+                        "items_per_second": len(texts) / elapsed, "avg_batch_size": stats["avg_batch_size"]})
+        print(f"batched (max {batch_size:3d}) {len(texts) / elapsed:9.1f} items/s  avg batch {stats['avg_batch_size']}")
+
+    write_results("meal_classifier", results, args.output, requests=args.requests, concurrency=args.concurrency,
+                  torch_threads=service.torch.get_num_threads(),
+                  backend=os.getenv("MEAL_CLASSIFIER_BACKEND", "torch"))
+
+
+if __name__ == "__main__":
+    main()
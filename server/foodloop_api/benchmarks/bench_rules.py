@@ -0,0 +1,60 @@
+"""Throughput of the quality rules behind ``assess_quality_rule_based``.
+
+Uses the same RuleEngine and quality_rules.json as finalfoodclassifier.py, without
+loading DistilBERT: one call per item (the /predict path) vs one vectorized call
+per batch (the /predict/batch path).
+
+Usage (from server/foodloop_api):
+    python benchmarks/bench_rules.py --items 10000
+"""
+import argparse
+import csv
+import os
+import random
+import time
+
+from common import API_DIR, write_results
+
+from rule_engine import DEFAULT_RULES_PATH, RuleEngine
+
+MEAL_TYPES = ["breakfast", "lunch", "dinner", "snacks"]
+STORAGES = ["room temp", "fridge"]
+
+
+def load_cases(count, seed=0):
+    with open(os.path.join(API_DIR, "expanded_food_items.csv"), newline="", encoding="utf-8") as f:
+        foods = [row["text"] for row in csv.DictReader(f)]
+    rng = random.Random(seed)
+    return ([rng.choice(foods) for _ in range(count)], [rng.choice(MEAL_TYPES) for _ in range(count)],
+            [rng.uniform(0, 24) for _ in range(count)], [rng.choice(STORAGES) for _ in range(count)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--batch-sizes", default="1,16,64,256")
+    parser.add_argument("--rules", default=DEFAULT_RULES_PATH)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    engine = RuleEngine.from_file(args.rules)
+    foods, meals, hours, storages = load_cases(args.items)
+    engine.evaluate(foods[:64], meals[:64], hours[:64], storages[:64])  # warm-up
+
+    results = []
+    for batch_size in (int(size) for size in args.batch_sizes.split(",")):
+        start = time.perf_counter()
+        for i in range(0, args.items, batch_size):
+            engine.evaluate(foods[i:i + batch_size], meals[i:i + batch_size],
+                            hours[i:i + batch_size], storages[i:i + batch_size])
+        elapsed = time.perf_counter() - start
+        results.append({"batch_size": batch_size, "seconds": round(elapsed, 4),
+                        "items_per_second": round(args.items / elapsed, 1),
+                        "us_per_item": round(elapsed / args.items * 1e6, 2)})
+        print(f"batch {batch_size:4d}  {args.items / elapsed:12.1f} items/s  {elapsed / args.items * 1e6:8.2f} us/item")
+
+    write_results("rules", results, args.output, items=args.items)
+
+
+if __name__ == "__main__":
+    main()
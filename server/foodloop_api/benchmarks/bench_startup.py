@@ -0,0 +1,67 @@
+"""Import-time budget for the API modules.
+
+Imports a module in a fresh interpreter with ``-X importtime`` and checks the
+wall-clock time against a budget; exits non-zero when the budget is exceeded.
+
+Usage (from server/foodloop_api):
+    FOODLOOP_BACKENDS=ollama python benchmarks/bench_startup.py main --budget 1.0
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module, runs):
+    timings, imports = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=API_DIR, capture_output=True, text=True, check=True,
+        )
+        timings.append(time.perf_counter() - start)
+        imports = completed.stderr.splitlines()
+
+    # Lines look like "import time:  self [us] | cumulative | imported package", nested
+    # imports indented by two more spaces; keep the module and its direct imports
+    top_level = []
+    for line in imports:
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            indent = len(parts[2]) - len(parts[2].lstrip())
+            if indent <= 3:
+                top_level.append((int(parts[1]), parts[2].strip()))
+    top_level.sort(reverse=True)
+    return timings, top_level
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("module", nargs="?", default="main")
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", default=os.path.join(API_DIR, "benchmarks", "results", "startup.json"))
+    args = parser.parse_args()
+
+    timings, top_level = measure(args.module, args.runs)
+    best = min(timings)
+    print(f"import {args.module}: best {best:.3f}s over {args.runs} runs (budget {args.budget:.3f}s)")
+    for cumulative_us, name in top_level[:10]:
+        print(f"  {cumulative_us / 1e6:7.3f}s  {name}")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"module": args.module, "budget_seconds": args.budget, "seconds": timings,
+                   "backends": os.getenv("FOODLOOP_BACKENDS"),
+                   "top_imports": [{"module": name, "seconds": us / 1e6} for us, name in top_level[:20]]},
+                  f, indent=2)
+    sys.exit(0 if best <= args.budget else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Memory per API worker: separate model copies vs. a preloaded fork vs. the inference server.
+
+Starts N finalfoodclassifier.py workers in each layout and runs a few DistilBERT
+batches in every one. While all the processes are still alive, it reads each
+one's /proc/<pid>/smaps_rollup. The layouts:
+
+- separate: each worker imports the app and loads its own model (today's layout)
+- preload: a master imports the app once, freezes the GC and forks the workers
+  (what gunicorn.conf.py does)
+- preload-nofreeze: the same without gc.freeze, to show what freezing saves
+- server: inference_server.py holds the model, and the workers run with
+  INFERENCE_SERVER set
+
+Three measures are reported:
+- RSS counts a shared page in full in every process that maps it, so the
+  per-worker RSS overstates what a worker costs.
+- PSS splits each shared page between the processes that use it.
+- USS is the memory that belongs to one process only.
+
+total_pss_mb, the sum over workers plus the master or server, is what the
+layout costs the node.
+
+Without --model-path (or MEAL_CLASSIFIER_PATH), a randomly initialised,
+full-size DistilBERT is saved to a temporary directory. The numbers then hold
+without the fine-tuned checkpoint.
+
+Usage (from server/foodloop_api, Linux only):
+    python benchmarks/bench_worker_memory.py --workers 4
+    MEAL_CLASSIFIER_PATH=./fine_tuned_food_classifier python benchmarks/bench_worker_memory.py --layouts separate,server
+"""
+import argparse
+import gc
+import multiprocessing as mp
+import os
+import secrets
+import sys
+import tempfile
+import time
+
+from common import API_DIR, write_results
+
+from meal_data import DEFAULT_DATA_PATH, load_food_items
+
+LAYOUTS = ("separate", "preload", "preload-nofreeze", "server")
+WARM_BATCHES = 5
+
+
+def memory_mb(pid):
+    """RSS, PSS and USS of one process, in MiB"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {"rss": fields["Rss"], "pss": fields["Pss"], "uss": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+
+def synthetic_checkpoint(directory):
+    """Standard-size DistilBERT with random weights, labels and a vocabulary from the dish CSV"""
+    from transformers import DistilBertConfig, DistilBertForSequenceClassification, DistilBertTokenizerFast
+    items = load_food_items(DEFAULT_DATA_PATH)
+    labels = sorted(items["label"].unique())
+    words = sorted({word for text in items["text"] for word in text.lower().split()})
+    os.makedirs(directory, exist_ok=True)
+    vocab_file = os.path.join(directory, "vocab.txt")
+    with open(vocab_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words) + "\n")
+    DistilBertTokenizerFast(vocab_file=vocab_file).save_pretrained(directory)
+    config = DistilBertConfig(num_labels=len(labels), id2label=dict(enumerate(labels)),
+                              label2id={label: i for i, label in enumerate(labels)})
+    DistilBertForSequenceClassification(config).save_pretrained(directory)
+
+
+def sample_texts():
+    return load_food_items(DEFAULT_DATA_PATH)["text"].tolist()[:32]
+
+
+def warm(service):
+    texts = sample_texts()
+    for _ in range(WARM_BATCHES):
+        service.predict_model_batch(texts)
+
+
+def spawned_worker(reports, stop):
+    """One worker of the separate and server layouts: a fresh interpreter that imports the app"""
+    import finalfoodclassifier as service
+    warm(service)
+    reports.put(("worker", os.getpid()))
+    stop.wait()
+
+
+def forked_worker(reports, stop):
+    gc.enable()
+    warm(sys.modules["finalfoodclassifier"])
+    reports.put(("worker", os.getpid()))
+    stop.wait()
+
+
+def preload_master(workers, freeze, reports, stop):
+    """Imports the app once, then forks the workers from it the way gunicorn --preload does"""
+    gc.disable()
+    import finalfoodclassifier  # noqa: F401
+    if freeze:
+        gc.collect()
+        gc.freeze()
+    fork = mp.get_context("fork")
+    children = [fork.Process(target=forked_worker, args=(reports, stop)) for _ in range(workers)]
+    for child in children:
+        child.start()
+    reports.put(("master", os.getpid()))
+    for child in children:
+        child.join()
+
+
+def serve(address):
+    from inference_server import InferenceServer
+    InferenceServer.load(["distilbert"], address=address).serve_forever()
+
+
+def wait_for_server(address, timeout=300):
+    from inference_server import InferenceClient, InferenceServerError
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return InferenceClient(address).info("distilbert")
+        except InferenceServerError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+
+
+def run_layout(layout, workers, model_path, socket_dir):
+    spawn = mp.get_context("spawn")
+    reports, stop = spawn.Queue(), spawn.Event()
+    os.environ["MEAL_CLASSIFIER_PATH"] = model_path
+    os.environ.pop("INFERENCE_SERVER", None)
+    processes, expected = [], workers
+
+    if layout == "server":
+        # A throwaway key for this run; socket_dir is a private mkdtemp directory
+        os.environ.setdefault("INFERENCE_SERVER_AUTHKEY", secrets.token_hex(32))
+        address = os.path.join(socket_dir, "inference.sock")
+        server = spawn.Process(target=serve, args=(address,), daemon=True)
+        server.start()
+        processes.append(server)
+        wait_for_server(address)
+        os.environ["INFERENCE_SERVER"] = address
+    if layout.startswith("preload"):
+        master = spawn.Process(target=preload_master, args=(workers, layout == "preload", reports, stop))
+        master.start()
+        processes.append(master)
+        expected += 1
+    else:
+        for _ in range(workers):
+            worker = spawn.Process(target=spawned_worker, args=(reports, stop))
+            worker.start()
+            processes.append(worker)
+
+    try:
+        roles = [reports.get(timeout=600) for _ in range(expected)]
+        if layout == "server":
+            roles.append(("server", processes[0].pid))
+        # Every process is alive and warm, so shared pages are counted against all their users
+        measured = [(role, memory_mb(pid)) for role, pid in roles]
+    finally:
+        stop.set()
+        os.environ.pop("INFERENCE_SERVER", None)
+        for process in processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+    worker_memory = [memory for role, memory in measured if role == "worker"]
+    support = [memory for role, memory in measured if role != "worker"]
+    mean = lambda key: round(sum(m[key] for m in worker_memory) / len(worker_memory), 1)  # noqa: E731
+    return {
+        "layout": layout, "workers": workers,
+        "worker_rss_mb": mean("rss"), "worker_pss_mb": mean("pss"), "worker_uss_mb": mean("uss"),
+        "support_rss_mb": round(sum(m["rss"] for m in support), 1),
+        "total_pss_mb": round(sum(m["pss"] for _, m in measured), 1),
+        "total_rss_mb": round(sum(m["rss"] for _, m in measured), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--layouts", default=",".join(LAYOUTS), help=f"subset of {', '.join(LAYOUTS)}")
+    parser.add_argument("--model-path", default=os.getenv("MEAL_CLASSIFIER_PATH"),
+                        help="fine-tuned checkpoint (default: a random full-size DistilBERT)")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    # Spawned workers import the API modules from here, like the real servers
+    os.chdir(API_DIR)
+    with tempfile.TemporaryDirectory() as scratch:
+        model_path = args.model_path
+        if not model_path:
+            model_path = os.path.join(scratch, "model")
+            synthetic_checkpoint(model_path)
+
+        results = []
+        for layout in (name.strip() for name in args.layouts.split(",") if name.strip()):
+            result = run_layout(layout, args.workers, model_path, scratch)
+            results.append(result)
+            print(f"{layout:<17} per worker: RSS {result['worker_rss_mb']:7.1f}  PSS {result['worker_pss_mb']:7.1f}  "
+                  f"USS {result['worker_uss_mb']:7.1f} MiB   total PSS {result['total_pss_mb']:7.1f} MiB")
+
+    write_results("worker_memory", results, args.output, workers=args.workers,
+                  synthetic_model=not args.model_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Shared helpers for the benchmark scripts: timing, percentiles and result files.
+
+Every script writes one JSON file under benchmarks/results/ with the same
+envelope (``benchmark``, ``metadata``, ``results``), so compare.py can diff
+any two runs of the same benchmark.
+"""
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(API_DIR, "benchmarks", "results")
+
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+# Image sizes for the image benchmarks, from a thumbnail to a 12 MP phone photo
+SIZES = {
+    "thumb": (160, 120),
+    "vga": (640, 480),
+    "2mp": (1920, 1080),
+    "12mp": (4000, 3000),
+}
+
+
+def synthetic_jpeg(width: int, height: int, seed: int = 0) -> bytes:
+    """Photo-like test image: smooth colour gradients plus sensor-style noise"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    r = 180 + 60 * np.sin(x / width * 3.0)
+    g = 120 + 80 * np.cos(y / height * 2.0)
+    b = 60 + 40 * np.sin((x + y) / (width + height) * 5.0)
+    arr = np.stack([r, g, b], axis=2) + rng.normal(0, 12, (height, width, 3))
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(arr, 0, 255).astype(np.uint8)).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def percentiles(samples: List[float], scale: float = 1000.0) -> Dict[str, float]:
+    """p50/p95/p99/mean of ``samples`` (seconds), in milliseconds by default"""
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0}
+    values = np.asarray(samples) * scale
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 3), "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3), "mean": round(float(values.mean()), 3)}
+
+
+def time_calls(fn: Callable[[], object], repeat: int, warmup: int = 1) -> List[float]:
+    """Wall-clock seconds of ``repeat`` calls to ``fn`` after ``warmup`` untimed ones"""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def peak_rss_mib(pid: Optional[int] = None) -> float:
+    """Peak resident set size of ``pid`` (VmHWM, Linux) or of this process"""
+    if pid is not None:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return round(int(line.split()[1]) / 1024, 1)
+        except OSError:
+            pass
+        return 0.0
+    # ru_maxrss is KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def metadata() -> Dict[str, object]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=API_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_results(benchmark: str, results: List[Dict[str, object]], output: Optional[str] = None,
+                  **extra) -> str:
+    path = output or os.path.join(RESULTS_DIR, f"{benchmark}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    payload = {"benchmark": benchmark, "metadata": {**metadata(), **extra},
+               "peak_rss_mib": peak_rss_mib(), "results": results}
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+    print(f"wrote {path}")
+    return path
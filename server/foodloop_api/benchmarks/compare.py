@@ -0,0 +1,81 @@
+"""Compare two result files from the same benchmark and flag regressions.
+
+Rows are matched on their descriptive fields (function, size, batch size,
+target, ...) and every shared numeric metric is compared. Exits non-zero when
+a metric moves the wrong way by more than --threshold.
+
+Usage (from server/foodloop_api):
+    python benchmarks/compare.py baseline/features.json benchmarks/results/features.json --threshold 0.10
+"""
+import argparse
+import json
+import sys
+
+# Metrics where a bigger number is better; everything else (latency, seconds, RSS) is lower-is-better
+HIGHER_IS_BETTER = ("items_per_second", "throughput_rps", "success_rate", "speedup", "scaling_efficiency")
+# Descriptive fields that identify a row rather than measure it
+KEY_FIELDS = ("function", "size", "width", "height", "mode", "batch_size", "max_batch_size",
+              "target", "path", "concurrency", "requests", "workers", "layout")
+
+
+def flatten(row, prefix=""):
+    """Numeric leaves of a result row, nested dicts joined with dots"""
+    metrics = {}
+    for name, value in row.items():
+        if name in KEY_FIELDS:
+            continue
+        if isinstance(value, dict):
+            metrics.update(flatten(value, f"{prefix}{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[f"{prefix}{name}"] = float(value)
+    return metrics
+
+
+def row_key(row):
+    return tuple((name, row[name]) for name in KEY_FIELDS if name in row)
+
+
+def load(path):
+    with open(path) as f:
+        payload = json.load(f)
+    rows = {row_key(row): flatten(row) for row in payload["results"]}
+    rows[(("process", "benchmark"),)] = {"peak_rss_mib": float(payload.get("peak_rss_mib", 0.0))}
+    return payload, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    parser.add_argument("--metrics", help="comma-separated metric names to check (default: all)")
+    args = parser.parse_args()
+
+    baseline, baseline_rows = load(args.baseline)
+    candidate, candidate_rows = load(args.candidate)
+    if baseline["benchmark"] != candidate["benchmark"]:
+        sys.exit(f"different benchmarks: {baseline['benchmark']} vs {candidate['benchmark']}")
+    selected = {name.strip() for name in args.metrics.split(",")} if args.metrics else None
+
+    regressions = 0
+    print(f"{baseline['benchmark']}: {baseline['metadata'].get('git_commit')} -> {candidate['metadata'].get('git_commit')}")
+    for key, before in baseline_rows.items():
+        after = candidate_rows.get(key)
+        if after is None:
+            continue
+        label = " ".join(f"{name}={value}" for name, value in key)
+        for metric, old in before.items():
+            if metric not in after or (selected and metric not in selected) or old == 0:
+                continue
+            change = (after[metric] - old) / abs(old)
+            worse = -change if metric.split(".")[-1] in HIGHER_IS_BETTER else change
+            flag = "REGRESSION" if worse > args.threshold else ("improved" if worse < -args.threshold else "")
+            regressions += flag == "REGRESSION"
+            print(f"  {label:<32} {metric:<24} {old:12.3f} -> {after[metric]:12.3f}  {change:+7.1%}  {flag}")
+
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""End-to-end load test against a service backed by the local fake LLM providers.
+
+Starts fake_providers.py and the target service as uvicorn subprocesses, points
+the service at the fakes (OpenAI, Gemini and Ollama), drives it with concurrent
+requests and reports latency percentiles (total and time to first byte),
+throughput, errors and the server's peak RSS.
+
+Usage (from server/foodloop_api):
+    python benchmarks/load_test.py --target app --requests 200 --concurrency 16
+    python benchmarks/load_test.py --target main-ollama --provider-latency 0.3
+    FAKE_OPENAI_SLOW_RATE=0.1 python benchmarks/load_test.py --target main-auto
+    MEAL_CLASSIFIER_PATH=./fine_tuned_food_classifier python benchmarks/load_test.py --target classifier
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+
+from common import API_DIR, SIZES, peak_rss_mib, percentiles, synthetic_jpeg, write_results
+
+# target -> (module, path, request kind)
+TARGETS = {
+    "app": ("app", "/predict", "image+name"),
+    "main-openai": ("main", "/predict", "image"),
+    "main-ollama": ("main", "/predict/ollama", "image"),
+    "main-ollama-stream": ("main", "/predict/ollama/stream", "image"),
+    "main-gemini": ("main", "/predict/gemini", "image"),
+    "main-auto": ("main", "/predict/auto", "image"),
+    "classifier": ("finalfoodclassifier", "/predict", "json"),
+}
+
+FOODS = ["paneer butter masala", "fried rice", "dosa", "chicken curry", "fruit salad", "cheese sandwich"]
+
+
+def start_server(module, port, env):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=API_DIR, env=env,
+    )
+    return process
+
+
+def wait_until_up(port, process, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server on port {port} exited with {process.returncode}")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start within {timeout}s")
+
+
+def build_payloads(kind, count, distinct, size):
+    """Request bodies; ``distinct`` unique images so the result caches see realistic misses"""
+    width, height = SIZES[size]
+    images = [synthetic_jpeg(width, height, seed=i) for i in range(distinct)] if kind != "json" else []
+    payloads = []
+    for i in range(count):
+        if kind == "json":
+            payloads.append({"json": {"food": FOODS[i % len(FOODS)], "hours_old": random.uniform(0, 12),
+                                      "storage": "room temp"}})
+            continue
+        body = {"files": {"file": (f"img{i}.jpg", images[i % distinct], "image/jpeg")}}
+        if kind == "image+name":
+            body["data"] = {"name": "apple"}
+        payloads.append(body)
+    return payloads
+
+
+async def drive(url, payloads, concurrency, timeout):
+    """Total latency per request, plus time to first body byte (what streaming routes improve)"""
+    limit = asyncio.Semaphore(concurrency)
+    latencies, first_bytes, statuses = [], [], {}
+
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        async def one(body):
+            async with limit:
+                start = time.perf_counter()
+                try:
+                    async with client.stream("POST", url, **body) as response:
+                        first_byte = None
+                        async for chunk in response.aiter_raw():
+                            if first_byte is None and chunk:
+                                first_byte = time.perf_counter() - start
+                        first_bytes.append(first_byte if first_byte is not None else time.perf_counter() - start)
+                        status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(body) for body in payloads))
+        return time.perf_counter() - start, latencies, first_bytes, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=sorted(TARGETS), default="app")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--distinct-images", type=int, default=50)
+    parser.add_argument("--image-size", choices=sorted(SIZES), default="vga")
+    parser.add_argument("--provider-latency", type=float, default=0.5, help="seconds per fake LLM call")
+    parser.add_argument("--provider-error-rate", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--provider-port", type=int, default=8199)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    module, path, kind = TARGETS[args.target]
+    provider_url = f"http://127.0.0.1:{args.provider_port}"
+    env = {
+        **os.environ,
+        "FAKE_PROVIDER_LATENCY": str(args.provider_latency),
+        "FAKE_PROVIDER_ERROR_RATE": str(args.provider_error_rate),
+        "OPENAI_BASE_URL": f"{provider_url}/v1",
+        "OPENAI_API_KEY": "fake",
+        "GEMINI_API_ENDPOINT": provider_url,
+        "GEMINI_API_KEY": "fake",
+        "OLLAMA_URL": provider_url,
+        "FOODLOOP_BACKENDS": "openai,gemini,ollama",
+    }
+    env.pop("FAKE_GEMINI_LATENCY", None)
+
+    payloads = build_payloads(kind, args.requests, max(1, args.distinct_images), args.image_size)
+    providers = start_server("fake_providers", args.provider_port, env)
+    server = None
+    try:
+        wait_until_up(args.provider_port, providers, args.startup_timeout)
+        server = start_server(module, args.port, env)
+        wait_until_up(args.port, server, args.startup_timeout)
+
+        elapsed, latencies, first_bytes, statuses = asyncio.run(
+            drive(f"http://127.0.0.1:{args.port}{path}", payloads, args.concurrency, args.timeout))
+        provider_calls = httpx.get(f"{provider_url}/calls").json()
+        server_rss = peak_rss_mib(server.pid)
+    finally:
+        for process in (server, providers):
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+
+    stats = percentiles(latencies)
+    ok = statuses.get("200", 0)
+    result = {
+        "target": args.target, "path": path, "requests": args.requests, "concurrency": args.concurrency,
+        "seconds": round(elapsed, 3), "throughput_rps": round(args.requests / elapsed, 2),
+        "success_rate": round(ok / args.requests, 4), "statuses": statuses,
+        "latency_ms": stats, "first_byte_ms": percentiles(first_bytes), "server_peak_rss_mib": server_rss, "provider_calls": provider_calls,
+    }
+    print(f"{args.target}: {result['throughput_rps']} req/s, p50 {stats['p50']:.1f} ms, "
+          f"p95 {stats['p95']:.1f} ms, p99 {stats['p99']:.1f} ms, "
+          f"first byte p50 {result['first_byte_ms']['p50']:.1f} ms, statuses {statuses}, "
+          f"server peak RSS {server_rss} MiB")
+    write_results(f"load_{args.target}", [result], args.output, provider_latency=args.provider_latency,
+                  image_size=args.image_size, distinct_images=args.distinct_images)
+
+
+if __name__ == "__main__":
+    main()
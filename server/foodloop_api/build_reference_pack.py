@@ -0,0 +1,139 @@
+"""Build reference_pack.json: Gemini reference data for every food the service knows.
+
+Foods are the expanded_food_items.csv dishes plus the class_indices.json
+produce. Each one is asked once with the same prompt app.py uses live, at
+temperature 0, through a bounded LLMGateway. Foods already in the existing
+pack, or in a ReferenceCache SQLite file (--from-cache), are reused rather
+than asked again. Foods that fail are listed and left out, and the service
+still fetches those live. Rerun the script to fill the gaps.
+
+Usage (from server/foodloop_api):
+    python build_reference_pack.py
+    python build_reference_pack.py --from-cache reference_cache.db --concurrency 8
+    FAKE_GEMINI_LATENCY=0 python build_reference_pack.py --output /tmp/pack.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from llm_gateway import LLMGateway
+from meal_data import DEFAULT_DATA_PATH
+from reference_cache import normalize_food_name
+from reference_pack import (API_DIR, DEFAULT_PACK_PATH, ReferencePack, known_foods, parse_reference_json,
+                            reference_prompt, write_pack)
+
+DEFAULT_CLASS_INDICES = os.path.join(API_DIR, "class_indices.json")
+
+
+def gemini_gateway(model_name: str, concurrency: int, queue: int, timeout: float) -> LLMGateway:
+    if os.getenv("FAKE_GEMINI_LATENCY"):
+        from fake_gemini import FakeGeminiModel
+        model, request_options = FakeGeminiModel(latency=float(os.getenv("FAKE_GEMINI_LATENCY"))), {}
+    else:
+        model, request_options = real_gemini_model(model_name)
+    return LLMGateway(model, max_concurrency=concurrency, max_queue=queue, timeout=timeout,
+                      name="reference_pack", request_options=request_options)
+
+
+def real_gemini_model(model_name: str):
+    import google.generativeai as genai
+    from google.api_core.retry import Retry
+    if os.getenv("GEMINI_API_ENDPOINT"):
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"), transport="rest",
+                        client_options={"api_endpoint": os.getenv("GEMINI_API_ENDPOINT")})
+    else:
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    # Our own retry loop backs off between attempts; keep the SDK's bounded
+    return genai.GenerativeModel(model_name), {"retry": Retry(timeout=60)}
+
+
+def from_cache_db(path: str):
+    """Positive entries of a ReferenceCache SQLite file, expired or not"""
+    db = sqlite3.connect(path)
+    try:
+        rows = db.execute("SELECT key, value FROM reference_data WHERE negative = 0").fetchall()
+    finally:
+        db.close()
+    return {key: json.loads(value) for key, value in rows}
+
+
+async def generate_all(foods, gateway, retries):
+    results, failures = {}, {}
+    done = 0
+
+    async def one(food):
+        nonlocal done
+        for attempt in range(retries + 1):
+            try:
+                response = await gateway.generate_content(reference_prompt(food),
+                                                          generation_config={"temperature": 0})
+                results[food] = parse_reference_json(response.text)
+                failures.pop(food, None)
+                break
+            except Exception as e:
+                failures[food] = f"{type(e).__name__}: {e}"
+                if attempt < retries:
+                    await asyncio.sleep(min(2 ** attempt, 30))
+        done += 1
+        if done % 25 == 0 or done == len(foods):
+            print(f"  {done}/{len(foods)} foods, {len(failures)} failed", flush=True)
+
+    await asyncio.gather(*(one(food) for food in foods))
+    return results, failures
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default=os.getenv("REFERENCE_PACK_PATH", DEFAULT_PACK_PATH),
+                        help="pack to write (.json or .json.gz); an existing one is reused as a starting point")
+    parser.add_argument("--food-items", default=DEFAULT_DATA_PATH)
+    parser.add_argument("--class-indices", default=DEFAULT_CLASS_INDICES)
+    parser.add_argument("--from-cache", help="ReferenceCache SQLite file (REFERENCE_CACHE_DB) to reuse entries from")
+    parser.add_argument("--model", default=os.getenv("GEMINI_MODELS", "gemini-2.5-pro-preview-03-25").split(",")[0])
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--rebuild", action="store_true", help="ask Gemini again even for foods already packed")
+    parser.add_argument("--limit", type=int, help="only the first N missing foods (for a trial run)")
+    args = parser.parse_args()
+
+    foods = known_foods(args.food_items, args.class_indices)
+    known = set(foods)
+    packed = {} if args.rebuild else dict(ReferencePack.load(args.output).foods)
+    reused = len(packed)
+    if args.from_cache and not args.rebuild:
+        cached = from_cache_db(args.from_cache)
+        packed.update({normalize_food_name(k): v for k, v in cached.items() if normalize_food_name(k) in known})
+    missing = [food for food in foods if food not in packed]
+    if args.limit is not None:
+        missing = missing[:args.limit]
+    print(f"{len(foods)} known foods: {reused} already packed, {len(packed) - reused} from the cache, "
+          f"{len(missing)} to generate with {args.model}")
+
+    failures = {}
+    if missing:
+        gateway = gemini_gateway(args.model, args.concurrency, len(missing), args.timeout)
+        start = time.perf_counter()
+        generated, failures = asyncio.run(generate_all(missing, gateway, args.retries))
+        packed.update(generated)
+        print(f"generated {len(generated)} in {time.perf_counter() - start:.1f}s")
+
+    # Only foods we still know about; a renamed dish drops out of the pack
+    packed = {food: packed[food] for food in foods if food in packed}
+    header = write_pack(args.output, packed, args.model, [os.path.basename(args.food_items), os.path.basename(args.class_indices)])
+    print(f"wrote {args.output}: {header['count']}/{len(foods)} foods, version {header['version']}, "
+          f"{os.path.getsize(args.output) / 1024:.1f} KiB")
+    for food, error in sorted(failures.items()):
+        print(f"  failed: {food}: {error}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Export the fine-tuned meal-type classifier for CPU inference and check accuracy parity.
+
+Writes model.onnx and a dynamically int8-quantized model.int8.onnx next to the
+model, then compares every requested backend against the fp32 PyTorch model on
+the expanded_food_items.csv eval split (accuracy, agreement, latency, memory).
+Exits non-zero if a backend loses more than --tolerance accuracy.
+
+Usage (from server/foodloop_api):
+    python export_classifier.py --model ./fine_tuned_food_classifier --export
+    python export_classifier.py --model ./fine_tuned_food_classifier --check torch-int8,onnx
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+from typing import Optional
+
+import numpy as np
+import torch
+from transformers import DistilBertForSequenceClassification
+
+from meal_data import DEFAULT_DATA_PATH, load_food_items, train_eval_split
+from meal_runtime import ONNX_FILENAME, ONNX_INT8_FILENAME, load_meal_classifier
+
+
+class _LogitsOnly(torch.nn.Module):
+    """Plain-tensor forward so the ONNX graph has a single ``logits`` output"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+def export_onnx(model_path: str, output_dir: str):
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError:
+        sys.exit("ONNX export needs onnxruntime (pip install onnxruntime onnx)")
+
+    model = DistilBertForSequenceClassification.from_pretrained(model_path)
+    model.eval()
+    dummy = torch.ones((1, 8), dtype=torch.long)
+    fp32_path = os.path.join(output_dir, ONNX_FILENAME)
+    int8_path = os.path.join(output_dir, ONNX_INT8_FILENAME)
+    torch.onnx.export(
+        _LogitsOnly(model), (dummy, dummy), fp32_path,
+        input_names=["input_ids", "attention_mask"], output_names=["logits"],
+        dynamic_axes={"input_ids": {0: "batch", 1: "sequence"},
+                      "attention_mask": {0: "batch", 1: "sequence"},
+                      "logits": {0: "batch"}},
+        opset_version=17,
+        dynamo=False,
+    )
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    for path in (fp32_path, int8_path):
+        print(f"wrote {path} ({os.path.getsize(path) / 2**20:.1f} MiB)")
+
+
+def rss_mib() -> Optional[float]:
+    """Current resident set size, or None where it cannot be read (no /proc and no psutil)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        pass
+    try:
+        import resource  # Unix only; the peak rather than the current size
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return None
+
+
+def evaluate(model_path, backend, onnx_path, texts, labels, batch_size, latency_samples):
+    gc.collect()
+    before = rss_mib()
+    classifier = load_meal_classifier(model_path, backend=backend, onnx_path=onnx_path)
+    loaded = rss_mib()
+
+    predictions = []
+    for start in range(0, len(texts), batch_size):
+        predictions.extend(classifier.predict_batch(texts[start:start + batch_size]))
+
+    # Single-text latency, the shape of a typical /predict call
+    timings = []
+    for text in texts[:latency_samples]:
+        start = time.perf_counter()
+        classifier.predict_batch([text])
+        timings.append(time.perf_counter() - start)
+
+    report = {
+        "backend": backend,
+        "accuracy": float(np.mean([p == l for p, l in zip(predictions, labels)])),
+        "latency_ms_p50": float(np.percentile(timings, 50) * 1000),
+        "latency_ms_p95": float(np.percentile(timings, 95) * 1000),
+        "model_rss_mib": round(loaded - before, 1) if None not in (before, loaded) else None,
+    }
+    del classifier
+    return report, predictions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=os.getenv("MEAL_CLASSIFIER_PATH", "./fine_tuned_food_classifier"))
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH)
+    parser.add_argument("--output-dir", help="where to write the ONNX files (default: the model directory)")
+    parser.add_argument("--export", action="store_true", help="export model.onnx and model.int8.onnx first")
+    parser.add_argument("--check", default="torch-int8,onnx", help="backends to compare against fp32 torch")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="largest accepted accuracy drop")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--latency-samples", type=int, default=100)
+    parser.add_argument("--report", default="classifier_parity.json")
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or args.model
+    if args.export:
+        os.makedirs(output_dir, exist_ok=True)
+        export_onnx(args.model, output_dir)
+
+    _, eval_texts, _, eval_labels = train_eval_split(load_food_items(args.data))
+    onnx_path = os.path.join(output_dir, ONNX_INT8_FILENAME)
+    baseline, baseline_predictions = evaluate(args.model, "torch", None, eval_texts, eval_labels,
+                                              args.batch_size, args.latency_samples)
+    reports = [baseline]
+    for backend in (name.strip() for name in args.check.split(",") if name.strip()):
+        report, predictions = evaluate(args.model, backend, onnx_path if backend == "onnx" else None,
+                                       eval_texts, eval_labels, args.batch_size, args.latency_samples)
+        report["agreement_with_fp32"] = float(np.mean([a == b for a, b in zip(predictions, baseline_predictions)]))
+        report["passed"] = report["accuracy"] >= baseline["accuracy"] - args.tolerance
+        reports.append(report)
+
+    print(f"eval split: {len(eval_texts)} items")
+    for report in reports:
+        print(f"{report['backend']:>11}  acc {report['accuracy']:.4f}  "
+              f"p50 {report['latency_ms_p50']:6.2f} ms  p95 {report['latency_ms_p95']:6.2f} ms"
+              + (f"  +{report['model_rss_mib']:.0f} MiB" if report["model_rss_mib"] is not None else "")
+              + (f"  agree {report['agreement_with_fp32']:.4f}" if "agreement_with_fp32" in report else ""))
+    with open(args.report, "w") as f:
+        json.dump({"eval_items": len(eval_texts), "tolerance": args.tolerance, "results": reports}, f, indent=2)
+
+    sys.exit(0 if all(report.get("passed", True) for report in reports) else 1)
+
+
+if __name__ == "__main__":
+    main()
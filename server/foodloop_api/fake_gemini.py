@@ -0,0 +1,50 @@
+import json
+import time
+
+
+class FakeGeminiResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+REFERENCE_JSON = json.dumps({
+    "hsv_range": {"h": [20, 60], "s": [80, 200], "v": [120, 230]},
+    "brightness_range": [100, 200],
+    "vibrancy_range": [40, 80],
+    "spoilage_indicators": ["dark spots", "mold", "soft texture"],
+    "shelf_life": 5,
+})
+
+ASSESSMENT_JSON = json.dumps({
+    "assessment": "GOOD",
+    "confidence": 85,
+    "reasoning": "Fake assessment from the local Gemini stand-in.",
+    "recommendations": "None, this is a test response.",
+})
+
+
+def fake_gemini_text(prompt: str) -> str:
+    """Canned answer shaped like what the real model returns for each of our prompts"""
+    if "reference data" in prompt:
+        return REFERENCE_JSON
+    if "Rate quality" in prompt:
+        return "Good. The produce looks fresh with even colour and no visible spoilage."
+    return ASSESSMENT_JSON
+
+
+class FakeGeminiModel:
+    """Local stand-in for ``genai.GenerativeModel`` used for testing and load runs.
+
+    It sleeps for ``latency`` seconds (blocking, like the real client) and returns
+    canned JSON shaped like the real reference-data and assessment answers.
+    """
+
+    def __init__(self, latency: float = 0.5):
+        self.latency = latency
+        self.calls = 0
+
+    def generate_content(self, contents=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        prompt = contents if isinstance(contents, str) else str(contents[0])
+        return FakeGeminiResponse(fake_gemini_text(prompt))
@@ -0,0 +1,104 @@
+"""Local stand-ins for the OpenAI, Gemini and Ollama HTTP APIs, for tests and load runs.
+
+    FAKE_PROVIDER_LATENCY=0.8 uvicorn fake_providers:app --port 8100
+
+Then point the services at it:
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=fake
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8100 GEMINI_API_KEY=fake
+    OLLAMA_URL=http://127.0.0.1:8100
+
+FAKE_<PROVIDER>_LATENCY / _ERROR_RATE / _SLOW_RATE (e.g. FAKE_OPENAI_SLOW_RATE=0.1)
+override the shared settings per provider; a slow call takes 10x the latency,
+which is what the router's hedging is for.
+"""
+import asyncio
+import json
+import os
+import random
+import time
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from fake_gemini import fake_gemini_text
+
+LATENCY = float(os.getenv("FAKE_PROVIDER_LATENCY", "0.5"))
+ERROR_RATE = float(os.getenv("FAKE_PROVIDER_ERROR_RATE", "0"))
+SLOW_RATE = float(os.getenv("FAKE_PROVIDER_SLOW_RATE", "0"))
+TOKEN_DELAY = float(os.getenv("FAKE_OLLAMA_TOKEN_DELAY", "0.02"))
+
+app = FastAPI(title="Fake LLM providers")
+calls = {"openai": 0, "gemini": 0, "ollama": 0}
+
+
+def setting(provider: str, name: str, default: float) -> float:
+    return float(os.getenv(f"FAKE_{provider.upper()}_{name}", str(default)))
+
+
+async def simulate(provider: str):
+    calls[provider] += 1
+    latency = setting(provider, "LATENCY", LATENCY)
+    if random.random() < setting(provider, "SLOW_RATE", SLOW_RATE):
+        latency *= 10
+    await asyncio.sleep(latency)
+    if random.random() < setting(provider, "ERROR_RATE", ERROR_RATE):
+        raise HTTPException(status_code=503, detail=f"Simulated {provider} outage")
+
+
+@app.post("/v1/chat/completions")
+async def openai_chat(request: Request):
+    body = await request.json()
+    await simulate("openai")
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": "Fresh. Colour and brightness look normal."},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 40, "completion_tokens": 10, "total_tokens": 50},
+    }
+
+
+@app.post("/v1beta/models/{model}:generateContent")
+async def gemini_generate(model: str, request: Request):
+    body = await request.json()
+    await simulate("gemini")
+    texts = [part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", [])]
+    return {
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": fake_gemini_text("\n".join(texts))}]},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "usageMetadata": {"promptTokenCount": 300, "candidatesTokenCount": 60, "totalTokenCount": 360},
+    }
+
+
+@app.post("/api/generate")
+async def ollama_generate(request: Request):
+    body = await request.json()
+    text = "The fruit looks fresh: hue and brightness are in the normal range."
+    if not body.get("stream", True):
+        await simulate("ollama")
+        return {"model": body.get("model"), "response": text, "done": True}
+
+    calls["ollama"] += 1
+
+    async def tokens():
+        # Ollama streams one JSON object per line
+        await asyncio.sleep(LATENCY / 4)
+        for word in text.split(" "):
+            yield json.dumps({"model": body.get("model"), "response": word + " ", "done": False}) + "\n"
+            await asyncio.sleep(TOKEN_DELAY)
+        yield json.dumps({"model": body.get("model"), "response": "", "done": True}) + "\n"
+
+    return StreamingResponse(tokens(), media_type="application/x-ndjson")
+
+
+@app.get("/calls")
+async def call_counts():
+    return calls
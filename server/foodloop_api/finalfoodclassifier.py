@@ -1,73 +1,88 @@
-import torch
-from fastapi import FastAPI
-from pydantic import BaseModel
-from transformers import DistilBertTokenizer, DistilBertForSequenceClassification
+import os
+import asyncio
+from typing import Any, Dict, List
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, ValidationError
+from batching import MicroBatcher
+from meal_cascade import MealTypeCascade
+from meal_data import DEFAULT_DATA_PATH, load_food_items
+from rule_engine import RuleFile, DEFAULT_RULES_PATH
+from metrics import BATCH_SIZE, REGISTRY, instrument, metrics_response, stage
 
 # FastAPI app initialization
 app = FastAPI()
+instrument(app)
 
-# Loading fine-tuned model and tokenizer
-model_path = r"E:\Namrata\programming\using git\fine_tuned_food_classifier"  # Update the path if necessary
-model = DistilBertForSequenceClassification.from_pretrained(model_path)
-tokenizer = DistilBertTokenizer.from_pretrained(model_path)
-id2label = model.config.id2label  
+if os.getenv("INFERENCE_SERVER"):
+    # DistilBERT runs once in inference_server.py for every worker; torch is never imported here
+    from inference_server import RemoteMealClassifier, client_from_env
+    classifier = RemoteMealClassifier(client_from_env())
+else:
+    import torch
+    from meal_runtime import load_meal_classifier
+
+    # CPU threading for the forward pass (0 keeps torch's default)
+    if int(os.getenv("TORCH_NUM_THREADS", "0")):
+        torch.set_num_threads(int(os.getenv("TORCH_NUM_THREADS")))
+    if int(os.getenv("TORCH_INTEROP_THREADS", "0")):
+        torch.set_num_interop_threads(int(os.getenv("TORCH_INTEROP_THREADS")))
+
+    # Loading fine-tuned model and tokenizer
+    # MEAL_CLASSIFIER_BACKEND: torch (fp32), torch-int8 (dynamic quantization) or onnx (see export_classifier.py)
+    model_path = os.getenv("MEAL_CLASSIFIER_PATH", r"E:\Namrata\programming\using git\fine_tuned_food_classifier")
+    classifier = load_meal_classifier(
+        model_path,
+        backend=os.getenv("MEAL_CLASSIFIER_BACKEND", "torch"),
+        onnx_path=os.getenv("MEAL_CLASSIFIER_ONNX_PATH") or None,
+        num_threads=int(os.getenv("TORCH_NUM_THREADS", "0")),
+    )
+id2label = classifier.id2label
+
+# DistilBERT: meal types for a batch of texts in one forward pass (padded to the longest text)
+def predict_model_batch(texts):
+    BATCH_SIZE.observe(len(texts), model="distilbert")
+    with stage("meal_type_inference"):
+        return classifier.predict_batch(texts)
+
+# Cheaper tiers in front of DistilBERT: exact lookup, then a hashed n-gram model (MEAL_CASCADE=false disables)
+cascade = None
+if os.getenv("MEAL_CASCADE", "true").lower() == "true":
+    training_items = load_food_items(os.getenv("MEAL_CASCADE_DATA", DEFAULT_DATA_PATH))
+    cascade = MealTypeCascade(
+        training_items["text"].tolist(), training_items["label"].tolist(),
+        fallback=predict_model_batch,
+        threshold=float(os.getenv("MEAL_CASCADE_THRESHOLD", "0.9")),
+    )
+    REGISTRY.collect("foodloop_meal_cascade_answers_total", "Meal types answered per cascade tier", "counter",
+                     ["tier"], lambda: {(tier,): count for tier, count in cascade.stats.items()})
+
+# Predict meal types for a batch of texts, using the cheapest confident tier
+def predict_batch(texts):
+    if cascade is None:
+        return predict_model_batch(texts)
+    return cascade.predict_batch(texts)
 
 # Function to predict meal type
 def predict(text):
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True)
-    with torch.no_grad():
-        outputs = model(**inputs)
-    predicted_id = torch.argmax(outputs.logits, dim=1).item()
-    predicted_label = id2label[predicted_id]
-    return predicted_label
-
-# Segregating the types of foods based on keywords
-KEYWORDS = {
-    "meat": ["chicken", "mutton", "fish", "egg", "prawn", "beef"],
-    "dairy": ["paneer", "milk", "cheese", "cream", "butter", "lassi", "yogurt", "curd"],
-    "fried": ["samosa", "vada", "pakora", "bhaji"],
-    "rice": ["rice", "biryani", "pulao", "fried rice", "chawal"]
-}
-
-# Rule-based logic to assess food quality
+    return predict_batch([text])[0]
+
+# Concurrent /predict calls share forward passes
+meal_type_batcher = MicroBatcher(
+    predict_model_batch,
+    max_batch_size=int(os.getenv("MEAL_MAX_BATCH_SIZE", "32")),
+    max_wait_ms=float(os.getenv("MEAL_MAX_WAIT_MS", "5")),
+    name="distilbert",
+)
+
+# Keyword categories and safe-hour tables live in quality_rules.json and are reloaded on change
+quality_rules = RuleFile(os.getenv("QUALITY_RULES_PATH", DEFAULT_RULES_PATH))
+
+# Rule-based logic to assess food quality, vectorized over a batch of items
+def assess_quality_rule_based_batch(food_names, meal_types, hours_old, storages):
+    return quality_rules.get().evaluate(food_names, meal_types, hours_old, storages)
+
 def assess_quality_rule_based(food_name, meal_type, hours_old, storage):
-    food = food_name.lower()
-    meal_type = meal_type.lower()
-    storage = storage.lower()
-
-    is_meat = any(word in food for word in KEYWORDS["meat"])
-    is_dairy = any(word in food for word in KEYWORDS["dairy"])
-    is_fried = any(word in food for word in KEYWORDS["fried"])
-    is_rice_based = any(word in food for word in KEYWORDS["rice"])
-
-    # Random Guess for safe hours
-    max_safe_hours = 4 if storage == "room temp" else 24
-
-    # Adjust by meal type if necessary
-    if meal_type == "breakfast":
-        max_safe_hours = 3 if storage == "room temp" else 18
-    elif meal_type in ["lunch", "dinner"]:
-        max_safe_hours = 7 if storage == "room temp" else 24
-    elif meal_type == "snacks":
-        max_safe_hours = 9 if storage == "room temp" else 36
-
-    # Additional perishable/spoilage adjustments
-    if is_meat:
-        max_safe_hours -= 2
-    if is_dairy:
-        max_safe_hours -= 1
-    if is_fried:
-        max_safe_hours -= 1
-    if is_rice_based and storage == "room temp":
-        max_safe_hours -= 0.5
-
-    # Final decision
-    if hours_old > max_safe_hours:
-        return "Spoiled"
-    elif hours_old >= (max_safe_hours * 0.8):  # if it is more than/= 80% of max safe hours
-        return "Check Manually"
-    else:
-        return "Good"
+    return assess_quality_rule_based_batch([food_name], [meal_type], [hours_old], [storage])[0]
 
 # Pydantic model to receive input from the frontend
 class FoodInput(BaseModel):
@@ -77,9 +92,16 @@ class FoodInput(BaseModel):
 
 # POST endpoint to assess food quality
 @app.post("/predict")
-def assess_food_quality_from_text(food_input: FoodInput):
-    meal_type = predict(food_input.food)
-    quality = assess_quality_rule_based(food_input.food, meal_type, food_input.hours_old, food_input.storage)
+async def assess_food_quality_from_text(food_input: FoodInput):
+    # Cheap tiers answer inline; only unresolved texts wait for a DistilBERT batch
+    with stage("meal_type_cascade"):
+        meal_type = cascade.resolve([food_input.food])[0] if cascade is not None else None
+    if meal_type is None:
+        # Includes the wait for the batch to fill
+        with stage("meal_type_model"):
+            meal_type = await meal_type_batcher.submit(food_input.food)
+    with stage("rules"):
+        quality = assess_quality_rule_based(food_input.food, meal_type, food_input.hours_old, food_input.storage)
     
     return {
         "food": food_input.food,
@@ -88,4 +110,55 @@ def assess_food_quality_from_text(food_input: FoodInput):
         "storage": food_input.storage,
         "quality": quality
     }
+
+# Largest number of items accepted by /predict/batch
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "256"))
+
+# POST endpoint to assess many food items at once; results keep the input order
+@app.post("/predict/batch")
+async def assess_food_quality_batch(items: List[Dict[str, Any]]):
+    if len(items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_ITEMS} items per batch")
+
+    # Validate item by item so one bad entry doesn't reject the whole batch
+    results: List[Dict[str, Any]] = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, FoodInput.model_validate(item)))
+        except ValidationError as e:
+            results[index] = {"index": index, "error": e.errors(include_url=False, include_context=False)}
+
+    if valid:
+        inputs = [food_input for _, food_input in valid]
+        with stage("meal_type_batch"):
+            meal_types = await asyncio.to_thread(predict_batch, [food_input.food for food_input in inputs])
+        with stage("rules"):
+            qualities = assess_quality_rule_based_batch(
+                [food_input.food for food_input in inputs], meal_types,
+                [food_input.hours_old for food_input in inputs], [food_input.storage for food_input in inputs]
+            )
+        for (index, food_input), meal_type, quality in zip(valid, meal_types, qualities):
+            results[index] = {
+                "index": index,
+                "food": food_input.food,
+                "meal_type": meal_type,
+                "hours_old": food_input.hours_old,
+                "storage": food_input.storage,
+                "quality": quality
+            }
+
+    return {"results": results}
+
+@app.get("/stats")
+def classifier_stats():
+    return {
+        "cascade": cascade.snapshot() if cascade is not None else None,
+        "batcher": meal_type_batcher.snapshot(),
+    }
+
+@app.get("/metrics")
+def metrics():
+    return metrics_response()
+
 # uvicorn finalfoodclassifier:app --reload
\ No newline at end of file
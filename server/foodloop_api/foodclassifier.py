@@ -1,69 +1,150 @@
-import pandas as pd
+"""Fine-tune DistilBERT to classify dish names into meal types.
+
+Usage (from server/foodloop_api):
+    python foodclassifier.py --data expanded_food_items.csv --output ./fine_tuned_food_classifier
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
+import torch
 from sklearn.metrics import accuracy_score
+from sklearn.preprocessing import LabelEncoder
+from torch.utils.data import Dataset
 from transformers import (
-    DistilBertTokenizer,
+    DataCollatorWithPadding,
     DistilBertForSequenceClassification,
+    DistilBertTokenizerFast,
     Trainer,
-    TrainingArguments
-)
-import torch
-from torch.utils.data import Dataset
-
-# Load dataset present as expanded_food_item.csv
-df = pd.read_csv(r"e:\Namrata\programming\using git\FoodLoop\backend\foodloop_api\expanded_food_items.csv")
-
-# Encode labels
-label_encoder = LabelEncoder()
-df["label_encoded"] = label_encoder.fit_transform(df["label"])
-df["label_encoded"] = df["label_encoded"].astype("int64")
-
-# Create label mappings
-id2label = dict(enumerate(label_encoder.classes_))
-label2id = {v: k for k, v in id2label.items()}
-
-# Train-test split
-train_texts, eval_texts, train_labels, eval_labels = train_test_split(
-    df["text"].tolist(),
-    df["label_encoded"].tolist(),
-    test_size=0.2,
-    random_state=42,
-    stratify=df["label_encoded"]  # preserves label balance
+    TrainerCallback,
+    TrainingArguments,
 )
 
-# Tokenizer
-tokenizer = DistilBertTokenizer.from_pretrained("distilbert-base-uncased")
-train_encodings = tokenizer(train_texts, truncation=True, padding=True)
-eval_encodings = tokenizer(eval_texts, truncation=True, padding=True)
-
-# Custom Dataset class
+from meal_data import DEFAULT_DATA_PATH, load_food_items, train_eval_split
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fine-tune the meal-type classifier")
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH, help="CSV with text,label columns")
+    parser.add_argument("--output", default="./fine_tuned_food_classifier")
+    parser.add_argument("--base-model", default="distilbert-base-uncased")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--learning-rate", type=float, default=2e-5)
+    parser.add_argument("--max-length", type=int, default=64, help="dish names are short; longer ones are truncated")
+    parser.add_argument("--cache-dir", default="./.token_cache", help="pre-tokenized datasets are cached here")
+    parser.add_argument("--num-workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--no-bucketing", action="store_true", help="disable length-grouped batches")
+    return parser.parse_args()
+
+
+def tokenize_cached(tokenizer, texts, max_length, cache_dir):
+    """Token ids for ``texts`` (unpadded), cached on disk by content"""
+    digest = hashlib.sha256()
+    digest.update(f"{tokenizer.name_or_path}|{len(tokenizer)}|{max_length}".encode())
+    for text in texts:
+        digest.update(b"\0" + text.encode())
+    cache_path = os.path.join(cache_dir, f"{digest.hexdigest()[:16]}.pt")
+    if os.path.exists(cache_path):
+        return torch.load(cache_path)
+
+    input_ids = tokenizer(texts, truncation=True, max_length=max_length)["input_ids"]
+    os.makedirs(cache_dir, exist_ok=True)
+    torch.save(input_ids, cache_path)
+    return input_ids
+
+
+# Custom Dataset class: plain token id lists, padded per batch by the collator
 class FoodDataset(Dataset):
-    def __init__(self, encodings, labels):
-        self.encodings = encodings
+    def __init__(self, input_ids, labels):
+        self.input_ids = input_ids
         self.labels = labels
 
     def __getitem__(self, idx):
-        item = {key: torch.tensor(val[idx]) for key, val in self.encodings.items()}
-        item["labels"] = torch.tensor(self.labels[idx], dtype=torch.long)
-        return item
+        return {"input_ids": self.input_ids[idx], "labels": self.labels[idx]}
 
     def __len__(self):
         return len(self.labels)
 
 
-# Prepare Datasets
-train_dataset = FoodDataset(train_encodings, train_labels)
-eval_dataset = FoodDataset(eval_encodings, eval_labels)
+def rss_mib():
+    """Current resident set size, or None where it cannot be read (no /proc and no psutil)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        return None
+
+
+def process_peak_rss_mib():
+    """Peak resident set size over the whole process lifetime, or None where neither resource nor psutil is available"""
+    try:
+        import resource  # Unix only
+        # ru_maxrss is KiB on Linux
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        memory = psutil.Process().memory_info()
+        # peak_wset is the Windows peak working set; elsewhere fall back to the current RSS
+        return round(getattr(memory, "peak_wset", memory.rss) / 2**20, 1)
+    except ImportError:
+        return None
+
+
+class EpochStatsCallback(TrainerCallback):
+    """Logs wall-clock time and memory for every epoch.
+
+    ``peak_rss_mib`` is the largest RSS sampled after each step of that epoch,
+    so it can go down from one epoch to the next; ``process_peak_rss_mib``
+    is the high-water mark since the process started.
+    """
+
+    def __init__(self):
+        self.epochs = []
+        self._start = None
+        self._peak = None
+
+    def _sample(self):
+        rss = rss_mib()
+        if rss is not None:
+            self._peak = rss if self._peak is None else max(self._peak, rss)
+
+    def on_epoch_begin(self, args, state, control, **kwargs):
+        self._start = time.perf_counter()
+        self._peak = None
+        self._sample()
+        if torch.cuda.is_available():
+            torch.cuda.reset_peak_memory_stats()
+
+    def on_step_end(self, args, state, control, **kwargs):
+        self._sample()
+
+    def on_epoch_end(self, args, state, control, **kwargs):
+        self._sample()
+        stats = {
+            "epoch": round(state.epoch or 0),
+            "seconds": round(time.perf_counter() - self._start, 2),
+        }
+        if self._peak is not None:
+            stats["peak_rss_mib"] = round(self._peak, 1)
+        process_peak = process_peak_rss_mib()
+        if process_peak is not None:
+            stats["process_peak_rss_mib"] = process_peak
+        if torch.cuda.is_available():
+            stats["peak_cuda_mib"] = round(torch.cuda.max_memory_allocated() / 2**20, 1)
+        self.epochs.append(stats)
+        print("Epoch stats:", stats)
 
-# Load model
-model = DistilBertForSequenceClassification.from_pretrained(
-    "distilbert-base-uncased",
-    num_labels=len(label_encoder.classes_),
-    id2label=id2label,
-    label2id=label2id
-)
 
 # Accuracy calculation
 def compute_metrics(eval_pred):
@@ -72,46 +153,90 @@ def compute_metrics(eval_pred):
     acc = accuracy_score(labels, predictions)
     return {"accuracy": acc}
 
-# Training args
-training_args = TrainingArguments(
-    output_dir="./results",
-    num_train_epochs=5,
-    per_device_train_batch_size=8,
-    evaluation_strategy="epoch",
-    save_strategy="no",
-    learning_rate=2e-5,
-    weight_decay=0.01,
-    logging_dir="./logs"
-)
-
-# Trainer
-trainer = Trainer(
-    model=model,
-    args=training_args,
-    train_dataset=train_dataset,
-    eval_dataset=eval_dataset,
-    compute_metrics=compute_metrics
-)
-
-# Train and evaluate
-trainer.train()
-results = trainer.evaluate()
-print("Final Evaluation:", results)
-
-# Save model
-model.save_pretrained("./fine_tuned_food_classifier")
-tokenizer.save_pretrained("./fine_tuned_food_classifier")
-
-# Inference function
-def predict(text):
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True)
-    outputs = model(**inputs)
-    predicted_label_id = torch.argmax(outputs.logits, dim=1).item()
-    return id2label[predicted_label_id]
-
-# Example usage
-print("Prediction:", predict("paneer butter masala"))
-print("Prediction:", predict("dosa"))
-print("Prediction:", predict("fried rice"))
-
 
+def main():
+    args = parse_args()
+
+    # Load dataset and split it the same way the serving-side tools do
+    df = load_food_items(args.data)
+    train_texts, eval_texts, train_label_names, eval_label_names = train_eval_split(df)
+
+    # Encode labels
+    label_encoder = LabelEncoder()
+    label_encoder.fit(df["label"])
+    train_labels = label_encoder.transform(train_label_names).astype("int64").tolist()
+    eval_labels = label_encoder.transform(eval_label_names).astype("int64").tolist()
+
+    # Create label mappings
+    id2label = dict(enumerate(label_encoder.classes_))
+    label2id = {v: k for k, v in id2label.items()}
+
+    # Tokenizer (pre-tokenized once, then cached)
+    tokenizer = DistilBertTokenizerFast.from_pretrained(args.base_model)
+    train_dataset = FoodDataset(tokenize_cached(tokenizer, train_texts, args.max_length, args.cache_dir), train_labels)
+    eval_dataset = FoodDataset(tokenize_cached(tokenizer, eval_texts, args.max_length, args.cache_dir), eval_labels)
+
+    # Load model
+    model = DistilBertForSequenceClassification.from_pretrained(
+        args.base_model,
+        num_labels=len(label_encoder.classes_),
+        id2label=id2label,
+        label2id=label2id
+    )
+
+    # Training args: per-batch padding, length-bucketed batches, parallel loading
+    training_args = TrainingArguments(
+        output_dir="./results",
+        num_train_epochs=args.epochs,
+        per_device_train_batch_size=args.batch_size,
+        per_device_eval_batch_size=args.batch_size * 4,
+        eval_strategy="epoch",
+        save_strategy="no",
+        learning_rate=args.learning_rate,
+        weight_decay=0.01,
+        group_by_length=not args.no_bucketing,
+        dataloader_num_workers=args.num_workers,
+        logging_dir="./logs",
+        report_to=[],
+    )
+
+    epoch_stats = EpochStatsCallback()
+    trainer = Trainer(
+        model=model,
+        args=training_args,
+        train_dataset=train_dataset,
+        eval_dataset=eval_dataset,
+        data_collator=DataCollatorWithPadding(tokenizer),
+        compute_metrics=compute_metrics,
+        callbacks=[epoch_stats],
+    )
+
+    # Train and evaluate
+    start = time.perf_counter()
+    trainer.train()
+    results = trainer.evaluate()
+    print("Final Evaluation:", results)
+
+    # Save model
+    model.save_pretrained(args.output)
+    tokenizer.save_pretrained(args.output)
+    with open(os.path.join(args.output, "training_report.json"), "w") as f:
+        json.dump({"data": os.path.abspath(args.data), "rows": len(df), "epochs": epoch_stats.epochs,
+                   "total_seconds": round(time.perf_counter() - start, 2), "eval": results}, f, indent=2)
+
+    # Inference function
+    def predict(text):
+        inputs = tokenizer(text, return_tensors="pt", truncation=True).to(model.device)
+        with torch.inference_mode():
+            outputs = model(**inputs)
+        predicted_label_id = torch.argmax(outputs.logits, dim=1).item()
+        return id2label[predicted_label_id]
+
+    # Example usage
+    print("Prediction:", predict("paneer butter masala"))
+    print("Prediction:", predict("dosa"))
+    print("Prediction:", predict("fried rice"))
+
+
+if __name__ == "__main__":
+    main()
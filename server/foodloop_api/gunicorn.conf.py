@@ -0,0 +1,38 @@
+"""Gunicorn settings for sharing one copy of the models across workers.
+
+    gunicorn -c gunicorn.conf.py -w 4 finalfoodclassifier:app
+
+With GUNICORN_PRELOAD (the default) the app module, DistilBERT included, is
+imported once in the master, and the workers are forked from it. The weights
+are never written, so their pages stay copy-on-write shared. The master
+collects and then freezes its garbage-collector generations just before
+forking, then turns the collector back on. After that, collections in the
+master and the workers never touch (and so never copy) the frozen objects.
+
+Do not preload main.py with EFFICIENTNET in FOODLOOP_WARMUP: TensorFlow is not
+fork-safe once initialised. Run it in inference_server.py and set
+INFERENCE_SERVER (and the server's INFERENCE_SERVER_AUTHKEY) instead, which
+works with or without preloading.
+"""
+import gc
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+if preload_app:
+    # No collections while the app loads, so freed objects don't leave holes among the long-lived ones
+    gc.disable()
+
+
+def when_ready(server):
+    if preload_app:
+        gc.collect()
+        gc.freeze()
+        # Frozen objects are out of the collector's reach, so the master (which may run for weeks)
+        # and the workers forked from it collect as usual from here on
+        gc.enable()
+        server.log.info("Froze %d objects before forking workers", gc.get_freeze_count())
@@ -0,0 +1,125 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Longest side (in pixels) the feature engine works at. Phone photos are
+# downsampled to this before any metric is computed; 0 keeps full resolution.
+FEATURE_MAX_SIDE = int(os.getenv("FEATURE_MAX_SIDE", "512"))
+DOMINANT_COLOR_COUNT = 5
+
+# Possible mold colours as inclusive RGB boxes: blue, green and gray
+MOLD_COLOR_RANGES = np.array([
+    ([0, 0, 100], [100, 100, 255]),
+    ([0, 100, 0], [100, 255, 100]),
+    ([100, 100, 100], [180, 180, 180]),
+], dtype=np.uint8)
+
+
+def prepare_image(image: Image.Image, max_side: Optional[int] = None) -> Image.Image:
+    """Decode an image once as RGB, downsampled to the working resolution"""
+    max_side = FEATURE_MAX_SIDE if max_side is None else max_side
+    if max_side and max(image.size) > max_side:
+        # JPEG draft mode lets the decoder skip most of the work for big photos
+        image.draft("RGB", (max_side, max_side))
+    image = image.convert("RGB")
+    if max_side and max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.Resampling.BOX)
+    return image
+
+
+def _hsv_channels(rgb: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized RGB -> HSV on a (N, 3) uint8 array, bit-for-bit equal to PIL's "HSV" mode.
+
+    PIL's rgb2hsv keeps intermediates in C ``float`` but does some steps in
+    ``double`` (literals like ``2.0`` promote), and truncates to 0-255. Each
+    step below uses the same precision, which is what makes every hue match.
+    """
+    r, g, b = (rgb[:, i].astype(np.float32) for i in range(3))
+    maxc = np.maximum(np.maximum(r, g), b)
+    minc = np.minimum(np.minimum(r, g), b)
+    delta = maxc - minc
+    chromatic = delta > 0
+    cr = np.where(chromatic, delta, np.float32(1.0))
+
+    rc = (maxc - r) / cr
+    gc = (maxc - g) / cr
+    bc = (maxc - b) / cr
+    # float: bc - gc; double, stored back to float: 2.0 + rc - bc and 4.0 + gc - rc
+    h = np.where(r == maxc, (bc - gc).astype(np.float64),
+                 np.where(g == maxc, 2.0 + rc.astype(np.float64) - bc, 4.0 + gc.astype(np.float64) - rc))
+    h = h.astype(np.float32).astype(np.float64)
+    h = np.fmod(h / 6.0 + 1.0, 1.0).astype(np.float32).astype(np.float64)
+    h = np.where(chromatic, np.floor(h * 255.0), 0.0)
+    saturation = (delta / np.where(chromatic, maxc, np.float32(1.0))).astype(np.float64)
+    s = np.where(chromatic, np.floor(saturation * 255.0), 0.0)
+    return h, s, maxc
+
+
+def _dominant_colors(rgb: np.ndarray, top: int) -> List[Tuple[int, Tuple[int, int, int]]]:
+    """Most frequent exact colours as (count, (r, g, b)), like Image.getcolors"""
+    packed = (rgb[:, 0].astype(np.uint32) << 16) | (rgb[:, 1].astype(np.uint32) << 8) | rgb[:, 2]
+    values, counts = np.unique(packed, return_counts=True)
+    order = np.argsort(counts, kind="stable")[::-1][:top]
+    return [
+        (int(counts[i]), (int(values[i] >> 16), int((values[i] >> 8) & 0xFF), int(values[i] & 0xFF)))
+        for i in order
+    ]
+
+
+def extract_features(image: Image.Image, max_side: Optional[int] = None) -> Dict[str, Any]:
+    """Compute every visual feature used by the assessment from one RGB buffer"""
+    rgb_image = prepare_image(image, max_side)
+    rgb = np.asarray(rgb_image, dtype=np.uint8).reshape(-1, 3)
+    total_pixels = rgb.shape[0]
+
+    h, s, v = _hsv_channels(rgb)
+    avg_hsv = (round(float(h.mean()), 2), round(float(s.mean()), 2), round(float(v.mean()), 2))
+
+    # Same fixed-point luma as PIL's "L" conversion
+    luma = (rgb[:, 0].astype(np.uint32) * 19595 + rgb[:, 1].astype(np.uint32) * 38470
+            + rgb[:, 2].astype(np.uint32) * 7471 + 0x8000) >> 16
+    brightness = round(float(luma.mean()), 2)
+
+    vibrancy = round(float(rgb.std(dtype=np.float64)), 2)
+
+    # A pixel counts as mold once, even if it falls inside several colour ranges
+    lower, upper = MOLD_COLOR_RANGES[:, 0], MOLD_COLOR_RANGES[:, 1]
+    in_range = ((rgb[:, None, :] >= lower) & (rgb[:, None, :] <= upper)).all(axis=2)
+    mold_percentage = round(float(in_range.any(axis=1).sum()) / total_pixels * 100, 2)
+
+    return {
+        "avg_hsv": avg_hsv,
+        "brightness": brightness,
+        "vibrancy": vibrancy,
+        "mold_percentage": mold_percentage,
+        "dominant_colors": _dominant_colors(rgb, DOMINANT_COLOR_COUNT),
+    }
+
+
+def extract_features_array(rgb: np.ndarray, max_side: Optional[int] = None) -> Dict[str, Any]:
+    """``extract_features`` for an (H, W, 3) uint8 RGB array, the form the CPU pool passes around"""
+    return extract_features(Image.fromarray(rgb), max_side)
+
+
+def cv_image_stats(img_np: np.ndarray) -> Tuple[Tuple[float, float, float], float, float]:
+    """Blurred 224x224 HSV mean, brightness and vibrancy with OpenCV (main.py's /predict stats)"""
+    import cv2
+    img = cv2.resize(img_np, (224, 224))
+    blur = cv2.GaussianBlur(img, (7, 7), 0)
+    hsv = cv2.cvtColor(blur, cv2.COLOR_BGR2HSV)
+    avg_hsv = cv2.mean(hsv)[:3]
+    brightness = float(np.mean(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)))
+    vibrancy = float(np.std(img))
+    return avg_hsv, brightness, vibrancy
+
+
+def hsv_summary(img_np: np.ndarray) -> Tuple[List[float], float, float]:
+    """Full-frame HSV mean, brightness and saturation spread of an RGB array (prompt stats)"""
+    import cv2
+    hsv = cv2.cvtColor(img_np, cv2.COLOR_RGB2HSV)
+    avg_hsv = np.mean(hsv, axis=(0, 1)).tolist()
+    brightness = float(np.mean(cv2.cvtColor(img_np, cv2.COLOR_RGB2GRAY)))
+    vibrancy = float(np.std(hsv[..., 1]))
+    return avg_hsv, brightness, vibrancy
@@ -0,0 +1,234 @@
+"""Retrain only the meal-type classifier head, on cached frozen DistilBERT embeddings.
+
+Each row's [CLS] vector comes from a frozen encoder and is cached on disk,
+keyed by a hash of its text. A rerun after adding dishes to
+expanded_food_items.csv only encodes the new or changed rows. Then just the
+classification head (pre_classifier + classifier, as in
+DistilBertForSequenceClassification) is trained on the cached vectors. The
+encoder and the new head are saved together with save_pretrained, so
+finalfoodclassifier.py loads the output like any full fine-tune.
+
+The split and the accuracy are the same as foodclassifier.py's. Pass
+--full-model to compare against the last full fine-tune. Its accuracy is read
+from its training_report.json, or measured when that file is missing. If the
+head trails it by more than --max-gap, a full retrain is due.
+
+Use the last full fine-tune as --encoder: its encoder already knows this
+task, so a new head on top of it only has to absorb the new rows.
+
+Usage (from server/foodloop_api):
+    python incremental_train.py --encoder ./fine_tuned_food_classifier --output ./incremental_food_classifier \
+        --full-model ./fine_tuned_food_classifier
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import torch
+from sklearn.metrics import accuracy_score
+from sklearn.preprocessing import LabelEncoder
+from transformers import (DistilBertConfig, DistilBertForSequenceClassification, DistilBertModel,
+                          DistilBertTokenizerFast)
+
+from meal_data import DEFAULT_DATA_PATH, load_food_items, train_eval_split
+from meal_runtime import load_meal_classifier
+
+WEIGHT_FILES = ("model.safetensors", "pytorch_model.bin")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Retrain the meal-type classifier head on cached embeddings")
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH, help="CSV with text,label columns")
+    parser.add_argument("--encoder", default="distilbert-base-uncased",
+                        help="frozen encoder: a hub name or a fine-tuned model directory")
+    parser.add_argument("--output", default="./incremental_food_classifier")
+    parser.add_argument("--full-model", help="full fine-tune (foodclassifier.py output) to compare against")
+    parser.add_argument("--cache-dir", default="./.embedding_cache", help="per-text embeddings are cached here")
+    parser.add_argument("--max-length", type=int, default=64)
+    parser.add_argument("--embed-batch-size", type=int, default=64)
+    parser.add_argument("--epochs", type=int, default=60)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--learning-rate", type=float, default=1e-3)
+    parser.add_argument("--weight-decay", type=float, default=0.01)
+    parser.add_argument("--max-gap", type=float, default=0.02,
+                        help="accuracy the head may trail the full fine-tune by before a full retrain is advised")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()[:24]
+
+
+def encoder_fingerprint(encoder: str, max_length: int) -> str:
+    """Changes when the encoder's weights do, so stale vectors are never mixed in"""
+    parts = [encoder, str(max_length)]
+    for name in WEIGHT_FILES:
+        path = os.path.join(encoder, name)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            parts += [name, str(stat.st_size), str(int(stat.st_mtime))]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:16]
+
+
+class EmbeddingCache:
+    """[CLS] vectors by text hash, in one .npz file per encoder"""
+
+    def __init__(self, cache_dir: str, fingerprint: str):
+        self.path = os.path.join(cache_dir, f"cls-{fingerprint}.npz")
+        self.vectors = {}
+        if os.path.exists(self.path):
+            data = np.load(self.path)
+            self.vectors = dict(zip(data["keys"].tolist(), data["vectors"]))
+
+    def missing(self, texts):
+        return sorted({text for text in texts if text_key(text) not in self.vectors})
+
+    def add(self, texts, vectors):
+        self.vectors.update(zip((text_key(text) for text in texts), vectors))
+
+    def get(self, texts) -> np.ndarray:
+        return np.stack([self.vectors[text_key(text)] for text in texts])
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        keys = list(self.vectors)
+        tmp = self.path + ".tmp.npz"
+        np.savez(tmp, keys=np.array(keys), vectors=np.stack([self.vectors[key] for key in keys]))
+        os.replace(tmp, self.path)
+
+
+def load_encoder_with_new_head(encoder: str, id2label) -> DistilBertForSequenceClassification:
+    """A freshly initialised head on ``encoder``'s DistilBERT weights.
+
+    Loading ``encoder`` as a classifier would keep its old head whenever the
+    label count matches, so only the bare encoder is loaded and the head is
+    built from the config.
+    """
+    config = DistilBertConfig.from_pretrained(encoder, num_labels=len(id2label), id2label=id2label,
+                                              label2id={v: k for k, v in id2label.items()})
+    model = DistilBertForSequenceClassification(config)
+    model.distilbert = DistilBertModel.from_pretrained(encoder, config=config)
+    return model
+
+
+def embed(model, tokenizer, texts, max_length, batch_size) -> np.ndarray:
+    """Frozen encoder's [CLS] hidden state, the vector DistilBERT's head reads"""
+    # Similar lengths together, so each batch pads little
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    vectors = np.zeros((len(texts), model.config.dim), dtype=np.float32)
+    with torch.inference_mode():
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            inputs = tokenizer([texts[i] for i in batch], return_tensors="pt", truncation=True,
+                               max_length=max_length, padding=True)
+            hidden = model.distilbert(**inputs).last_hidden_state[:, 0]
+            vectors[batch] = hidden.numpy()
+    return vectors
+
+
+def head_logits(model, vectors: torch.Tensor) -> torch.Tensor:
+    """DistilBertForSequenceClassification's head on precomputed [CLS] vectors"""
+    pooled = torch.relu(model.pre_classifier(vectors))
+    return model.classifier(model.dropout(pooled))
+
+
+def train_head(model, train_x, train_y, args):
+    head = [model.pre_classifier, model.classifier]
+    parameters = [p for module in head for p in module.parameters()]
+    optimizer = torch.optim.AdamW(parameters, lr=args.learning_rate, weight_decay=args.weight_decay)
+    loss_fn = torch.nn.CrossEntropyLoss()
+    generator = torch.Generator().manual_seed(args.seed)
+    model.train()
+    for epoch in range(args.epochs):
+        for batch in torch.randperm(len(train_y), generator=generator).split(args.batch_size):
+            optimizer.zero_grad()
+            loss = loss_fn(head_logits(model, train_x[batch]), train_y[batch])
+            loss.backward()
+            optimizer.step()
+    model.eval()
+
+
+def head_accuracy(model, x, y) -> float:
+    with torch.inference_mode():
+        return accuracy_score(y.numpy(), head_logits(model, x).argmax(dim=1).numpy())
+
+
+def full_model_accuracy(path, eval_texts, eval_label_names):
+    """The full fine-tune's eval accuracy, from its report or measured on the same split"""
+    report_path = os.path.join(path, "training_report.json")
+    if os.path.exists(report_path):
+        with open(report_path) as f:
+            report = json.load(f)
+        accuracy = report.get("eval", {}).get("eval_accuracy")
+        if accuracy is not None and report.get("mode", "full") == "full":
+            return accuracy, "training_report.json"
+    classifier = load_meal_classifier(path)
+    predictions = []
+    for start in range(0, len(eval_texts), 64):
+        predictions.extend(classifier.predict_batch(eval_texts[start:start + 64]))
+    return accuracy_score(eval_label_names, predictions), "measured"
+
+
+def main():
+    args = parse_args()
+    torch.manual_seed(args.seed)
+    start = time.perf_counter()
+
+    df = load_food_items(args.data)
+    train_texts, eval_texts, train_label_names, eval_label_names = train_eval_split(df)
+    label_encoder = LabelEncoder()
+    label_encoder.fit(df["label"])
+    id2label = dict(enumerate(label_encoder.classes_))
+
+    tokenizer = DistilBertTokenizerFast.from_pretrained(args.encoder)
+    model = load_encoder_with_new_head(args.encoder, id2label)
+    model.distilbert.requires_grad_(False)
+    model.eval()
+
+    # Only rows whose text is new (or changed) go through the encoder
+    cache = EmbeddingCache(args.cache_dir, encoder_fingerprint(args.encoder, args.max_length))
+    missing = cache.missing(df["text"].tolist())
+    embed_start = time.perf_counter()
+    if missing:
+        cache.add(missing, embed(model, tokenizer, missing, args.max_length, args.embed_batch_size))
+        cache.save()
+    embed_seconds = time.perf_counter() - embed_start
+    print(f"{len(df)} rows: {len(df) - len(missing)} embeddings cached, {len(missing)} computed "
+          f"in {embed_seconds:.1f}s")
+
+    train_x, eval_x = torch.from_numpy(cache.get(train_texts)), torch.from_numpy(cache.get(eval_texts))
+    train_y = torch.tensor(label_encoder.transform(train_label_names), dtype=torch.long)
+    eval_y = torch.tensor(label_encoder.transform(eval_label_names), dtype=torch.long)
+
+    train_start = time.perf_counter()
+    train_head(model, train_x, train_y, args)
+    train_seconds = time.perf_counter() - train_start
+    accuracy = head_accuracy(model, eval_x, eval_y)
+    print(f"Head trained in {train_seconds:.1f}s, eval accuracy {accuracy:.4f}")
+
+    report = {"mode": "incremental", "data": os.path.abspath(args.data), "rows": len(df),
+              "encoder": args.encoder, "embeddings_computed": len(missing),
+              "embed_seconds": round(embed_seconds, 2), "train_seconds": round(train_seconds, 2),
+              "eval": {"eval_accuracy": accuracy}}
+    if args.full_model:
+        full_accuracy, source = full_model_accuracy(args.full_model, eval_texts, eval_label_names)
+        gap = full_accuracy - accuracy
+        report["full_model"] = {"path": args.full_model, "eval_accuracy": full_accuracy, "source": source,
+                                "gap": round(gap, 4), "full_retrain_advised": gap > args.max_gap}
+        print(f"Full fine-tune ({source}): {full_accuracy:.4f}, head trails by {gap:+.4f}"
+              + (" -> run foodclassifier.py" if gap > args.max_gap else ""))
+
+    model.save_pretrained(args.output)
+    tokenizer.save_pretrained(args.output)
+    report["total_seconds"] = round(time.perf_counter() - start, 2)
+    with open(os.path.join(args.output, "training_report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {args.output} in {report['total_seconds']:.1f}s total")
+
+
+if __name__ == "__main__":
+    main()
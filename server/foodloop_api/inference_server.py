@@ -0,0 +1,261 @@
+"""Local inference server: one process holds the models, the HTTP workers call it over IPC.
+
+Start it once per node, then start the API workers with INFERENCE_SERVER set
+to the same address:
+
+    export INFERENCE_SERVER_AUTHKEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+    INFERENCE_MODELS=distilbert python inference_server.py
+    INFERENCE_SERVER=<printed socket path> gunicorn -c gunicorn.conf.py -w 4 finalfoodclassifier:app
+
+Workers then never load TensorFlow or DistilBERT themselves, so each extra
+worker costs only the web process. Requests travel over
+multiprocessing.connection (a Unix socket, or host:port for TCP). Each worker
+still micro-batches its own calls; the server runs one batch per model at a
+time.
+
+Trust model: messages are pickles, and unpickling one can run arbitrary code.
+Whoever can connect and holds INFERENCE_SERVER_AUTHKEY can therefore run code
+as the server's user, so the key is as sensitive as a login. It has no
+default, and both the server and its clients refuse to start without it. The
+key only authenticates the handshake; traffic is not encrypted. So:
+
+- The default Unix socket lives in a directory only this user can enter
+  (mode 0700), and the socket itself is mode 0600. The server refuses a
+  socket directory that another user owns or can open.
+- TCP is for a private network between trusted hosts only. The server will
+  not bind it with a key shorter than MIN_TCP_AUTHKEY_BYTES.
+"""
+import getpass
+import os
+import queue
+import stat
+import tempfile
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_ADDRESS = os.path.join(os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir(),
+                               f"foodloop-inference-{getpass.getuser()}", "inference.sock")
+MIN_TCP_AUTHKEY_BYTES = 32
+INFERENCE_SERVER_TIMEOUT = float(os.getenv("INFERENCE_SERVER_TIMEOUT", "60"))
+
+
+class InferenceServerError(Exception):
+    """Raised when the inference server cannot be reached or a remote call fails"""
+
+
+def parse_address(address: str):
+    """'host:port' for TCP, anything else is a Unix socket path"""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return host, int(port)
+    return address
+
+
+def authkey_from_env() -> bytes:
+    """INFERENCE_SERVER_AUTHKEY, which has no default: a known key lets anyone run code in the server"""
+    key = os.getenv("INFERENCE_SERVER_AUTHKEY", "")
+    if not key:
+        raise InferenceServerError(
+            "INFERENCE_SERVER_AUTHKEY is not set; generate one with "
+            "python -c \"import secrets; print(secrets.token_hex(32))\" and give it to the server and the workers")
+    return key.encode()
+
+
+def private_socket_dir(path: str) -> str:
+    """Create the socket's directory as 0700, and refuse one that other users could reach into"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.lstat(directory)
+    if (not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid()
+            or stat.S_IMODE(info.st_mode) & 0o077):
+        raise InferenceServerError(
+            f"{directory} must be a directory owned by this user with mode 0700 to hold the inference socket")
+    return directory
+
+
+# Models the server can host: name -> () -> (predict(inputs), info)
+
+def load_efficientnet() -> Tuple[Callable, Dict[str, Any]]:
+    from tensorflow.keras.models import load_model
+    model = load_model(os.getenv("EFFICIENTNET_MODEL_PATH", "dataset/model/efficientnet_fruit_classifier.h5"))
+    return (lambda batch: np.asarray(model.predict_on_batch(batch.astype(np.float32)))), {}
+
+
+def load_distilbert() -> Tuple[Callable, Dict[str, Any]]:
+    from meal_runtime import load_meal_classifier
+    classifier = load_meal_classifier(
+        os.getenv("MEAL_CLASSIFIER_PATH", "fine_tuned_food_classifier"),
+        backend=os.getenv("MEAL_CLASSIFIER_BACKEND", "torch"),
+        onnx_path=os.getenv("MEAL_CLASSIFIER_ONNX_PATH") or None,
+        num_threads=int(os.getenv("TORCH_NUM_THREADS", "0")),
+    )
+    return classifier.predict_batch, {"id2label": classifier.id2label, "backend": classifier.backend}
+
+
+MODEL_LOADERS = {"efficientnet": load_efficientnet, "distilbert": load_distilbert}
+
+
+class InferenceServer:
+    """Serves ``predict`` and ``info`` calls for the loaded models, one thread per connection"""
+
+    def __init__(self, models: Dict[str, Tuple[Callable, Dict[str, Any]]], address: str = DEFAULT_ADDRESS,
+                 authkey: Optional[bytes] = None):
+        self.models = models
+        self.address = address
+        self.authkey = authkey or authkey_from_env()
+        self._locks = {name: threading.Lock() for name in models}
+        self.stats = {name: {"calls": 0, "items": 0, "errors": 0} for name in models}
+
+    @classmethod
+    def load(cls, names: Iterable[str], **kwargs) -> "InferenceServer":
+        models = {}
+        for name in names:
+            start = time.perf_counter()
+            models[name] = MODEL_LOADERS[name]()
+            print(f"loaded {name} in {time.perf_counter() - start:.1f}s", flush=True)
+        return cls(models, **kwargs)
+
+    def _call(self, op: str, name: str, payload):
+        predict, info = self.models[name]
+        if op == "info":
+            return info
+        if op != "predict":
+            raise ValueError(f"Unknown operation '{op}'")
+        stats = self.stats[name]
+        with self._locks[name]:
+            stats["calls"] += 1
+            stats["items"] += len(payload)
+            return predict(payload)
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    op, name, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    reply = ("ok", self._call(op, name, payload))
+                except Exception as e:
+                    if name in self.stats:
+                        self.stats[name]["errors"] += 1
+                    reply = ("error", f"{type(e).__name__}: {e}")
+                conn.send(reply)
+
+    def serve_forever(self):
+        address = parse_address(self.address)
+        if isinstance(address, str):
+            private_socket_dir(address)
+            if os.path.exists(address):
+                os.unlink(address)  # left over from a server that did not shut down cleanly
+        elif len(self.authkey) < MIN_TCP_AUTHKEY_BYTES:
+            raise InferenceServerError(
+                f"Refusing to listen on TCP {self.address} with a key shorter than {MIN_TCP_AUTHKEY_BYTES} bytes")
+        with Listener(address, authkey=self.authkey) as listener:
+            if isinstance(address, str):
+                os.chmod(address, 0o600)
+            print(f"serving {', '.join(self.models)} on {self.address}", flush=True)
+            while True:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, OSError, EOFError):
+                    continue  # failed handshake, e.g. a wrong authkey
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+
+class InferenceClient:
+    """Thread-safe client; reuses a small pool of open connections"""
+
+    def __init__(self, address: str, authkey: Optional[bytes] = None,
+                 timeout: float = INFERENCE_SERVER_TIMEOUT):
+        self.address = address
+        self.authkey = authkey or authkey_from_env()
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+
+    def _connection(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return Client(parse_address(self.address), authkey=self.authkey)
+        except OSError as e:
+            raise InferenceServerError(f"Inference server at {self.address} is not reachable: {e}") from e
+        except AuthenticationError as e:
+            raise InferenceServerError(f"Inference server at {self.address} rejected INFERENCE_SERVER_AUTHKEY") from e
+
+    def call(self, op: str, name: str, payload=None):
+        conn = self._connection()
+        try:
+            conn.send((op, name, payload))
+            if not conn.poll(self.timeout):
+                raise InferenceServerError(f"Inference server did not answer within {self.timeout}s")
+            status, value = conn.recv()
+        except (EOFError, OSError, InferenceServerError) as e:
+            # The connection may still carry a late reply, so it is never reused
+            conn.close()
+            if isinstance(e, InferenceServerError):
+                raise
+            raise InferenceServerError(f"Lost the connection to the inference server: {e}") from e
+        self._idle.put(conn)
+        if status == "error":
+            raise InferenceServerError(value)
+        return value
+
+    def predict(self, name: str, inputs):
+        return self.call("predict", name, inputs)
+
+    def info(self, name: str) -> Dict[str, Any]:
+        return self.call("info", name)
+
+
+def client_from_env() -> Optional[InferenceClient]:
+    """A client for INFERENCE_SERVER, or None when models are loaded in-process"""
+    address = os.getenv("INFERENCE_SERVER")
+    return InferenceClient(address) if address else None
+
+
+class RemoteKerasModel:
+    """Stands in for main.py's Keras EfficientNet; ``predict_on_batch`` runs on the server"""
+
+    def __init__(self, client: InferenceClient):
+        self.client = client
+
+    def predict_on_batch(self, batch):
+        # Resized 0-255 pixels are whole numbers, so uint8 carries them at a quarter of the bytes
+        return self.client.predict("efficientnet", np.asarray(batch).astype(np.uint8))
+
+
+class RemoteMealClassifier:
+    """Stands in for meal_runtime.MealClassifier in finalfoodclassifier.py"""
+
+    def __init__(self, client: InferenceClient):
+        self.client = client
+        info = client.info("distilbert")
+        self.id2label = {int(k): v for k, v in info["id2label"].items()}
+        self.backend = f"remote:{info['backend']}"
+
+    def predict_batch(self, texts):
+        return self.client.predict("distilbert", list(texts))
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+    names = [name.strip() for name in os.getenv("INFERENCE_MODELS", "efficientnet,distilbert").split(",")
+             if name.strip()]
+    server = InferenceServer.load(names, address=os.getenv("INFERENCE_SERVER", DEFAULT_ADDRESS))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
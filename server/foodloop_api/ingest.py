@@ -0,0 +1,134 @@
+"""Image ingestion shared by the image routes: capped upload, reduced decode, LLM payload.
+
+``ingest_upload`` reads an upload in chunks and stops with ``UploadTooLargeError``
+once it passes ``MAX_UPLOAD_BYTES``. It then decodes it once, straight to a
+working resolution: JPEG draft mode lets libjpeg skip most of the IDCT work for
+phone photos. The result is an ``IngestedImage``: the original bytes (cache
+keys), one RGB image every feature path reads, and a size-bounded JPEG for the
+LLM call.
+"""
+import asyncio
+import io
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from image_features import prepare_image
+from metrics import stage
+
+# Largest accepted upload, in bytes
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 2**20)))
+# Longest side of the decoded working image; feature code and the LLM payload downsample from it
+INGEST_MAX_SIDE = int(os.getenv("INGEST_MAX_SIDE", "1024"))
+# Refuse images that would decode to more pixels than this (decompression bombs)
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(50_000_000)))
+# Image sent to the LLM: longest side, JPEG quality and a hard byte budget
+LLM_IMAGE_MAX_SIDE = int(os.getenv("LLM_IMAGE_MAX_SIDE", "768"))
+LLM_IMAGE_QUALITY = int(os.getenv("LLM_IMAGE_QUALITY", "85"))
+LLM_IMAGE_MAX_BYTES = int(os.getenv("LLM_IMAGE_MAX_BYTES", str(300_000)))
+
+CHUNK_SIZE = 256 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload is bigger than the configured limit"""
+
+
+class InvalidImageError(Exception):
+    """Raised when an upload cannot be decoded as an image"""
+
+
+class LLMPayloadTooLargeError(Exception):
+    """Raised when even a 1x1 JPEG does not fit LLM_IMAGE_MAX_BYTES"""
+
+
+class IngestedImage:
+    def __init__(self, raw: bytes, image: Image.Image, original_size: Tuple[int, int], format: Optional[str]):
+        self.raw = raw
+        self.image = image
+        self.original_size = original_size
+        self.format = format
+        self._array = None
+        self._llm_jpeg = {}
+
+    def array(self) -> np.ndarray:
+        """Read-only (H, W, 3) uint8 view of the working image, built once"""
+        if self._array is None:
+            self._array = np.asarray(self.image)
+        return self._array
+
+    def llm_jpeg(self, max_side: Optional[int] = None) -> bytes:
+        """JPEG for the LLM call, at most ``max_side`` (LLM_IMAGE_MAX_SIDE) pixels and LLM_IMAGE_MAX_BYTES"""
+        max_side = LLM_IMAGE_MAX_SIDE if max_side is None else max_side
+        if max_side not in self._llm_jpeg:
+            self._llm_jpeg[max_side] = encode_for_llm(self.raw, self.format, self.original_size, self.image, max_side)
+        return self._llm_jpeg[max_side]
+
+
+async def read_upload(file, max_bytes: Optional[int] = None) -> bytes:
+    """Read an UploadFile in chunks, giving up as soon as it passes ``max_bytes``"""
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLargeError(f"Upload is {file.size} bytes, the limit is {max_bytes}")
+    buffer = bytearray()
+    while chunk := await file.read(CHUNK_SIZE):
+        buffer += chunk
+        if len(buffer) > max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds the {max_bytes} byte limit")
+    return bytes(buffer)
+
+
+def decode_image(raw: bytes, max_side: Optional[int] = None) -> IngestedImage:
+    """Decode once at reduced scale into an RGB image no larger than ``max_side``"""
+    max_side = INGEST_MAX_SIDE if max_side is None else max_side
+    try:
+        image = Image.open(io.BytesIO(raw))
+    except Exception as e:
+        raise InvalidImageError("Unsupported or corrupt image file") from e
+    original_size, format = image.size, image.format
+    if original_size[0] * original_size[1] > MAX_IMAGE_PIXELS:
+        raise InvalidImageError(f"Image is {original_size[0]}x{original_size[1]}, "
+                                f"more than {MAX_IMAGE_PIXELS} pixels")
+    try:
+        image = prepare_image(image, max_side)
+    except Exception as e:
+        raise InvalidImageError(f"Could not decode the image: {e}") from e
+    return IngestedImage(raw, image, original_size, format)
+
+
+def encode_for_llm(raw: bytes, format: Optional[str], original_size: Tuple[int, int], image: Image.Image,
+                   max_side: Optional[int] = None) -> bytes:
+    """JPEG of at most ``max_side`` pixels that always fits LLM_IMAGE_MAX_BYTES"""
+    max_side = LLM_IMAGE_MAX_SIDE if max_side is None else max_side
+    # Small JPEGs go out untouched; everything else is re-encoded from the working image
+    if format == "JPEG" and max(original_size) <= max_side and len(raw) <= LLM_IMAGE_MAX_BYTES:
+        return raw
+    payload = image
+    if max(payload.size) > max_side:
+        payload = payload.copy()
+        payload.thumbnail((max_side, max_side), Image.Resampling.BILINEAR)
+    quality = LLM_IMAGE_QUALITY
+    # Lower quality first, then halve the size until the payload fits
+    while True:
+        buffer = io.BytesIO()
+        payload.save(buffer, format="JPEG", quality=quality, optimize=False)
+        if buffer.tell() <= LLM_IMAGE_MAX_BYTES:
+            return buffer.getvalue()
+        if quality > 60:
+            quality -= 15
+        elif max(payload.size) > 1:
+            payload = payload.resize((max(1, payload.width // 2), max(1, payload.height // 2)),
+                                     Image.Resampling.BILINEAR)
+        else:
+            raise LLMPayloadTooLargeError(
+                f"No JPEG fits LLM_IMAGE_MAX_BYTES={LLM_IMAGE_MAX_BYTES}; the smallest was {buffer.tell()} bytes")
+
+
+async def ingest_upload(file, max_bytes: Optional[int] = None, max_side: Optional[int] = None) -> IngestedImage:
+    """Capped read plus reduced decode (off the event loop) of one uploaded image"""
+    with stage("upload"):
+        raw = await read_upload(file, max_bytes)
+    with stage("decode"):
+        return await asyncio.to_thread(decode_image, raw, max_side)
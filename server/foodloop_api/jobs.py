@@ -0,0 +1,400 @@
+import asyncio
+import ipaddress
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple, Type
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+
+from metrics import REGISTRY
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "jobs.db")
+
+_queues = []
+REGISTRY.collect("foodloop_jobs", "Assessment jobs by status", "gauge", ["status"],
+                 lambda: {(status,): count for queue in _queues if queue.opened
+                          for status, count in queue.counts().items()})
+JOB_EVENTS = REGISTRY.counter("foodloop_job_events_total", "Job submissions, attempts and outcomes", ["event"])
+JOB_WAIT_SECONDS = REGISTRY.histogram("foodloop_job_wait_seconds", "Time from submission to the first attempt")
+
+
+class JobQueueFullError(Exception):
+    """Raised when the queue already holds ``max_depth`` unfinished jobs"""
+
+
+class CallbackURLError(ValueError):
+    """Raised for a callback URL the server must not POST to"""
+
+
+def check_callback_url(url: str, allowed_hosts: Iterable[str] = ()) -> Optional[str]:
+    """Refuse callback URLs that would let a client reach internal services (SSRF).
+
+    Hosts in ``allowed_hosts`` (exact names, or ".example.com" for a domain
+    and its subdomains) are trusted as they are. Any other host must resolve
+    only to public addresses: loopback, private, link-local (cloud metadata
+    at 169.254.169.254 included) and reserved ranges are rejected. Resolving
+    blocks, so call this off the event loop.
+
+    Returns the checked address to connect to (see ``pin_url``), or None for
+    an allowlisted host.
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower().rstrip(".")
+    if parts.scheme not in ("http", "https") or not host:
+        raise CallbackURLError("callback_url must be an http(s) URL")
+    for allowed in (entry.strip().lower() for entry in allowed_hosts if entry.strip()):
+        if host == allowed.lstrip(".") or (allowed.startswith(".") and host.endswith(allowed)):
+            return None
+    try:
+        addresses = list(dict.fromkeys(
+            info[4][0] for info in socket.getaddrinfo(host, parts.port or 80, proto=socket.IPPROTO_TCP)))
+    except (socket.gaierror, UnicodeError) as e:
+        raise CallbackURLError(f"callback_url host {host} cannot be resolved") from e
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise CallbackURLError(f"callback_url host {host} resolves to a non-public address")
+    return addresses[0].split("%")[0]
+
+
+def pin_url(url: str, address: str) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+    """``url`` rewritten to connect to ``address``, plus the Host header and TLS server name
+    (httpx request extension) that keep it addressed to the original host.
+
+    Posting to the checked address, rather than letting the client resolve the
+    name again, leaves no window for DNS to point it somewhere else.
+    """
+    parts = urlsplit(url)
+    ip = ipaddress.ip_address(address)
+    netloc = (f"[{ip}]" if ip.version == 6 else str(ip)) + (f":{parts.port}" if parts.port else "")
+    return (urlunsplit(parts._replace(netloc=netloc)), {"Host": parts.netloc.rpartition("@")[2]},
+            {"sni_hostname": parts.hostname})
+
+
+class JobQueue:
+    """Durable job queue over SQLite, worked by a fixed pool of asyncio workers.
+
+    ``submit`` stores the job and returns its ID at once; ``handler(payload,
+    data)`` runs later on one of ``workers`` tasks, highest priority first and
+    oldest first within a priority. Errors of a ``retry_on`` type are retried
+    with jittered exponential backoff up to ``max_attempts``; anything else
+    fails the job. Finished jobs are POSTed to their callback URL, if any; the
+    URL is checked again with ``check_callback_url`` before every attempt,
+    and the request goes to the address that check resolved.
+
+    Several uvicorn workers may share one ``db_path``: jobs are claimed with a
+    lease, renewed every ``lease / 3`` seconds while the handler runs, and a
+    job whose worker died is picked up again once its lease expires. Each
+    claim gets a new lease ID, and a run's outcome is recorded (and its
+    callback sent) only while it still holds the lease, so a run that lost
+    its lease cannot overwrite its successor. Delivery is at-least-once: a
+    handler may run more than once for the same job, but one outcome and one
+    callback are recorded.
+    The depth check and the insert share one write transaction, so
+    concurrent submitters (in any process) cannot overshoot ``max_depth``.
+    SQLite calls run on worker threads, serialised on the connection, never
+    on the event loop.
+    The database (and its directory) is created on ``start`` or first use,
+    not at construction, so importing the app leaves no files behind.
+    """
+
+    def __init__(self, handler: Callable[[Dict[str, Any], bytes], Awaitable[Dict[str, Any]]],
+                 db_path: str = ":memory:", workers: int = 4, max_depth: int = 500, max_attempts: int = 4,
+                 backoff: float = 2.0, max_backoff: float = 60.0, lease: float = 300.0,
+                 result_ttl: float = 24 * 3600, callback_timeout: float = 10.0, callback_attempts: int = 3,
+                 retry_on: Tuple[Type[BaseException], ...] = (), poll_interval: float = 1.0,
+                 callback_hosts: Iterable[str] = ()):
+        self.handler = handler
+        self.workers = workers
+        self.max_depth = max_depth
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.lease = lease
+        self.result_ttl = result_ttl
+        self.callback_timeout = callback_timeout
+        self.callback_attempts = callback_attempts
+        self.callback_hosts = tuple(callback_hosts)
+        self.retry_on = retry_on
+        self.poll_interval = poll_interval
+        self.db_path = db_path
+        self._connection: Optional[sqlite3.Connection] = None
+        # One connection shared by the threads; transactions must not interleave on it
+        self._lock = threading.RLock()
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        self._callbacks = set()
+        self._pruned_at = 0.0
+        _queues.append(self)
+
+    @property
+    def opened(self) -> bool:
+        return self._connection is not None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        with self._lock:
+            return self._connection or self._open()
+
+    def _open(self) -> sqlite3.Connection:
+        if self._connection is None:
+            if self.db_path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            db = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, priority INTEGER NOT NULL, payload TEXT NOT NULL, "
+                "data BLOB, callback_url TEXT, attempts INTEGER NOT NULL DEFAULT 0, run_after REAL NOT NULL, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL, result TEXT, error TEXT, "
+                "callback_status TEXT, lease_id TEXT)"
+            )
+            if "lease_id" not in {column[1] for column in db.execute("PRAGMA table_info(jobs)")}:
+                db.execute("ALTER TABLE jobs ADD COLUMN lease_id TEXT")  # databases from before leases had IDs
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, created_at)")
+            self._connection = db
+        return self._connection
+
+    # Submitting and reading
+
+    async def submit(self, payload: Dict[str, Any], data: bytes, priority: int = 0,
+                     callback_url: Optional[str] = None) -> Dict[str, Any]:
+        """Store a job and return its public view; raises JobQueueFullError at ``max_depth``"""
+        job = await asyncio.to_thread(self._submit, payload, data, priority, callback_url)
+        self._wakeup.set()
+        return job
+
+    def _submit(self, payload, data, priority, callback_url) -> Dict[str, Any]:
+        if time.time() - self._pruned_at > 60:
+            self._prune()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            db = self._db
+            # IMMEDIATE takes the write lock before counting (waiting out other writers up to the timeout),
+            # so no submitter in this or another process can slip in between the count and the insert
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                depth = self._depth()
+                if depth >= self.max_depth:
+                    db.execute("ROLLBACK")
+                    JOB_EVENTS.inc(event="rejected")
+                    raise JobQueueFullError(f"Job queue is full ({depth} jobs waiting), try again shortly")
+                db.execute(
+                    "INSERT INTO jobs (id, status, priority, payload, data, callback_url, run_after, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, QUEUED, priority, json.dumps(payload), data, callback_url, now, now),
+                )
+                db.execute("COMMIT")
+            except sqlite3.Error:
+                db.execute("ROLLBACK")
+                raise
+            JOB_EVENTS.inc(event="submitted")
+            return self._get(job_id)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, job_id)
+
+    def _get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, status, priority, payload, attempts, created_at, started_at, finished_at, result, "
+                "error, callback_url, callback_status FROM jobs WHERE id = ?", (job_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            (job_id, status, priority, payload, attempts, created_at, started_at, finished_at, result, error,
+             callback_url, callback_status) = row
+            job = {"job_id": job_id, "status": status, "priority": priority, **json.loads(payload),
+                   "attempts": attempts, "created_at": created_at, "started_at": started_at,
+                   "finished_at": finished_at}
+            if status == QUEUED:
+                job["position"] = self._position(priority, created_at)
+        if result is not None:
+            job["result"] = json.loads(result)
+        if error is not None:
+            job["error"] = error
+        if callback_url:
+            job["callback"] = {"url": callback_url, "status": callback_status}
+        return job
+
+    def _position(self, priority: int, created_at: float) -> int:
+        """Jobs ahead of this one (ignores retries still waiting out their backoff)"""
+        return self._db.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = ? AND (priority > ? OR (priority = ? AND created_at < ?))",
+            (QUEUED, priority, priority, created_at),
+        ).fetchone()[0]
+
+    def _depth(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)).fetchone()[0]
+
+    def counts(self) -> Dict[str, int]:
+        counts = dict.fromkeys((QUEUED, RUNNING, DONE, FAILED), 0)
+        with self._lock:
+            counts.update(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return counts
+
+    async def snapshot(self) -> Dict[str, Any]:
+        counts = await asyncio.to_thread(self.counts)
+        return {**counts, "depth": counts[QUEUED] + counts[RUNNING], "max_depth": self.max_depth,
+                "workers": self.workers, "running_here": sum(not task.done() for task in self._tasks)}
+
+    # Workers
+
+    def _claim(self) -> Optional[tuple]:
+        """Atomically lease the next ready job (or one whose lease ran out)"""
+        # While a job runs, run_after holds its lease expiry
+        now = time.time()
+        with self._lock:
+            return self._db.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = COALESCE(started_at, ?), "
+                "run_after = ?, lease_id = ? WHERE id = ("
+                "  SELECT id FROM jobs WHERE (status = ? AND run_after <= ?) OR (status = ? AND run_after <= ?)"
+                "  ORDER BY priority DESC, created_at LIMIT 1"
+                ") RETURNING id, lease_id, payload, data, attempts, created_at, started_at",
+                (RUNNING, now, now + self.lease, uuid.uuid4().hex, QUEUED, now, RUNNING, now),
+            ).fetchone()
+
+    def _update(self, sql: str, params: tuple) -> int:
+        with self._lock:
+            return self._db.execute(sql, params).rowcount
+
+    def _leased_update(self, job_id: str, lease_id: str, assignments: str, params: tuple) -> bool:
+        """Apply ``assignments`` only while this run still holds the job's lease"""
+        updated = self._update(f"UPDATE jobs SET {assignments} WHERE id = ? AND lease_id = ?",
+                               (*params, job_id, lease_id))
+        if not updated:
+            JOB_EVENTS.inc(event="lease_lost")
+        return bool(updated)
+
+    def _renew(self, job_id: str, lease_id: str) -> bool:
+        return self._leased_update(job_id, lease_id, "run_after = ?", (time.time() + self.lease,))
+
+    def _finish(self, job_id: str, lease_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+                error: Optional[str] = None) -> bool:
+        # The image is dropped once the job is final; only the verdict is kept
+        finished = self._leased_update(
+            job_id, lease_id, "status = ?, result = ?, error = ?, finished_at = ?, data = NULL, lease_id = NULL",
+            (status, None if result is None else json.dumps(result), error, time.time()),
+        )
+        if finished:
+            JOB_EVENTS.inc(event=status)
+        return finished
+
+    def _retry_delay(self, attempts: int) -> float:
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _heartbeat(self, job_id: str, lease_id: str):
+        """Keep renewing the lease while the handler runs; stop once another worker has taken it"""
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            if not await asyncio.to_thread(self._renew, job_id, lease_id):
+                return
+
+    async def _run(self, claimed):
+        job_id, lease_id, payload, data, attempts, created_at, started_at = claimed
+        if attempts == 1:
+            JOB_WAIT_SECONDS.observe(started_at - created_at)
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, lease_id))
+        try:
+            result = await self.handler(json.loads(payload), data)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back without spending an attempt (inline: this task is being cancelled)
+            self._leased_update(job_id, lease_id, "status = ?, attempts = attempts - 1, run_after = ?, lease_id = NULL",
+                                (QUEUED, time.time()))
+            raise
+        except self.retry_on as e:
+            if attempts < self.max_attempts:
+                JOB_EVENTS.inc(event="retried")
+                await asyncio.to_thread(
+                    self._leased_update, job_id, lease_id, "status = ?, error = ?, run_after = ?, lease_id = NULL",
+                    (QUEUED, str(e), time.time() + self._retry_delay(attempts)),
+                )
+                return
+            finished = await asyncio.to_thread(self._finish, job_id, lease_id, FAILED,
+                                               error=f"{e} (gave up after {attempts} attempts)")
+        except Exception as e:
+            finished = await asyncio.to_thread(self._finish, job_id, lease_id, FAILED, error=str(e))
+        else:
+            finished = await asyncio.to_thread(self._finish, job_id, lease_id, DONE, result=result)
+        finally:
+            heartbeat.cancel()
+        # A run that lost its lease leaves the outcome (and the callback) to the one that took it over
+        if finished:
+            await self._notify(job_id)
+
+    async def _worker(self):
+        while True:
+            claimed = await asyncio.to_thread(self._claim)
+            if claimed is None:
+                self._wakeup.clear()
+                try:
+                    # Woken by submit; the timeout catches retries coming due and other processes' jobs
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(claimed)
+
+    def start(self):
+        if not self._tasks:
+            self._prune()
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, *self._callbacks, return_exceptions=True)
+
+    def _prune(self):
+        self._pruned_at = time.time()
+        self._update("DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                     (DONE, FAILED, time.time() - self.result_ttl))
+
+    # Callbacks
+
+    async def _notify(self, job_id: str):
+        job = await self.get(job_id)
+        if job.get("callback"):
+            task = asyncio.create_task(self._post_callback(job))
+            self._callbacks.add(task)
+            task.add_done_callback(self._callbacks.discard)
+
+    async def _post_callback(self, job: Dict[str, Any]):
+        url = job.pop("callback")["url"]
+        status = "failed"
+        async with httpx.AsyncClient(timeout=self.callback_timeout) as client:
+            for attempt in range(self.callback_attempts):
+                try:
+                    # Re-resolved each time: the name may point somewhere else by now (DNS rebinding)
+                    address = await asyncio.to_thread(check_callback_url, url, self.callback_hosts)
+                except CallbackURLError as e:
+                    status = f"refused ({e})"
+                    break
+                # Sent to the address just checked, so the client cannot resolve the name to another one
+                target, headers, extensions = pin_url(url, address) if address else (url, {}, {})
+                try:
+                    # Redirects are not followed (httpx's default), so a public URL cannot bounce inward
+                    response = await client.post(target, json=job, headers=headers, extensions=extensions)
+                    if response.status_code < 500:
+                        status = f"delivered ({response.status_code})"
+                        break
+                except httpx.HTTPError:
+                    pass
+                if attempt + 1 < self.callback_attempts:
+                    await asyncio.sleep(self._retry_delay(attempt + 1))
+        JOB_EVENTS.inc(event="callback_delivered" if status.startswith("delivered") else "callback_failed")
+        await asyncio.to_thread(self._update, "UPDATE jobs SET callback_status = ? WHERE id = ?",
+                                (status, job["job_id"]))
@@ -0,0 +1,86 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from metrics import REGISTRY, llm_call
+
+_gateways = []
+REGISTRY.collect("foodloop_llm_gateway_calls", "Calls in flight to, or waiting for, each provider", "gauge",
+                 ["provider", "state"],
+                 lambda: {key: value for gateway in _gateways
+                          for key, value in (((gateway.name, "in_flight"), gateway.in_flight),
+                                             ((gateway.name, "waiting"), gateway.waiting))})
+
+
+class QueueFullError(Exception):
+    """Raised when too many requests are already waiting for the model provider"""
+
+
+class LLMTimeoutError(Exception):
+    """Raised when a model call does not finish within its timeout"""
+
+
+class LLMGateway:
+    """Non-blocking, bounded-concurrency front for a synchronous ``generate_content`` model.
+
+    Calls run on a dedicated thread pool so the event loop stays free. At most
+    ``max_concurrency`` calls are in flight towards the provider and at most
+    ``max_queue`` more may wait for a slot; anything beyond that is rejected with
+    ``QueueFullError`` instead of piling up.
+    """
+
+    def __init__(self, model, max_concurrency: int = 4, max_queue: int = 16, timeout: float = 30.0,
+                 name: str = "llm", request_options: Optional[dict] = None):
+        self.model = model
+        self.name = name
+        # Extra per-call SDK options, e.g. a retry policy bounded by the timeout
+        self.request_options = request_options or {}
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self._waiting = 0
+        self._in_flight = 0
+        _gateways.append(self)
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _release(self, _future):
+        self._in_flight -= 1
+        self._semaphore.release()
+
+    async def generate_content(self, contents, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run ``model.generate_content`` off the event loop with a timeout"""
+        with llm_call(self.name):
+            return await self._generate_content(contents, timeout, **kwargs)
+
+    async def _generate_content(self, contents, timeout: Optional[float], **kwargs) -> Any:
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            raise QueueFullError("Model provider queue is full, try again shortly")
+
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        timeout = self.timeout if timeout is None else timeout
+        self._in_flight += 1
+        call = functools.partial(self.model.generate_content, contents,
+                                 request_options={"timeout": timeout, **self.request_options}, **kwargs)
+        future = asyncio.get_running_loop().run_in_executor(self._executor, call)
+        # The slot is only freed once the provider call really returns, so
+        # timed-out calls still count towards the concurrency limit.
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"Model call timed out after {timeout}s")
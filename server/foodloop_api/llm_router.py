@@ -0,0 +1,259 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from llm_gateway import LLMTimeoutError, QueueFullError
+from metrics import REGISTRY
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+ROUTER_CALLS = REGISTRY.counter("foodloop_router_attempts_total", "Provider attempts made by the LLM router",
+                                ["route", "provider", "outcome"])
+_routers: List["LLMRouter"] = []
+REGISTRY.collect("foodloop_circuit_open", "1 while a provider's circuit breaker is open (0.5 half-open)", "gauge",
+                 ["route", "provider"],
+                 lambda: {(router.name, provider): {CLOSED: 0, HALF_OPEN: 0.5, OPEN: 1}[health.state]
+                          for router in _routers for provider, health in router.health.items()})
+
+
+class NoProviderAvailableError(Exception):
+    """Raised when every provider for a route is circuit-broken or failed differently, and there is no fallback"""
+
+
+class NoProvidersConfiguredError(Exception):
+    """Raised when a route has no providers at all (none listed, or none enabled) and no fallback"""
+
+
+class ProviderHealth:
+    """Rolling latency and error window for one provider, plus its circuit breaker.
+
+    The breaker opens after ``max_consecutive_failures`` failures in a row, or
+    when at least ``min_samples`` recent calls show an error rate of
+    ``error_threshold`` or more. After ``cooldown`` seconds it lets a single
+    probe through (half-open); the probe's outcome closes or re-opens it.
+    """
+
+    def __init__(self, window: int = 50, min_samples: int = 5, error_threshold: float = 0.5,
+                 max_consecutive_failures: int = 3, cooldown: float = 30.0):
+        self.samples = deque(maxlen=window)  # (seconds, ok)
+        self.min_samples = min_samples
+        self.error_threshold = error_threshold
+        self.max_consecutive_failures = max_consecutive_failures
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self._probing = False
+
+    def _refresh(self):
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+            self._probing = False
+
+    def available(self) -> bool:
+        self._refresh()
+        return self.state == CLOSED or (self.state == HALF_OPEN and not self._probing)
+
+    def acquire(self) -> bool:
+        """Whether a call may go out now; in half-open state only one probe at a time"""
+        if not self.available():
+            return False
+        if self.state == HALF_OPEN:
+            self._probing = True
+        return True
+
+    def record(self, seconds: float, ok: bool):
+        self.samples.append((seconds, ok))
+        if ok:
+            self.consecutive_failures = 0
+            self.state = CLOSED
+        else:
+            self.consecutive_failures += 1
+            if (self.state == HALF_OPEN or self.consecutive_failures >= self.max_consecutive_failures
+                    or (len(self.samples) >= self.min_samples and self.error_rate >= self.error_threshold)):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self, seconds: Optional[float] = None):
+        """A call ended without a verdict. A hedged call that lost still ran for
+        ``seconds``: a lower bound on its latency worth keeping, or a provider
+        that always loses would never look slow."""
+        if seconds is not None:
+            self.samples.append((seconds, True))
+        self._probing = False
+
+    @property
+    def error_rate(self) -> float:
+        return sum(not ok for _, ok in self.samples) / len(self.samples) if self.samples else 0.0
+
+    def latency(self, percentile: float) -> Optional[float]:
+        successes = [seconds for seconds, ok in self.samples if ok]
+        return float(np.percentile(successes, percentile)) if successes else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._refresh()
+        p50, p95 = self.latency(50), self.latency(95)
+        return {"state": self.state, "samples": len(self.samples), "error_rate": round(self.error_rate, 4),
+                "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None}
+
+
+class LLMRouter:
+    """Sends each request to the fastest healthy provider, hedging slow calls.
+
+    ``providers`` maps a name to ``async fn(request) -> str``. Candidates are the
+    providers in ``order`` whose breaker is not open, ranked by rolling p50
+    latency (providers without data first, so each one gets measured). If
+    the chosen call has not finished after its provider's p95 (clamped to
+    ``hedge_min_delay``, or ``hedge_delay`` before there is data) one hedged
+    duplicate goes to the next candidate and the first success wins. Failures
+    move on to the next candidate at once. When nothing is left, ``fallback``
+    (local inference) answers if given. Otherwise a timeout or full queue
+    that every provider hit is re-raised as is; anything else becomes
+    ``NoProviderAvailableError``. A route with no providers at all raises
+    ``NoProvidersConfiguredError`` instead.
+    """
+
+    def __init__(self, name: str, providers: Dict[str, Callable[[Any], Awaitable[Any]]], order: Sequence[str],
+                 fallback: Optional[Callable[[Any], Awaitable[Any]]] = None, hedge: bool = True,
+                 hedge_delay: float = 2.0, hedge_min_delay: float = 0.05, timeout: float = 60.0, **health_options):
+        unknown = [provider for provider in order if provider not in providers]
+        if unknown:
+            raise ValueError(f"Unknown providers for route {name}: {', '.join(unknown)}")
+        self.name = name
+        self.providers = providers
+        self.order = list(order)
+        self.fallback = fallback
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.timeout = timeout
+        self.health = {provider: ProviderHealth(**health_options) for provider in self.order}
+        self.stats = {"requests": 0, "hedged": 0, "fallbacks": 0, "failures": 0}
+        _routers.append(self)
+
+    @classmethod
+    def from_env(cls, name: str, providers, default_order: str, fallback=None, default_timeout: float = 60.0):
+        """Settings from ROUTER_<NAME>_PROVIDERS / _HEDGE / _HEDGE_DELAY / _TIMEOUT / _FALLBACK,
+        breaker settings from ROUTER_WINDOW / ROUTER_ERROR_THRESHOLD / ROUTER_MAX_FAILURES / ROUTER_COOLDOWN"""
+        prefix = f"ROUTER_{name.upper()}_"
+        order = [p.strip() for p in os.getenv(prefix + "PROVIDERS", default_order).split(",") if p.strip()]
+        use_fallback = os.getenv(prefix + "FALLBACK", "true").lower() == "true"
+        return cls(
+            name, providers, order,
+            fallback=fallback if use_fallback else None,
+            hedge=os.getenv(prefix + "HEDGE", "true").lower() == "true",
+            hedge_delay=float(os.getenv(prefix + "HEDGE_DELAY", "2.0")),
+            timeout=float(os.getenv(prefix + "TIMEOUT", str(default_timeout))),
+            window=int(os.getenv("ROUTER_WINDOW", "50")),
+            error_threshold=float(os.getenv("ROUTER_ERROR_THRESHOLD", "0.5")),
+            max_consecutive_failures=int(os.getenv("ROUTER_MAX_FAILURES", "3")),
+            cooldown=float(os.getenv("ROUTER_COOLDOWN", "30")),
+        )
+
+    def ranked(self) -> List[str]:
+        candidates = [provider for provider in self.order if self.health[provider].available()]
+        return sorted(candidates, key=lambda p: (self.health[p].latency(50) or 0.0, self.order.index(p)))
+
+    def _hedge_after(self, provider: str) -> float:
+        health = self.health[provider]
+        p95 = health.latency(95) if len(health.samples) >= health.min_samples else None
+        return max(self.hedge_min_delay, p95) if p95 is not None else self.hedge_delay
+
+    async def _attempt(self, provider: str, request) -> Any:
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(self.providers[provider](request), self.timeout)
+        except asyncio.TimeoutError:
+            self.health[provider].record(time.perf_counter() - start, ok=False)
+            ROUTER_CALLS.inc(route=self.name, provider=provider, outcome="timeout")
+            raise LLMTimeoutError(f"{provider} did not answer within {self.timeout}s")
+        except asyncio.CancelledError:
+            self.health[provider].release(time.perf_counter() - start)
+            ROUTER_CALLS.inc(route=self.name, provider=provider, outcome="cancelled")
+            raise
+        except QueueFullError:
+            # Our own backpressure, not a sign the provider is unhealthy
+            self.health[provider].release()
+            ROUTER_CALLS.inc(route=self.name, provider=provider, outcome="rejected")
+            raise
+        except Exception:
+            self.health[provider].record(time.perf_counter() - start, ok=False)
+            ROUTER_CALLS.inc(route=self.name, provider=provider, outcome="error")
+            raise
+        self.health[provider].record(time.perf_counter() - start, ok=True)
+        return result
+
+    async def call(self, request) -> Dict[str, Any]:
+        """``{"result", "provider", "hedged", "fallback"}`` from the first provider to succeed"""
+        self.stats["requests"] += 1
+        pending = self.ranked()
+        running: Dict[asyncio.Task, str] = {}
+        errors: Dict[str, BaseException] = {}
+        launched: List[str] = []
+        hedged = False
+
+        def launch() -> bool:
+            while pending:
+                provider = pending.pop(0)
+                if self.health[provider].acquire():
+                    running[asyncio.create_task(self._attempt(provider, request))] = provider
+                    launched.append(provider)
+                    return True
+            return False
+
+        launch()
+        try:
+            while running:
+                can_hedge = self.hedge and not hedged and pending and len(running) == 1
+                delay = self._hedge_after(next(iter(running.values()))) if can_hedge else None
+                done, _ = await asyncio.wait(running, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = launch() or hedged
+                    self.stats["hedged"] += hedged
+                    continue
+                for task in done:
+                    provider = running.pop(task)
+                    if task.exception() is None:
+                        outcome = "hedge_win" if hedged and provider != launched[0] else "win"
+                        ROUTER_CALLS.inc(route=self.name, provider=provider, outcome=outcome)
+                        return {"result": task.result(), "provider": provider, "hedged": hedged, "fallback": False}
+                    errors[provider] = task.exception()
+                if not running:
+                    launch()
+        finally:
+            for task in running:
+                task.cancel()
+
+        if self.fallback is not None:
+            try:
+                result = await self.fallback(request)
+            except Exception as e:
+                fallback_error = f"; fallback: {type(e).__name__}: {e}"
+            else:
+                self.stats["fallbacks"] += 1
+                ROUTER_CALLS.inc(route=self.name, provider="local", outcome="fallback")
+                return {"result": result, "provider": "local", "hedged": hedged, "fallback": True,
+                        "provider_errors": {provider: str(error) for provider, error in errors.items()}}
+        else:
+            fallback_error = ""
+        self.stats["failures"] += 1
+        if not self.order:
+            # Nothing was ever tried: a configuration problem, not an outage
+            raise NoProvidersConfiguredError(f"No providers configured for route {self.name}{fallback_error}")
+        kinds = {type(error) for error in errors.values()}
+        if len(kinds) == 1 and kinds <= {LLMTimeoutError, QueueFullError}:
+            raise list(errors.values())[-1]
+        detail = "; ".join(f"{provider}: {type(error).__name__}: {error}" for provider, error in errors.items())
+        raise NoProviderAvailableError(
+            f"No LLM provider available for {self.name} ({detail or 'all circuits open'}{fallback_error})"
+        ) from (list(errors.values())[-1] if errors else None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"order": self.order, "ranked": self.ranked(), "hedge": self.hedge, "timeout": self.timeout,
+                **self.stats, "providers": {provider: health.snapshot() for provider, health in self.health.items()}}
@@ -1,136 +1,436 @@
 
 import os
-import io
 import json
+import asyncio
 import base64
-import requests
+from contextlib import asynccontextmanager
 import numpy as np
 from dotenv import load_dotenv
 from PIL import Image
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import JSONResponse
-import cv2
-import google.generativeai as genai
-import openai
-from tensorflow.keras.models import load_model
+from fastapi import FastAPI, Request, UploadFile, File
+from fastapi.responses import JSONResponse, StreamingResponse
+from result_cache import ResultCache, content_key, perceptual_hash
+from batching import MicroBatcher
+from backends import Backends, BackendDisabledError
+from llm_gateway import LLMTimeoutError, QueueFullError
+from ingest import InvalidImageError, LLMPayloadTooLargeError, UploadTooLargeError, ingest_upload
+from image_features import cv_image_stats, hsv_summary
+from llm_router import LLMRouter, NoProviderAvailableError, NoProvidersConfiguredError
+from metrics import BATCH_SIZE, instrument, llm_call, metrics_response, stage, track_cache
+from payload import freshness_prompt, llm_image, log_payload, quality_prompt
+from workers import cpu_pool
 
 # Load environment variables
 load_dotenv()
 
-# Configure API keys
-openai.api_key = os.getenv("OPENAI_API_KEY")
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+# Local Ollama server (OpenAI honours OPENAI_BASE_URL on its own)
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+# Upper bound on one Gemini call, including the SDK's own retries
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "60"))
 
-app = FastAPI()
+# Heavy SDKs and models are imported on first use (or at warm-up), never at import time
+def load_efficientnet():
+    # INFERENCE_SERVER: the model lives once in inference_server.py, shared by every worker
+    if os.getenv("INFERENCE_SERVER"):
+        from inference_server import RemoteKerasModel, client_from_env
+        return RemoteKerasModel(client_from_env())
+    from tensorflow.keras.models import load_model
+    return load_model(os.getenv("EFFICIENTNET_MODEL_PATH", "dataset/model/efficientnet_fruit_classifier.h5"))
 
-# Load your model and class indices
-model = load_model("dataset/model/efficientnet_fruit_classifier.h5")
+def load_openai():
+    import openai
+    openai.api_key = os.getenv("OPENAI_API_KEY")
+    return openai
+
+def load_gemini():
+    import google.generativeai as genai
+    # GEMINI_API_ENDPOINT points the SDK at another host over REST, e.g. fake_providers.py
+    if os.getenv("GEMINI_API_ENDPOINT"):
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"), transport="rest",
+                        client_options={"api_endpoint": os.getenv("GEMINI_API_ENDPOINT")})
+    else:
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    return genai
+
+def load_ollama():
+    from ollama_client import OllamaClient
+    return OllamaClient(
+        OLLAMA_URL,
+        model=os.getenv("OLLAMA_MODEL", "deepseek-r1:latest"),
+        max_concurrency=int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2")),
+        max_queue=int(os.getenv("OLLAMA_MAX_QUEUE", "8")),
+        connect_timeout=float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5")),
+        read_timeout=float(os.getenv("OLLAMA_READ_TIMEOUT", "60")),
+        total_timeout=float(os.getenv("OLLAMA_TOTAL_TIMEOUT", "300")),
+    )
+
+def load_opencv():
+    import cv2
+    return cv2
+
+# FOODLOOP_BACKENDS limits what this worker may load, e.g. "ollama" for an LLM-only deployment;
+# FOODLOOP_WARMUP lists backends to load at startup ("all" for every enabled one)
+ALL_BACKENDS = {
+    "efficientnet": load_efficientnet,
+    "openai": load_openai,
+    "gemini": load_gemini,
+    "ollama": load_ollama,
+    "opencv": load_opencv,
+}
+ENABLED_BACKENDS = [name.strip() for name in os.getenv("FOODLOOP_BACKENDS", ",".join(ALL_BACKENDS)).split(",") if name.strip()]
+backends = Backends(ALL_BACKENDS, enabled=set(ENABLED_BACKENDS) | {"opencv"})
+WARMUP_BACKENDS = backends.warm_up_names(os.getenv("FOODLOOP_WARMUP", ""))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so the process answers /ready (with 503) while loading
+    warm_up = asyncio.create_task(asyncio.to_thread(backends.warm_up, WARMUP_BACKENDS)) if WARMUP_BACKENDS else None
+    # Process pools spawn their workers here instead of on the first requests
+    pool_start = asyncio.create_task(asyncio.to_thread(cpu_pool.warm_up))
+    yield
+    await pool_start
+    if warm_up is not None:
+        await warm_up
+    cpu_pool.shutdown()
+    if backends.is_loaded("ollama"):
+        await backends.get("ollama").aclose()
+
+app = FastAPI(lifespan=lifespan)
+instrument(app)
+
+@app.exception_handler(BackendDisabledError)
+async def backend_disabled_handler(request: Request, exc: BackendDisabledError):
+    return JSONResponse(status_code=503, content={"error": str(exc)})
+
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request: Request, exc: QueueFullError):
+    return JSONResponse(status_code=503, content={"error": str(exc)}, headers={"Retry-After": "5"})
+
+@app.exception_handler(LLMTimeoutError)
+async def llm_timeout_handler(request: Request, exc: LLMTimeoutError):
+    return JSONResponse(status_code=504, content={"error": str(exc)})
+
+@app.exception_handler(NoProviderAvailableError)
+async def no_provider_handler(request: Request, exc: NoProviderAvailableError):
+    return JSONResponse(status_code=503, content={"error": str(exc)}, headers={"Retry-After": "5"})
+
+@app.exception_handler(NoProvidersConfiguredError)
+async def no_providers_configured_handler(request: Request, exc: NoProvidersConfiguredError):
+    # Retrying will not help until ROUTER_<ROUTE>_PROVIDERS or FOODLOOP_BACKENDS change
+    return JSONResponse(status_code=503, content={"error": str(exc)})
+
+@app.exception_handler(UploadTooLargeError)
+async def upload_too_large_handler(request: Request, exc: UploadTooLargeError):
+    return JSONResponse(status_code=413, content={"error": str(exc)})
+
+@app.exception_handler(LLMPayloadTooLargeError)
+async def llm_payload_too_large_handler(request: Request, exc: LLMPayloadTooLargeError):
+    return JSONResponse(status_code=413, content={"error": str(exc)})
+
+@app.exception_handler(InvalidImageError)
+async def invalid_image_handler(request: Request, exc: InvalidImageError):
+    return JSONResponse(status_code=400, content={"error": str(exc)})
+
+# Load class indices (the model itself is loaded lazily through `backends`)
 with open("class_indices.json", "r") as f:
     class_indices = json.load(f)
     class_names = list(class_indices.keys())
 
+
+# Local EfficientNet inference: batching and LLM fallback settings
+MODEL_INPUT_SIZE = (224, 224)
+LOCAL_MAX_BATCH_SIZE = int(os.getenv("LOCAL_MAX_BATCH_SIZE", "16"))
+LOCAL_MAX_WAIT_MS = float(os.getenv("LOCAL_MAX_WAIT_MS", "10"))
+LOCAL_CONFIDENCE_THRESHOLD = float(os.getenv("LOCAL_CONFIDENCE_THRESHOLD", "0.7"))
+LOCAL_TOP_K = int(os.getenv("LOCAL_TOP_K", "3"))
+
+# Cache of LLM answers keyed on image content, per route
+result_cache = ResultCache(
+    max_entries=int(os.getenv("RESULT_CACHE_SIZE", "2048")),
+    perceptual=os.getenv("RESULT_CACHE_PERCEPTUAL", "false").lower() == "true",
+    max_distance=int(os.getenv("RESULT_CACHE_MAX_DISTANCE", "6")),
+    max_ttl=float(os.getenv("RESULT_CACHE_MAX_TTL", str(12 * 3600))),
+    shelf_life_fraction=float(os.getenv("RESULT_CACHE_SHELF_LIFE_FRACTION", "0.05")),
+)
+track_cache("result", result_cache)
+# No food name on these routes, so assume a typical produce shelf life
+DEFAULT_SHELF_LIFE_DAYS = float(os.getenv("DEFAULT_SHELF_LIFE_DAYS", "5"))
+
+async def cached_result(contents: bytes, img: Image.Image, route: str):
+    """Look up a previous answer for this image; returns (cache_key, phash, cached)"""
+    with stage("cache_lookup"):
+        key = content_key(contents, route)
+        # Resize and grayscale work, so off the event loop like the other image code
+        phash = await asyncio.to_thread(perceptual_hash, img) if result_cache.perceptual else None
+        return key, phash, result_cache.get(key, route, phash)
+
+def store_result(key: str, phash, route: str, payload: dict):
+    result_cache.put(key, route, payload, result_cache.ttl_for(DEFAULT_SHELF_LIFE_DAYS), phash)
+
 @app.get("/")
 def home():
     return {"message": "Welcome to Fruit Freshness Classifier API"}
 
-# Utility for HSV/brightness/vibrancy analysis
-def analyze_image(img_np):
-    img = cv2.resize(img_np, (224, 224))
-    blur = cv2.GaussianBlur(img, (7, 7), 0)
-    hsv = cv2.cvtColor(blur, cv2.COLOR_BGR2HSV)
-    avg_hsv = cv2.mean(hsv)[:3]
-    brightness = np.mean(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY))
-    vibrancy = np.std(img)
-    return avg_hsv, brightness, vibrancy
+@app.get("/metrics")
+def metrics():
+    return metrics_response()
+
+@app.get("/ready")
+def ready():
+    """Readiness: 200 once every warm-up backend is loaded, plus per-backend status"""
+    status = backends.status()
+    pending = [name for name in WARMUP_BACKENDS if not status[name]["loaded"]]
+    return JSONResponse(
+        status_code=503 if pending else 200,
+        content={"ready": not pending, "pending": pending, "backends": status},
+    )
+
+# HSV/brightness/vibrancy analysis runs on the CPU pool (workers.py), never on the event loop;
+# cv_image_stats for /predict and /predict/local, hsv_summary for the prompt-only routes
+async def image_stats(img_np, stats=hsv_summary):
+    with stage("features"):
+        return await cpu_pool.run(stats, img_np)
+
+# Keras EfficientNet rescales internally, so it takes raw 0-255 pixels
+def preprocess_for_model(img: Image.Image):
+    return np.asarray(img.resize(MODEL_INPUT_SIZE, Image.Resampling.BILINEAR), dtype=np.float32)
+
+def classify_batch(images):
+    """One forward pass over a batch of preprocessed images"""
+    BATCH_SIZE.observe(len(images), model="efficientnet")
+    with stage("local_inference"):
+        probabilities = backends.get("efficientnet").predict_on_batch(np.stack(images))
+    results = []
+    for probs in np.asarray(probabilities):
+        top = np.argsort(probs)[::-1][:LOCAL_TOP_K]
+        fresh = float(sum(p for name, p in zip(class_names, probs) if name.startswith("fresh_")))
+        label = class_names[top[0]]
+        results.append({
+            "label": label,
+            "produce": label.split("_", 1)[1],
+            "freshness": label.split("_", 1)[0],
+            "confidence": float(probs[top[0]]),
+            "fresh_probability": fresh,
+            "stale_probability": 1.0 - fresh,
+            "top_k": [{"label": class_names[i], "probability": float(probs[i])} for i in top],
+        })
+    return results
+
+local_batcher = MicroBatcher(classify_batch, max_batch_size=LOCAL_MAX_BATCH_SIZE,
+                             max_wait_ms=LOCAL_MAX_WAIT_MS, name="efficientnet")
 
 # LLM Analysis (OpenAI)
 def call_llm(avg_hsv, brightness, vibrancy):
     system_msg = "You are an expert in analyzing fruit freshness from image statistics."
-    user_msg = f"HSV: {avg_hsv}, Brightness: {brightness}, Vibrancy: {vibrancy}. How fresh is this fruit?"
-    response = openai.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": system_msg},
-            {"role": "user", "content": user_msg}
-        ]
-    )
+    user_msg = freshness_prompt(avg_hsv, brightness, vibrancy)
+    log_payload("openai", system_msg + "\n" + user_msg)
+    openai = backends.get("openai")
+    with llm_call("openai"):
+        response = openai.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": system_msg},
+                {"role": "user", "content": user_msg}
+            ]
+        )
     return response.choices[0].message.content.strip()
 
-# Ollama local LLM
-def analyze_with_ollama(avg_hsv, brightness, vibrancy):
-    prompt = (
-        f"Based on these image stats - HSV: {avg_hsv}, Brightness: {brightness}, Vibrancy: {vibrancy} - "
-        "how fresh is the fruit? Respond with a short description."
-    )
-    response = requests.post(
-        "http://localhost:11434/api/generate",
-        json={"model": "deepseek-r1:latest", "prompt": prompt, "stream": False}
-    )
-    return response.json()['response'].strip()
-
-# Gemini Vision text + image input
-def analyze_with_gemini(image: Image.Image, avg_hsv, brightness, vibrancy):
-    buffered = io.BytesIO()
-    image.save(buffered, format="JPEG")
-    img_bytes = buffered.getvalue()
-    prompt = f"""
-Analyze the quality of the food in the image based on:
-- HSV: {avg_hsv}
-- Brightness: {brightness:.2f}
-- Vibrancy: {vibrancy:.2f}
-
-Rate quality (Excellent/Good/Fair/Poor) and explain briefly.
-"""
+# Ollama local LLM (pooled async client, see ollama_client.py)
+def ollama_prompt(avg_hsv, brightness, vibrancy):
+    prompt = freshness_prompt(avg_hsv, brightness, vibrancy)
+    log_payload("ollama", prompt)
+    return prompt
+
+async def analyze_with_ollama(avg_hsv, brightness, vibrancy):
+    return await backends.get("ollama").generate(ollama_prompt(avg_hsv, brightness, vibrancy))
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Gemini Vision text + image input (img_bytes: the budget-sized JPEG from payload.py)
+def analyze_with_gemini(img_bytes: bytes, avg_hsv, brightness, vibrancy):
+    prompt = quality_prompt(avg_hsv, brightness, vibrancy)
+    log_payload("gemini", prompt, img_bytes)
+    genai = backends.get("gemini")
     model = genai.GenerativeModel("gemma-3-12b-it")
-    response = model.generate_content(
-        contents=[
-            {"text": prompt},
-            {
-                "inline_data": {
-                    "mime_type": "image/jpeg",
-                    "data": base64.b64encode(img_bytes).decode(),
+    from google.api_core.retry import Retry  # installed with the SDK, so imported lazily too
+    with llm_call("gemini"):
+        response = model.generate_content(
+            contents=[
+                {"text": prompt},
+                {
+                    "inline_data": {
+                        "mime_type": "image/jpeg",
+                        "data": base64.b64encode(img_bytes).decode(),
+                    }
                 }
-            }
-        ]
-    )
+            ],
+            # Without a retry deadline the SDK keeps retrying 5xx answers for minutes
+            request_options={"timeout": GEMINI_TIMEOUT, "retry": Retry(timeout=GEMINI_TIMEOUT)},
+        )
     return response.text.strip()
 
+# Provider router: every LLM route takes the fastest healthy provider from its list, hedges
+# slow calls and falls back to local EfficientNet when all of them fail. Each route's list is
+# ROUTER_<ROUTE>_PROVIDERS (see llm_router.py); by default a route keeps to its namesake provider.
+async def openai_provider(job):
+    return await asyncio.to_thread(call_llm, job["avg_hsv"], job["brightness"], job["vibrancy"])
+
+async def ollama_provider(job):
+    return await analyze_with_ollama(job["avg_hsv"], job["brightness"], job["vibrancy"])
+
+async def gemini_provider(job):
+    upload = job["upload"]
+    return await asyncio.to_thread(
+        lambda: analyze_with_gemini(llm_image(upload), job["avg_hsv"], job["brightness"], job["vibrancy"])
+    )
+
+async def local_provider(job):
+    prediction = await local_batcher.submit(preprocess_for_model(job["upload"].image))
+    return (f"{prediction['freshness'].capitalize()} {prediction['produce']} "
+            f"(local model, {prediction['confidence']:.0%} confidence)")
+
+LLM_PROVIDERS = {"openai": openai_provider, "ollama": ollama_provider, "gemini": gemini_provider}
+
+def make_router(name: str, default_order: str, fallback=local_provider, timeout: float = 60.0):
+    providers = {p: fn for p, fn in LLM_PROVIDERS.items() if p in backends.enabled}
+    default_order = ",".join(p for p in default_order.split(",") if p in providers)
+    return LLMRouter.from_env(name, providers, default_order, fallback, default_timeout=timeout)
+
+routers = {
+    "openai": make_router("openai", "openai"),
+    "ollama": make_router("ollama", "ollama", timeout=float(os.getenv("OLLAMA_TOTAL_TIMEOUT", "300"))),
+    "gemini": make_router("gemini", "gemini", timeout=GEMINI_TIMEOUT),
+    "auto": make_router("auto", "ollama,openai,gemini"),
+    # /predict/local already has the local answer, so no fallback there
+    "local": make_router("local", "gemini", fallback=None),
+}
+
+async def routed_llm(route: str, job: dict) -> dict:
+    with stage("llm"):
+        outcome = await routers[route].call(job)
+    payload = {"result": outcome["result"], "provider": outcome["provider"]}
+    if outcome["fallback"]:
+        payload["fallback"] = True
+    return payload
+
+def store_routed(key: str, phash, route: str, payload: dict):
+    # Local fallbacks are a stopgap, not worth caching
+    if not payload.get("fallback"):
+        store_result(key, phash, route, payload)
+
+@app.get("/router/stats")
+def router_stats():
+    """Rolling latency, error rate and breaker state per route and provider"""
+    return {name: router.snapshot() for name, router in routers.items()}
+
 @app.post("/predict")
 async def predict(file: UploadFile = File(...)):
-    contents = await file.read()
-    img = Image.open(io.BytesIO(contents)).convert("RGB")
-    img_np = np.array(img)
+    upload = await ingest_upload(file)
+    key, phash, cached = await cached_result(upload.raw, upload.image, "openai")
+    if cached is not None:
+        return JSONResponse(cached)
+    img_np = upload.array()
 
-    avg_hsv, brightness, vibrancy = analyze_image(img_np)
-    result = call_llm(avg_hsv, brightness, vibrancy)
+    avg_hsv, brightness, vibrancy = await image_stats(img_np, cv_image_stats)
+    job = {"upload": upload, "avg_hsv": avg_hsv, "brightness": brightness, "vibrancy": vibrancy}
 
-    return JSONResponse({
-        "result": result,
+    payload = {
+        **await routed_llm("openai", job),
         "hsv": avg_hsv,
         "brightness": brightness,
         "vibrancy": vibrancy
-    })
+    }
+    store_routed(key, phash, "openai", payload)
+    return JSONResponse(payload)
 
 @app.post("/predict/ollama")
 async def predict_ollama(file: UploadFile = File(...)):
-    contents = await file.read()
-    img = Image.open(io.BytesIO(contents)).convert("RGB")
-    img_np = np.array(img)
-    hsv = cv2.cvtColor(img_np, cv2.COLOR_RGB2HSV)
-    avg_hsv = np.mean(hsv, axis=(0, 1)).tolist()
-    brightness = np.mean(cv2.cvtColor(img_np, cv2.COLOR_RGB2GRAY))
-    vibrancy = np.std(hsv[..., 1])
-    result = analyze_with_ollama(avg_hsv, brightness, vibrancy)
-    return JSONResponse({"result": result})
+    upload = await ingest_upload(file)
+    key, phash, cached = await cached_result(upload.raw, upload.image, "ollama")
+    if cached is not None:
+        return JSONResponse(cached)
+    avg_hsv, brightness, vibrancy = await image_stats(upload.array())
+    job = {"upload": upload, "avg_hsv": avg_hsv, "brightness": brightness, "vibrancy": vibrancy}
+    payload = await routed_llm("ollama", job)
+    store_routed(key, phash, "ollama", payload)
+    return JSONResponse(payload)
+
+@app.post("/predict/ollama/stream")
+async def predict_ollama_stream(file: UploadFile = File(...)):
+    """Server-sent events: "stats" right away, a "token" per fragment, then "done" (or "error")"""
+    upload = await ingest_upload(file)
+    key, phash, cached = await cached_result(upload.raw, upload.image, "ollama")
+    avg_hsv, brightness, vibrancy = await image_stats(upload.array())
+    ollama = backends.get("ollama") if cached is None else None
+    if ollama is not None:
+        # Refuse with a 503 before the stream starts rather than mid-stream
+        ollama.check_capacity()
+
+    async def events():
+        yield sse_event("stats", {"hsv": avg_hsv, "brightness": brightness, "vibrancy": vibrancy})
+        if cached is not None:
+            yield sse_event("done", {**cached, "cached": True})
+            return
+        parts = []
+        try:
+            async for token in ollama.stream(ollama_prompt(avg_hsv, brightness, vibrancy)):
+                parts.append(token)
+                yield sse_event("token", {"token": token})
+        except Exception as e:
+            yield sse_event("error", {"error": str(e)})
+            return
+        result = "".join(parts).strip()
+        store_result(key, phash, "ollama", {"result": result})
+        yield sse_event("done", {"result": result})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.post("/predict/gemini")
 async def predict_gemini(file: UploadFile = File(...)):
-    contents = await file.read()
-    image = Image.open(io.BytesIO(contents)).convert("RGB")
-    img_np = np.array(image)
-    hsv = cv2.cvtColor(img_np, cv2.COLOR_RGB2HSV)
-    avg_hsv = np.mean(hsv, axis=(0, 1)).tolist()
-    brightness = np.mean(cv2.cvtColor(img_np, cv2.COLOR_RGB2GRAY))
-    vibrancy = np.std(hsv[..., 1])
-    result = analyze_with_gemini(image, avg_hsv, brightness, vibrancy)
-    return JSONResponse({"result": result})
+    upload = await ingest_upload(file)
+    key, phash, cached = await cached_result(upload.raw, upload.image, "gemini")
+    if cached is not None:
+        return JSONResponse(cached)
+    avg_hsv, brightness, vibrancy = await image_stats(upload.array())
+    job = {"upload": upload, "avg_hsv": avg_hsv, "brightness": brightness, "vibrancy": vibrancy}
+    payload = await routed_llm("gemini", job)
+    store_routed(key, phash, "gemini", payload)
+    return JSONResponse(payload)
+
+@app.post("/predict/auto")
+async def predict_auto(file: UploadFile = File(...)):
+    """Whichever configured LLM is fastest and healthy right now (ROUTER_AUTO_PROVIDERS)"""
+    upload = await ingest_upload(file)
+    key, phash, cached = await cached_result(upload.raw, upload.image, "auto")
+    if cached is not None:
+        return JSONResponse(cached)
+    avg_hsv, brightness, vibrancy = await image_stats(upload.array())
+    job = {"upload": upload, "avg_hsv": avg_hsv, "brightness": brightness, "vibrancy": vibrancy}
+    payload = await routed_llm("auto", job)
+    store_routed(key, phash, "auto", payload)
+    return JSONResponse(payload)
+
+@app.post("/predict/local")
+async def predict_local(file: UploadFile = File(...)):
+    upload = await ingest_upload(file)
+    with stage("preprocess"):
+        model_input = preprocess_for_model(upload.image)
+    # Includes the wait for the batch to fill
+    with stage("local_model"):
+        prediction = await local_batcher.submit(model_input)
+    prediction["source"] = "local"
+
+    # Only unsure predictions leave the box
+    if prediction["confidence"] < LOCAL_CONFIDENCE_THRESHOLD:
+        avg_hsv, brightness, vibrancy = await image_stats(upload.array(), cv_image_stats)
+        job = {"upload": upload, "avg_hsv": list(avg_hsv), "brightness": brightness, "vibrancy": vibrancy}
+        try:
+            routed = await routed_llm("local", job)
+            prediction["result"] = routed["result"]
+            prediction["source"] = routed["provider"]
+        except Exception as e:
+            # Still answer with the local guess if the LLM is unavailable
+            prediction["llm_error"] = str(e)
+    return JSONResponse(prediction)
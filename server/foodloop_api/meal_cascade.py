@@ -0,0 +1,105 @@
+"""Tiered meal-type classifier: exact lookup -> hashed n-gram model -> DistilBERT.
+
+Run as a script to compare the cascade with DistilBERT alone on the eval split:
+    MEAL_CLASSIFIER_PATH=./fine_tuned_food_classifier python meal_cascade.py
+"""
+import argparse
+import os
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from reference_cache import normalize_food_name
+
+TIERS = ("lookup", "ngram", "model")
+
+
+class MealTypeCascade:
+    """Answers from the cheapest tier that is confident enough.
+
+    1. ``lookup``: normalized exact match against the training CSV
+    2. ``ngram``: logistic regression on hashed character n-grams, used when its
+       top probability reaches ``threshold``
+    3. ``model``: everything else goes to ``fallback`` (DistilBERT)
+    """
+
+    def __init__(self, texts: Sequence[str], labels: Sequence[str],
+                 fallback: Optional[Callable[[List[str]], List[str]]] = None,
+                 threshold: float = 0.9, n_features: int = 2 ** 18):
+        self.fallback = fallback
+        self.threshold = threshold
+
+        votes: Dict[str, Counter] = {}
+        for text, label in zip(texts, labels):
+            votes.setdefault(normalize_food_name(text), Counter())[label] += 1
+        self.lookup = {key: counts.most_common(1)[0][0] for key, counts in votes.items()}
+
+        self.vectorizer = HashingVectorizer(analyzer="char_wb", ngram_range=(2, 4), n_features=n_features,
+                                            alternate_sign=False, norm="l2")
+        self.ngram_model = LogisticRegression(C=10.0, max_iter=1000)
+        self.ngram_model.fit(self.vectorizer.transform([normalize_food_name(t) for t in texts]), list(labels))
+        self.stats = {tier: 0 for tier in TIERS}
+
+    def resolve(self, texts: Sequence[str]) -> List[Optional[str]]:
+        """Labels from the cheap tiers; None where DistilBERT is still needed"""
+        keys = [normalize_food_name(text) for text in texts]
+        labels: List[Optional[str]] = [self.lookup.get(key) for key in keys]
+        self.stats["lookup"] += sum(label is not None for label in labels)
+
+        pending = [i for i, label in enumerate(labels) if label is None]
+        if pending:
+            probabilities = self.ngram_model.predict_proba(self.vectorizer.transform([keys[i] for i in pending]))
+            best = probabilities.argmax(axis=1)
+            for i, column, probability in zip(pending, best, probabilities[np.arange(len(pending)), best]):
+                if probability >= self.threshold:
+                    labels[i] = self.ngram_model.classes_[column]
+                    self.stats["ngram"] += 1
+        self.stats["model"] += sum(label is None for label in labels)
+        return labels
+
+    def predict_batch(self, texts: Sequence[str]) -> List[str]:
+        labels = self.resolve(texts)
+        pending = [i for i, label in enumerate(labels) if label is None]
+        if pending:
+            for i, label in zip(pending, self.fallback([texts[i] for i in pending])):
+                labels[i] = label
+        return labels
+
+    def snapshot(self) -> Dict[str, object]:
+        total = sum(self.stats.values())
+        return {
+            "threshold": self.threshold,
+            "lookup_entries": len(self.lookup),
+            "counts": dict(self.stats),
+            "hit_ratios": {tier: round(count / total, 4) if total else 0.0 for tier, count in self.stats.items()},
+        }
+
+
+def main():
+    from meal_data import DEFAULT_DATA_PATH, load_food_items, train_eval_split
+    from meal_runtime import load_meal_classifier
+
+    parser = argparse.ArgumentParser(description="Compare the cascade with DistilBERT alone on the eval split")
+    parser.add_argument("--model", default=os.getenv("MEAL_CLASSIFIER_PATH", "./fine_tuned_food_classifier"))
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    args = parser.parse_args()
+
+    # Lookup and n-gram tiers only see the training split here, so eval rows are not leaked
+    train_texts, eval_texts, train_labels, eval_labels = train_eval_split(load_food_items(args.data))
+    classifier = load_meal_classifier(args.model)
+    cascade = MealTypeCascade(train_texts, train_labels, fallback=classifier.predict_batch, threshold=args.threshold)
+
+    model_only = classifier.predict_batch(eval_texts)
+    cascaded = cascade.predict_batch(eval_texts)
+    print(f"eval items:       {len(eval_texts)}")
+    print(f"DistilBERT only:  {np.mean([p == l for p, l in zip(model_only, eval_labels)]):.4f}")
+    print(f"cascade:          {np.mean([p == l for p, l in zip(cascaded, eval_labels)]):.4f}")
+    print(f"tier hit ratios:  {cascade.snapshot()['hit_ratios']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import os
+
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+DEFAULT_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "expanded_food_items.csv")
+EVAL_FRACTION = 0.2
+SPLIT_SEED = 42
+
+
+def load_food_items(path: str = DEFAULT_DATA_PATH) -> pd.DataFrame:
+    """Read the text,label CSV of dish names and meal types"""
+    df = pd.read_csv(path)
+    df["text"] = df["text"].astype(str)
+    return df
+
+
+def train_eval_split(df: pd.DataFrame):
+    """The stratified 80/20 split foodclassifier.py trains and evaluates on"""
+    return train_test_split(
+        df["text"].tolist(),
+        df["label"].tolist(),
+        test_size=EVAL_FRACTION,
+        random_state=SPLIT_SEED,
+        stratify=df["label"],
+    )
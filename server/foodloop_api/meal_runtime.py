@@ -0,0 +1,81 @@
+import os
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import torch
+from transformers import AutoConfig, DistilBertForSequenceClassification, DistilBertTokenizerFast
+
+BACKENDS = ("torch", "torch-int8", "onnx")
+ONNX_FILENAME = "model.onnx"
+ONNX_INT8_FILENAME = "model.int8.onnx"
+
+
+class MealClassifier:
+    """DistilBERT meal-type classifier behind a backend-neutral ``logits`` call"""
+
+    def __init__(self, tokenizer, id2label: Dict[int, str], forward: Callable[[dict], np.ndarray],
+                 backend: str, tensor_type: str):
+        self.tokenizer = tokenizer
+        self.id2label = {int(k): v for k, v in id2label.items()}
+        self.backend = backend
+        self._forward = forward
+        self._tensor_type = tensor_type
+
+    def logits(self, texts: Sequence[str]) -> np.ndarray:
+        # Dynamic padding: each batch is padded only to its own longest text
+        inputs = self.tokenizer(list(texts), return_tensors=self._tensor_type, truncation=True, padding=True)
+        return self._forward(inputs)
+
+    def predict_batch(self, texts: Sequence[str]) -> List[str]:
+        return [self.id2label[int(i)] for i in self.logits(texts).argmax(axis=1)]
+
+
+def _torch_forward(model) -> Callable[[dict], np.ndarray]:
+    def forward(inputs):
+        with torch.inference_mode():
+            return model(**inputs).logits.numpy()
+    return forward
+
+
+def _onnx_forward(onnx_path: str, num_threads: int) -> Callable[[dict], np.ndarray]:
+    try:
+        import onnxruntime as ort
+    except ImportError as e:
+        raise RuntimeError("The onnx backend needs onnxruntime (pip install onnxruntime)") from e
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+
+    def forward(inputs):
+        feed = {"input_ids": inputs["input_ids"].astype(np.int64),
+                "attention_mask": inputs["attention_mask"].astype(np.int64)}
+        return session.run(["logits"], feed)[0]
+    return forward
+
+
+def load_meal_classifier(model_path: str, backend: str = "torch", onnx_path: Optional[str] = None,
+                         num_threads: int = 0) -> MealClassifier:
+    """Load the fine-tuned classifier for CPU inference.
+
+    ``torch`` serves the fp32 weights, ``torch-int8`` applies dynamic int8
+    quantization to the Linear layers at load time and ``onnx`` runs an artifact
+    written by export_classifier.py (the int8 one by default) on ONNX Runtime.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown meal classifier backend '{backend}', expected one of {BACKENDS}")
+    tokenizer = DistilBertTokenizerFast.from_pretrained(model_path)
+
+    if backend == "onnx":
+        onnx_path = onnx_path or os.path.join(model_path, ONNX_INT8_FILENAME)
+        config = AutoConfig.from_pretrained(model_path)
+        return MealClassifier(tokenizer, config.id2label, _onnx_forward(onnx_path, num_threads), backend, "np")
+
+    model = DistilBertForSequenceClassification.from_pretrained(model_path)
+    # Inference only: weights are never written, so pages preloaded before a fork stay shared
+    model.eval()
+    model.requires_grad_(False)
+    if backend == "torch-int8":
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return MealClassifier(tokenizer, model.config.id2label, _torch_forward(model), backend, "pt")
@@ -0,0 +1,265 @@
+"""In-process metrics in the Prometheus text format, shared by the three APIs.
+
+Counters, gauges and histograms live in one process-wide ``REGISTRY`` and are
+rendered by each app's ``/metrics`` route. Values that other objects already
+count (cache stats, queue depths) are read at scrape time through collectors
+instead of being mirrored on every update.
+"""
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from profiling import SlowRequestProfiler
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}"
+
+
+class _Collector(_Metric):
+    """Metric whose values come from ``fn()`` at scrape time: {label values: value}"""
+
+    def __init__(self, name, help, kind, labelnames, fn: Callable[[], Dict[Tuple[str, ...], float]]):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.fn = fn
+
+    def samples(self) -> Iterable[str]:
+        for key, value in self.fn().items():
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Registry:
+    """Named metrics; asking again for an existing name returns the same metric"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, name, factory):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = factory()
+            return self._metrics[name]
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self._get_or_create(name, lambda: Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()) -> Gauge:
+        return self._get_or_create(name, lambda: Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(name, lambda: Histogram(name, help, labelnames, buckets))
+
+    def collect(self, name, help, kind, labelnames, fn):
+        """Register (or replace) a scrape-time collector"""
+        with self._lock:
+            self._metrics[name] = _Collector(name, help, kind, labelnames, fn)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception:
+                # A broken collector must not take the whole scrape down
+                continue
+            lines.extend(metric.header())
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Shared metrics: every API reports with the same names so dashboards can be reused
+REQUEST_SECONDS = REGISTRY.histogram("foodloop_request_seconds", "HTTP request latency",
+                                     ["route", "method", "status"])
+IN_FLIGHT = REGISTRY.gauge("foodloop_requests_in_flight", "HTTP requests currently being handled")
+STAGE_SECONDS = REGISTRY.histogram("foodloop_stage_seconds", "Time spent per request stage", ["stage"])
+LLM_CALLS = REGISTRY.counter("foodloop_llm_calls_total", "LLM provider calls by outcome",
+                             ["provider", "outcome"])
+LLM_SECONDS = REGISTRY.histogram("foodloop_llm_call_seconds", "LLM provider call latency", ["provider"])
+BATCH_SIZE = REGISTRY.histogram("foodloop_batch_size", "Items per model inference batch", ["model"],
+                                buckets=BATCH_BUCKETS)
+
+_caches: Dict[str, object] = {}
+
+
+def stage(name: str):
+    """``with stage("features"): ...`` records the block in the stage histogram"""
+    return STAGE_SECONDS.time(stage=name)
+
+
+@contextmanager
+def llm_call(provider: str):
+    """Counts and times one provider call; exceptions are recorded and re-raised"""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except (asyncio.CancelledError, GeneratorExit):
+        # The caller went away (e.g. a client left a stream early); says nothing about the provider
+        outcome = "cancelled"
+        raise
+    except Exception as e:
+        # Gateway rejections and timeouts are told apart from provider errors by class name
+        outcome = {"QueueFullError": "rejected", "LLMTimeoutError": "timeout"}.get(type(e).__name__, "error")
+        raise
+    finally:
+        LLM_CALLS.inc(provider=provider, outcome=outcome)
+        if outcome not in ("rejected", "cancelled"):
+            LLM_SECONDS.observe(time.perf_counter() - start, provider=provider)
+
+
+def track_cache(name: str, cache):
+    """Expose a cache's ``stats`` counters and ``snapshot()['hit_ratio']`` at scrape time"""
+    _caches[name] = cache
+    REGISTRY.collect("foodloop_cache_events_total", "Cache lookups and maintenance events", "counter",
+                     ["cache", "event"],
+                     lambda: {(cache_name, event): value for cache_name, tracked in _caches.items()
+                              for event, value in tracked.stats.items()})
+    REGISTRY.collect("foodloop_cache_hit_ratio", "Share of lookups answered from the cache", "gauge",
+                     ["cache"],
+                     lambda: {(cache_name,): tracked.snapshot()["hit_ratio"] for cache_name, tracked in _caches.items()})
+
+
+def instrument(app, profiler: Optional[SlowRequestProfiler] = None):
+    """Request latency, in-flight gauge and the optional slow-request profiler for ``app``"""
+    profiler = profiler or SlowRequestProfiler.from_env()
+    REGISTRY.collect("foodloop_profiles_total", "Requests sampled by the slow-request profiler, and profiles saved",
+                     "counter", ["event"], lambda: {(event,): value for event, value in profiler.stats.items()})
+
+    @app.middleware("http")
+    async def record_request(request: Request, call_next):
+        if request.url.path == "/metrics":
+            return await call_next(request)
+        IN_FLIGHT.inc()
+        sampler = profiler.start()
+        start = time.perf_counter()
+        status = "500"
+        try:
+            response = await call_next(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            IN_FLIGHT.dec()
+            # Route templates (/info/{food_name}) keep label cardinality bounded
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(elapsed, route=route, method=request.method, status=status)
+            if sampler is not None:
+                profiler.finish(sampler, f"{request.method} {route}", elapsed)
+
+
+def metrics_response() -> Response:
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from llm_gateway import LLMTimeoutError, QueueFullError
+from metrics import REGISTRY, llm_call
+
+FIRST_TOKEN_SECONDS = REGISTRY.histogram("foodloop_llm_first_token_seconds",
+                                         "Time from request to first streamed token", ["provider"])
+
+
+class OllamaClient:
+    """Async client for a local Ollama server over one pooled HTTP connection set.
+
+    ``generate`` returns the whole answer; ``stream`` yields text fragments as
+    Ollama produces them (its NDJSON stream). At most ``max_concurrency``
+    generations run at once and at most ``max_queue`` more may wait; beyond
+    that calls fail fast with ``QueueFullError``. ``read_timeout`` bounds the
+    gap between streamed chunks, ``total_timeout`` a non-streamed generation.
+    """
+
+    def __init__(self, base_url: str, model: str, max_concurrency: int = 2, max_queue: int = 8,
+                 connect_timeout: float = 5.0, read_timeout: float = 60.0, total_timeout: float = 300.0):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.total_timeout = total_timeout
+        self._timeout = httpx.Timeout(connect=connect_timeout, read=read_timeout, write=connect_timeout, pool=None)
+        self._limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._waiting = 0
+        self._in_flight = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self._timeout, limits=self._limits)
+        return self._client
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def check_capacity(self):
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            raise QueueFullError("Too many Ollama generations queued, try again shortly")
+
+    @asynccontextmanager
+    async def _slot(self):
+        self.check_capacity()
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    async def generate(self, prompt: str) -> str:
+        async with self._slot():
+            with llm_call("ollama"):
+                try:
+                    response = await asyncio.wait_for(
+                        self.client.post("/api/generate", json={"model": self.model, "prompt": prompt, "stream": False}),
+                        self.total_timeout,
+                    )
+                except (asyncio.TimeoutError, httpx.TimeoutException):
+                    raise LLMTimeoutError(f"Ollama did not answer within {self.total_timeout}s")
+                response.raise_for_status()
+                return response.json()["response"].strip()
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        async with self._slot():
+            with llm_call("ollama"):
+                start = time.perf_counter()
+                first = True
+                try:
+                    async with self.client.stream(
+                        "POST", "/api/generate", json={"model": self.model, "prompt": prompt, "stream": True}
+                    ) as response:
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if not line:
+                                continue
+                            chunk = json.loads(line)
+                            if chunk.get("error"):
+                                raise RuntimeError(chunk["error"])
+                            if chunk.get("response"):
+                                if first:
+                                    FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start, provider="ollama")
+                                    first = False
+                                yield chunk["response"]
+                            if chunk.get("done"):
+                                break
+                except httpx.TimeoutException:
+                    raise LLMTimeoutError("Ollama stopped streaming (read timeout)")
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
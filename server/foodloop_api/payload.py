@@ -0,0 +1,148 @@
+"""Token-budgeted LLM inputs: compact prompts, budget-sized images, per-call accounting.
+
+Every LLM call builds its input here. Images are sized to LLM_IMAGE_TOKEN_BUDGET
+using Gemini's tiling (a 258-token tile per 768x768 block, one tile for images
+up to 384x384), to LLM_IMAGE_MAX_PIXELS and, as before, to LLM_IMAGE_MAX_SIDE.
+Prompts are short templates with minified reference data, rounded stats and
+optional context sections. If a
+prompt would exceed LLM_PROMPT_TOKEN_BUDGET, the optional sections go first;
+instructions and the output format the callers parse are never dropped.
+Estimated tokens and bytes for each call are logged and exported as metrics.
+"""
+import io
+import json
+import logging
+import math
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from ingest import LLM_IMAGE_MAX_SIDE, IngestedImage
+from metrics import REGISTRY
+
+LLM_IMAGE_TOKEN_BUDGET = int(os.getenv("LLM_IMAGE_TOKEN_BUDGET", "258"))
+LLM_IMAGE_MAX_PIXELS = int(os.getenv("LLM_IMAGE_MAX_PIXELS", str(768 * 768)))
+LLM_PROMPT_TOKEN_BUDGET = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "500"))
+
+# Gemini image accounting, and the usual ~4 characters per text token
+TOKENS_PER_TILE = 258
+TILE_SIDE = 768
+SMALL_IMAGE_SIDE = 384
+CHARS_PER_TOKEN = 4
+
+logger = logging.getLogger("foodloop.payload")
+
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+BYTE_BUCKETS = (1024, 4096, 16384, 65536, 131072, 262144, 524288, 1048576, 4194304)
+INPUT_TOKENS = REGISTRY.histogram("foodloop_llm_input_tokens", "Estimated input tokens per LLM call",
+                                  ["call", "part"], TOKEN_BUCKETS)
+PAYLOAD_BYTES = REGISTRY.histogram("foodloop_llm_payload_bytes", "Prompt plus image bytes per LLM call",
+                                   ["call"], BYTE_BUCKETS)
+PROMPT_TRIMS = REGISTRY.counter("foodloop_llm_prompt_trims_total", "Optional prompt sections dropped for the budget",
+                                ["call"])
+
+
+def estimate_text_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    if width <= SMALL_IMAGE_SIDE and height <= SMALL_IMAGE_SIDE:
+        return TOKENS_PER_TILE
+    return math.ceil(width / TILE_SIDE) * math.ceil(height / TILE_SIDE) * TOKENS_PER_TILE
+
+
+def image_side_for_budget(width: int, height: int) -> int:
+    """Longest side that keeps an image of this shape inside the pixel and token budgets"""
+    scale = min(1.0, LLM_IMAGE_MAX_SIDE / max(width, height), math.sqrt(LLM_IMAGE_MAX_PIXELS / (width * height)))
+    while (estimate_image_tokens(round(width * scale), round(height * scale)) > LLM_IMAGE_TOKEN_BUDGET
+           and max(width, height) * scale > SMALL_IMAGE_SIDE):
+        scale *= 0.9
+    return max(1, int(max(width, height) * scale))
+
+
+def llm_image(upload: IngestedImage) -> bytes:
+    """The upload as a JPEG inside the image budgets (re-encoded once per size)"""
+    return upload.llm_jpeg(image_side_for_budget(*upload.original_size))
+
+
+def compact_json(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _round(values: Sequence[float], digits: int = 1) -> List[float]:
+    return [round(float(value), digits) for value in values]
+
+
+def stats_text(avg_hsv, brightness, vibrancy) -> str:
+    return (f"HSV {_round(avg_hsv)}, brightness {float(brightness):.1f}, "
+            f"vibrancy {float(vibrancy):.1f}")
+
+
+def fit_prompt(call: str, sections: Sequence[Tuple[str, bool]], budget: Optional[int] = None) -> str:
+    """Join ``(text, optional)`` sections, dropping the last optional one until under budget"""
+    budget = LLM_PROMPT_TOKEN_BUDGET if budget is None else budget
+    kept = [(text, optional) for text, optional in sections if text]
+    while estimate_text_tokens("\n".join(text for text, _ in kept)) > budget:
+        optional = [i for i, (_, is_optional) in enumerate(kept) if is_optional]
+        if not optional:
+            logger.warning("%s prompt is over its %d token budget with only required sections", call, budget)
+            break
+        del kept[optional[-1]]
+        PROMPT_TRIMS.inc(call=call)
+    return "\n".join(text for text, _ in kept)
+
+
+def assessment_prompt(name: str, visual_features: Dict[str, Any], ref_data: Dict[str, Any]) -> str:
+    """app.py's image assessment; the reply must stay the JSON object assess_image parses"""
+    return fit_prompt("assessment", [
+        (f"You are a food safety inspector. Using the measurements and the image, decide whether "
+         f"this {name} looks fresh and safe to eat.", False),
+        (f"Measurements: HSV {_round(visual_features['avg_hsv'])}, brightness {visual_features['brightness']}, "
+         f"vibrancy {visual_features['vibrancy']}, mold indicator {visual_features['mold_percentage']}%", False),
+        # Optional context; when over budget the colors go first, then the reference values
+        (f"Reference values for fresh {name}: {compact_json(ref_data)}", True),
+        (f"Dominant colors (pixel count, RGB): {compact_json(visual_features.get('dominant_colors', []))}", True),
+        ("Rules:\n"
+         "- Any sign of mold, spoilage or a food safety risk means \"BAD\".\n"
+         "- If your confidence is below 70, answer \"BAD\".\n"
+         "- Judge freshness and safety only, not looks.", False),
+        ("Return ONLY a valid JSON object, no other text, with these fields:\n"
+         "- assessment: \"GOOD\" or \"BAD\"\n"
+         "- confidence: number between 0-100\n"
+         "- reasoning: brief explanation (max 100 words)\n"
+         "- recommendations: brief safety advice", False),
+    ])
+
+
+def quality_prompt(avg_hsv, brightness, vibrancy) -> str:
+    """main.py's Gemini vision call; free-text answer"""
+    return fit_prompt("gemini", [
+        (f"Analyze the quality of the food in the image. Image stats: {stats_text(avg_hsv, brightness, vibrancy)}.",
+         False),
+        ("Rate quality (Excellent/Good/Fair/Poor) and explain briefly.", False),
+    ])
+
+
+def freshness_prompt(avg_hsv, brightness, vibrancy) -> str:
+    """Text-only freshness question for OpenAI and Ollama"""
+    return fit_prompt("freshness", [
+        (f"Image stats: {stats_text(avg_hsv, brightness, vibrancy)}. How fresh is the fruit? "
+         "Respond with a short description.", False),
+    ])
+
+
+def log_payload(call: str, prompt: str, image: Optional[bytes] = None) -> Dict[str, int]:
+    """Record estimated input tokens and payload bytes for one call"""
+    text_tokens = estimate_text_tokens(prompt)
+    image_tokens = 0
+    if image is not None:
+        image_tokens = estimate_image_tokens(*Image.open(io.BytesIO(image)).size)
+    size = len(prompt.encode()) + (len(image) if image is not None else 0)
+    INPUT_TOKENS.observe(text_tokens, call=call, part="text")
+    if image is not None:
+        INPUT_TOKENS.observe(image_tokens, call=call, part="image")
+    PAYLOAD_BYTES.observe(size, call=call)
+    logger.info("%s payload: ~%d text + ~%d image tokens, %d bytes", call, text_tokens, image_tokens, size)
+    return {"text_tokens": text_tokens, "image_tokens": image_tokens, "bytes": size}
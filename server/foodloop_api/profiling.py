@@ -0,0 +1,103 @@
+"""Opt-in sampling profiler for slow requests, writing folded stacks for flame graphs.
+
+A random ``PROFILE_SAMPLE_RATE`` share of requests is sampled: a background
+thread snapshots every thread's Python stack each ``PROFILE_INTERVAL_MS``. If
+the request then takes at least ``PROFILE_SLOW_MS`` the samples are written to
+``PROFILE_DIR`` in the folded format ("frame;frame;frame count") that
+flamegraph.pl and speedscope read; otherwise they are dropped. Only one request
+is sampled at a time, and all threads are captured, so offloaded work (feature
+extraction, LLM threads) shows up alongside the event loop.
+"""
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop_event.wait(self.interval):
+            names.update((thread.ident, thread.name) for thread in threading.enumerate())
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                frames.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(frames))] += 1
+
+    def stop(self, wait: bool = True):
+        self._stop_event.set()
+        if wait:
+            self.join()
+
+
+class SlowRequestProfiler:
+    def __init__(self, sample_rate: float = 0.0, slow_ms: float = 1000.0, interval_ms: float = 5.0,
+                 output_dir: str = "profiles", max_files: int = 100):
+        self.sample_rate = sample_rate
+        self.slow = slow_ms / 1000
+        self.interval = interval_ms / 1000
+        self.output_dir = output_dir
+        self.max_files = max_files
+        self._busy = threading.Lock()
+        self.stats = {"sampled": 0, "saved": 0}
+
+    @classmethod
+    def from_env(cls) -> "SlowRequestProfiler":
+        return cls(
+            sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+            slow_ms=float(os.getenv("PROFILE_SLOW_MS", "1000")),
+            interval_ms=float(os.getenv("PROFILE_INTERVAL_MS", "5")),
+            output_dir=os.getenv("PROFILE_DIR", "profiles"),
+            max_files=int(os.getenv("PROFILE_MAX_FILES", "100")),
+        )
+
+    def start(self) -> Optional[_Sampler]:
+        """A running sampler for this request, or None if it is not picked"""
+        if self.sample_rate <= 0 or self.stats["saved"] >= self.max_files or random.random() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+        sampler = _Sampler(self.interval)
+        sampler.start()
+        self.stats["sampled"] += 1
+        return sampler
+
+    def finish(self, sampler: _Sampler, label: str, duration: float):
+        """Stops sampling now; joining the sampler and writing the profile happen on a
+        background thread, so the request (and the event loop) never wait on disk"""
+        sampler.stop(wait=False)
+        threading.Thread(target=self._save, args=(sampler, label, duration), name="profile-writer",
+                         daemon=True).start()
+
+    def _save(self, sampler: _Sampler, label: str, duration: float):
+        try:
+            sampler.join()
+            if duration < self.slow or not sampler.stacks:
+                return
+            os.makedirs(self.output_dir, exist_ok=True)
+            slug = re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_")
+            path = os.path.join(self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{int(duration * 1000)}ms-{slug}.folded")
+            with open(path, "w") as f:
+                for stack, count in sampler.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            self.stats["saved"] += 1
+        finally:
+            # Held until the file is written, so the next sample cannot overlap this write
+            self._busy.release()
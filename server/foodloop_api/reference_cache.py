@@ -0,0 +1,167 @@
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+MAX_KEY_LENGTH = 100
+
+
+def normalize_food_name(food_name: str) -> str:
+    """Lower-case, strip punctuation and collapse whitespace so 'Banana ' == 'banana'"""
+    key = re.sub(r"[^\w\s]", " ", food_name.lower())
+    return " ".join(key.split())[:MAX_KEY_LENGTH]
+
+
+class ReferenceCache:
+    """LRU + TTL cache for per-food reference data.
+
+    Entries live in memory and, when ``db_path`` is given, in a SQLite file that
+    every uvicorn worker on the box shares and that survives restarts.
+    Concurrent misses for the same key share one loader call (single-flight),
+    and failed loads cache the fallback value for ``negative_ttl`` seconds.
+    The shared load runs in its own task, so a caller that is cancelled does
+    not cancel it for the others. In ``get_or_load`` the SQLite reads and
+    writes run in a thread; ``get`` and ``set`` are synchronous.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 7 * 24 * 3600,
+                 negative_ttl: float = 300, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[str, Tuple[float, bool, Dict[str, Any]]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._db = None
+        self._db_lock = threading.Lock()
+        if db_path:
+            self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS reference_data ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, negative INTEGER NOT NULL, expires_at REAL NOT NULL)"
+            )
+        self.stats = {"hits": 0, "negative_hits": 0, "disk_hits": 0, "misses": 0,
+                      "coalesced": 0, "load_errors": 0, "evictions": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, food_name: str):
+        return self._lookup(normalize_food_name(food_name)) is not None
+
+    def _remember(self, key: str, expires_at: float, negative: bool, value: Dict[str, Any]):
+        self._entries[key] = (expires_at, negative, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _memory_lookup(self, key: str) -> Optional[Tuple[bool, Dict[str, Any]]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                self._entries.move_to_end(key)
+                return entry[1], entry[2]
+            del self._entries[key]
+        return None
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, bool, Dict[str, Any]]]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, negative, expires_at FROM reference_data WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return None if row is None else (row[2], bool(row[1]), json.loads(row[0]))
+
+    def _write_disk(self, key: str, expires_at: float, negative: bool, value: Dict[str, Any]):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO reference_data (key, value, negative, expires_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), int(negative), expires_at),
+            )
+            self._db.execute("DELETE FROM reference_data WHERE expires_at <= ?", (time.time(),))
+
+    def _lookup(self, key: str) -> Optional[Tuple[bool, Dict[str, Any]]]:
+        entry = self._memory_lookup(key)
+        if entry is None and self._db is not None:
+            stored = self._read_disk(key)
+            if stored is not None:
+                self.stats["disk_hits"] += 1
+                self._remember(key, *stored)
+                entry = stored[1], stored[2]
+        return entry
+
+    def get(self, food_name: str) -> Optional[Dict[str, Any]]:
+        entry = self._lookup(normalize_food_name(food_name))
+        return None if entry is None else entry[1]
+
+    def set(self, food_name: str, value: Dict[str, Any], negative: bool = False):
+        key = normalize_food_name(food_name)
+        expires_at = time.time() + (self.negative_ttl if negative else self.ttl)
+        self._remember(key, expires_at, negative, value)
+        if self._db is not None:
+            self._write_disk(key, expires_at, negative, value)
+
+    async def get_or_load(self, food_name: str, loader: Callable[[str], Awaitable[Dict[str, Any]]],
+                          fallback: Dict[str, Any],
+                          passthrough: Tuple[Type[BaseException], ...] = ()) -> Dict[str, Any]:
+        """Return cached data for ``food_name`` or load it once, however many callers ask.
+
+        ``loader`` receives the normalized key. If it raises, ``fallback`` is
+        returned and negatively cached, except for ``passthrough`` errors, which
+        are re-raised without caching anything.
+        """
+        key = normalize_food_name(food_name)
+        entry = self._memory_lookup(key)
+        if entry is not None:
+            self.stats["negative_hits" if entry[0] else "hits"] += 1
+            return entry[1]
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.create_task(self._load(key, loader, fallback, passthrough))
+            # Retrieve the error even when every caller has gone, so asyncio doesn't log it
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._in_flight[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, loader: Callable[[str], Awaitable[Dict[str, Any]]], fallback: Dict[str, Any],
+                    passthrough: Tuple[Type[BaseException], ...]) -> Dict[str, Any]:
+        try:
+            if self._db is not None:
+                stored = await asyncio.to_thread(self._read_disk, key)
+                if stored is not None:
+                    self.stats["disk_hits"] += 1
+                    self.stats["negative_hits" if stored[1] else "hits"] += 1
+                    self._remember(key, *stored)
+                    return stored[2]
+            self.stats["misses"] += 1
+            negative = False
+            try:
+                value = await loader(key)
+            except passthrough:
+                raise
+            except Exception:
+                self.stats["load_errors"] += 1
+                value, negative = fallback, True
+            expires_at = time.time() + (self.negative_ttl if negative else self.ttl)
+            self._remember(key, expires_at, negative, value)
+            if self._db is not None:
+                await asyncio.to_thread(self._write_disk, key, expires_at, negative, value)
+            return value
+        finally:
+            del self._in_flight[key]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters plus current size, for the stats endpoint"""
+        lookups = self.stats["hits"] + self.stats["negative_hits"] + self.stats["misses"]
+        hit_ratio = (self.stats["hits"] + self.stats["negative_hits"]) / lookups if lookups else 0.0
+        return {**self.stats, "size": len(self._entries), "max_entries": self.max_entries,
+                "in_flight": len(self._in_flight), "hit_ratio": round(hit_ratio, 4),
+                "persistent": self._db is not None}
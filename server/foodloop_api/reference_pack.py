@@ -0,0 +1,133 @@
+"""Prebuilt per-food reference data, shipped as one versioned JSON file.
+
+build_reference_pack.py fills the pack offline for every food we know about
+(the expanded_food_items.csv dishes and the class_indices.json produce).
+app.py loads it at startup and answers from it before asking Gemini, so
+known foods never pay the live round trip and always get the same values.
+"""
+import csv
+import gzip
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from reference_cache import normalize_food_name
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PACK_PATH = os.path.join(API_DIR, "reference_pack.json")
+PACK_FORMAT = 1
+
+
+def reference_prompt(food_name: str) -> str:
+    """The Gemini prompt for one food's reference data, shared by the live path and the builder"""
+    return f"""
+    I need reference data for a food quality assessment system for "{food_name}".
+    Please provide the following information in JSON format:
+
+    1. Expected HSV ranges (hue, saturation, value) for fresh {food_name}
+    2. Expected brightness range
+    3. Expected vibrancy range
+    4. Common visual indicators of spoilage or staleness
+    5. Typical shelf life in days
+
+    Format the response as valid JSON only, no explanations.
+    """
+
+
+def prompt_fingerprint() -> str:
+    """Changes whenever the prompt does, so a pack built from an older prompt can be spotted"""
+    return hashlib.sha256(reference_prompt("{food}").encode()).hexdigest()[:12]
+
+
+def parse_reference_json(text: str) -> Dict[str, Any]:
+    """The JSON object in a reply, also when it comes wrapped in a code fence or prose"""
+    try:
+        value = json.loads(text)
+    except json.JSONDecodeError:
+        start, end = text.find("{"), text.rfind("}") + 1
+        if start < 0 or end <= start:
+            raise
+        value = json.loads(text[start:end])
+    if not isinstance(value, dict):
+        raise ValueError("Reference data must be a JSON object")
+    return value
+
+
+def known_foods(food_items_path: str, class_indices_path: str) -> List[str]:
+    """Every dish in the CSV plus every produce class, normalized and deduplicated"""
+    names = []
+    with open(food_items_path, newline="", encoding="utf-8") as f:
+        names.extend(row["text"] for row in csv.DictReader(f))
+    with open(class_indices_path, encoding="utf-8") as f:
+        # "stale_bitter_gourd" -> "bitter gourd"
+        names.extend(label.split("_", 1)[1].replace("_", " ") for label in json.load(f))
+    return sorted({normalize_food_name(name) for name in names if normalize_food_name(name)})
+
+
+class ReferencePack:
+    """Read-only lookup over a loaded pack; ``get`` returns None for unknown foods"""
+
+    def __init__(self, foods: Dict[str, Dict[str, Any]], meta: Optional[Dict[str, Any]] = None):
+        self.foods = foods
+        self.meta = meta or {}
+        self.stats = {"hits": 0, "misses": 0}
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_PACK_PATH) -> "ReferencePack":
+        """Load ``path`` (plain or .gz JSON); a missing file gives an empty pack"""
+        if not path or not os.path.exists(path):
+            return cls({}, {"path": path, "loaded": False})
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("format") != PACK_FORMAT:
+            raise ValueError(f"{path}: unsupported reference pack format {data.get('format')!r}")
+        meta = {key: value for key, value in data.items() if key != "foods"}
+        meta.update(path=path, loaded=True, stale_prompt=data.get("prompt") != prompt_fingerprint())
+        return cls(data["foods"], meta)
+
+    def __len__(self):
+        return len(self.foods)
+
+    def __contains__(self, food_name: str):
+        return self._find(normalize_food_name(food_name)) is not None
+
+    def _find(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.foods.get(key)
+        if value is None and key.endswith("s"):
+            # "apples" -> "apple", "tomatoes" -> "tomato"
+            value = self.foods.get(key[:-1]) or (self.foods.get(key[:-2]) if key.endswith("es") else None)
+        return value
+
+    def get(self, food_name: str) -> Optional[Dict[str, Any]]:
+        value = self._find(normalize_food_name(food_name))
+        self.stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        hit_ratio = self.stats["hits"] / lookups if lookups else 0.0
+        return {**self.stats, "size": len(self.foods), "hit_ratio": round(hit_ratio, 4),
+                **{key: self.meta.get(key) for key in ("version", "built_at", "model", "stale_prompt")}}
+
+
+def write_pack(path: str, foods: Dict[str, Dict[str, Any]], model: str, sources: Iterable[str]) -> Dict[str, Any]:
+    """Write ``foods`` as a compact pack; the version is a hash of the content"""
+    body = json.dumps(foods, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    header = {
+        "format": PACK_FORMAT,
+        "version": hashlib.sha256(body.encode()).hexdigest()[:12],
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "model": model,
+        "prompt": prompt_fingerprint(),
+        "sources": list(sources),
+        "count": len(foods),
+    }
+    tmp = path + ".tmp"
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(tmp, "wt", encoding="utf-8") as f:
+        f.write(json.dumps(header, separators=(",", ":"))[:-1] + ',"foods":' + body + "}")
+    os.replace(tmp, path)
+    return header
@@ -0,0 +1,104 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from reference_cache import normalize_food_name
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+def content_key(image_bytes: bytes, namespace: str) -> str:
+    """Exact cache key: hash of the upload bytes plus the normalized food name / route"""
+    digest = hashlib.sha256(normalize_food_name(namespace).encode())
+    digest.update(b"\0")
+    digest.update(image_bytes)
+    return digest.hexdigest()
+
+
+def perceptual_hash(image: Image.Image) -> int:
+    """64-bit difference hash; burst shots and re-encodes land a few bits apart"""
+    small = np.asarray(image.convert("L").resize((9, 8), Image.Resampling.BOX), dtype=np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class ResultCache:
+    """Size-bounded LRU cache of assessment results keyed on image content.
+
+    Exact hits match the upload bytes. With ``perceptual`` enabled, an image whose
+    difference hash is within ``max_distance`` bits of a cached image for the
+    same namespace also counts as a hit.
+    """
+
+    def __init__(self, max_entries: int = 2048, perceptual: bool = False, max_distance: int = 6,
+                 min_ttl: float = 5 * 60, max_ttl: float = 12 * HOUR, shelf_life_fraction: float = 0.05):
+        self.max_entries = max_entries
+        self.perceptual = perceptual
+        self.max_distance = max_distance
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.shelf_life_fraction = shelf_life_fraction
+        # key -> (expires_at, namespace, phash, value)
+        self._entries: "OrderedDict[str, Tuple[float, str, Optional[int], Dict[str, Any]]]" = OrderedDict()
+        self.stats = {"hits": 0, "perceptual_hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def ttl_for(self, shelf_life_days: Optional[float] = None, assessment: Optional[str] = None) -> float:
+        """Expiry tied to freshness: a GOOD verdict on a short-lived food goes stale quickly"""
+        if assessment == "BAD" or not shelf_life_days:
+            return self.max_ttl
+        ttl = float(shelf_life_days) * DAY * self.shelf_life_fraction
+        return max(self.min_ttl, min(self.max_ttl, ttl))
+
+    def _evict_expired(self, now: float):
+        expired = [key for key, entry in self._entries.items() if entry[0] <= now]
+        for key in expired:
+            del self._entries[key]
+
+    def get(self, key: str, namespace: str, phash: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[3]
+
+        if self.perceptual and phash is not None:
+            namespace = normalize_food_name(namespace)
+            best_key, best_distance = None, self.max_distance + 1
+            for other_key, (expires_at, other_namespace, other_phash, _) in self._entries.items():
+                if expires_at <= now or other_namespace != namespace or other_phash is None:
+                    continue
+                distance = (phash ^ other_phash).bit_count()
+                if distance < best_distance:
+                    best_key, best_distance = other_key, distance
+            if best_key is not None:
+                self._entries.move_to_end(best_key)
+                self.stats["perceptual_hits"] += 1
+                return self._entries[best_key][3]
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, namespace: str, value: Dict[str, Any], ttl: float, phash: Optional[int] = None):
+        now = time.time()
+        self._entries[key] = (now + ttl, normalize_food_name(namespace), phash, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._evict_expired(now)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["perceptual_hits"] + self.stats["misses"]
+        hit_ratio = (self.stats["hits"] + self.stats["perceptual_hits"]) / lookups if lookups else 0.0
+        return {**self.stats, "size": len(self._entries), "max_entries": self.max_entries,
+                "perceptual": self.perceptual, "hit_ratio": round(hit_ratio, 4)}
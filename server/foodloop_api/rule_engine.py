@@ -0,0 +1,133 @@
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "quality_rules.json")
+DEFAULT = "default"
+QUALITY_LABELS = np.array(["Good", "Check Manually", "Spoiled"])
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class RuleEngine:
+    """Table-driven food quality rules compiled from a JSON rules file.
+
+    All category keywords are compiled into one regex, longest phrase first,
+    so "fried rice" wins over "rice" and an ignored phrase such as "eggplant"
+    swallows "egg". A keyword matches where a word starts or ends, which
+    keeps compounds ("milkshake", "buttermilk", "cheesecake") in their
+    category, but not in the middle of a word ("egg" in "veggie"). Safe
+    hours come from a meal type x storage table and per-category
+    adjustments, evaluated over NumPy arrays.
+    """
+
+    def __init__(self, rules: Dict[str, Any]):
+        self.version = rules.get("version")
+        self.categories: List[str] = list(rules["categories"])
+        self.storage_types: List[str] = [_normalize(s) for s in rules.get("storage_types", [])] + [DEFAULT]
+        self.meal_types: List[str] = [_normalize(m) for m in rules["safe_hours"] if m != DEFAULT] + [DEFAULT]
+        self.check_manually_fraction = float(rules.get("check_manually_fraction", 0.8))
+
+        # safe_hours[meal, storage] and adjust_hours[category, storage]
+        self.safe_hours = np.array([
+            [self._storage_value(rules["safe_hours"][meal], storage, None)
+             for storage in self.storage_types]
+            for meal in self._raw_keys(rules["safe_hours"])
+        ], dtype=float)
+        self.adjust_hours = np.array([
+            [self._storage_value(rules["categories"][category].get("adjust_hours", {}), storage, 0.0)
+             for storage in self.storage_types]
+            for category in self.categories
+        ], dtype=float).reshape(len(self.categories), len(self.storage_types))
+
+        # One regex for every keyword; each phrase maps to a category index (-1 = ignored)
+        phrase_category: Dict[str, int] = {}
+        for index, category in enumerate(self.categories):
+            for keyword in rules["categories"][category]["keywords"]:
+                phrase_category[_normalize(keyword)] = index
+        for phrase in rules.get("ignore_phrases", []):
+            phrase_category[_normalize(phrase)] = -1
+        self._phrase_category = phrase_category
+        alternatives = sorted(phrase_category, key=len, reverse=True)
+        pattern = "|".join(re.escape(phrase).replace(r"\ ", r"\s+") for phrase in alternatives)
+        # A keyword that starts a word, or one that ends it (plurals included)
+        self._matcher = re.compile(rf"\b({pattern})|({pattern})(?:e?s)?\b") if alternatives else None
+        self._match_flags = lru_cache(maxsize=8192)(self._compute_flags)
+
+    @staticmethod
+    def _raw_keys(table: Dict[str, Any]) -> List[str]:
+        # Same order as self.meal_types: named rows first, default row last
+        return [key for key in table if key != DEFAULT] + [DEFAULT]
+
+    @staticmethod
+    def _storage_value(row: Dict[str, Any], storage: str, missing):
+        normalized = {_normalize(key): value for key, value in row.items()}
+        value = normalized.get(storage, normalized.get(DEFAULT, missing))
+        if value is None:
+            raise ValueError(f"No safe hours for storage '{storage}' and no default")
+        return value
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_RULES_PATH) -> "RuleEngine":
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def _compute_flags(self, food: str) -> tuple:
+        flags = [False] * len(self.categories)
+        if self._matcher is not None:
+            for match in self._matcher.finditer(food):
+                index = self._phrase_category[" ".join(match.group(match.lastindex).split())]
+                if index >= 0:
+                    flags[index] = True
+        return tuple(flags)
+
+    def category_flags(self, food_names: Sequence[str]) -> np.ndarray:
+        """Boolean (items x categories) matrix of keyword categories per food name"""
+        flags = [self._match_flags(_normalize(food)) for food in food_names]
+        return np.array(flags, dtype=bool).reshape(len(flags), len(self.categories))
+
+    def _indices(self, values: Sequence[str], names: List[str]) -> np.ndarray:
+        lookup = {name: index for index, name in enumerate(names)}
+        default = lookup[DEFAULT]
+        return np.array([lookup.get(_normalize(value), default) for value in values], dtype=np.intp)
+
+    def max_safe_hours(self, food_names, meal_types, storages) -> np.ndarray:
+        meal_index = self._indices(meal_types, self.meal_types)
+        storage_index = self._indices(storages, self.storage_types)
+        flags = self.category_flags(food_names)
+        adjustments = (flags * self.adjust_hours[:, storage_index].T).sum(axis=1)
+        return self.safe_hours[meal_index, storage_index] + adjustments
+
+    def evaluate(self, food_names, meal_types, hours_old, storages) -> List[str]:
+        """Quality label per item: Good, Check Manually or Spoiled"""
+        max_safe_hours = self.max_safe_hours(food_names, meal_types, storages)
+        hours_old = np.asarray(hours_old, dtype=float)
+        level = (hours_old >= max_safe_hours * self.check_manually_fraction).astype(np.intp)
+        level[hours_old > max_safe_hours] = 2
+        return QUALITY_LABELS[level].tolist()
+
+
+class RuleFile:
+    """Keeps a RuleEngine in sync with its JSON file so rules change without a redeploy"""
+
+    def __init__(self, path: str = DEFAULT_RULES_PATH):
+        self.path = path
+        self._mtime = os.stat(path).st_mtime
+        self.engine = RuleEngine.from_file(path)
+
+    def get(self) -> RuleEngine:
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if mtime != self._mtime:
+                self.engine = RuleEngine.from_file(self.path)
+                self._mtime = mtime
+        except (OSError, ValueError, KeyError):
+            # A broken or half-written file keeps the last good rules in place
+            pass
+        return self.engine
@@ -0,0 +1,10 @@
+"""Tests import the API modules the way the servers do: flat, from server/foodloop_api.
+
+    cd server/foodloop_api && python -m pytest -q tests
+"""
+import os
+import sys
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
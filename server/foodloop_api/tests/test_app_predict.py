@@ -0,0 +1,149 @@
+"""app.py's /predict against the local Gemini stand-in (FAKE_GEMINI_LATENCY)"""
+import asyncio
+import io
+import os
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from llm_router import ProviderHealth
+
+
+@pytest.fixture(scope="module")
+def service(tmp_path_factory):
+    os.environ["FAKE_GEMINI_LATENCY"] = "0.01"
+    os.environ.setdefault("JOB_DB", str(tmp_path_factory.mktemp("jobs") / "jobs.db"))
+    import app
+    with TestClient(app.app) as client:
+        yield app, client
+
+
+@pytest.fixture
+def fresh_circuits(service, monkeypatch):
+    """Failures provoked by a test must not leave a breaker open for the next one"""
+    app, _ = service
+    for router in (app.reference_router, app.assessment_router):
+        monkeypatch.setattr(router, "health", {provider: ProviderHealth() for provider in router.order})
+
+
+def jpeg(seed: int) -> bytes:
+    pixels = np.random.default_rng(seed).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def predict(client, data: bytes, name: str):
+    return client.post("/predict", files={"file": ("food.jpg", data, "image/jpeg")}, data={"name": name})
+
+
+def fake_calls(app) -> int:
+    return sum(model.calls for model in app.gemini_models.values())
+
+
+def test_predict_assesses_through_the_fake(service, fresh_circuits):
+    app, client = service
+    before = fake_calls(app)
+    response = predict(client, jpeg(1), "starfruit")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["food_name"] == "starfruit"
+    assert body["assessment"] == "GOOD" and body["confidence"] == 85
+    assert set(body["visual_features"]) >= {"avg_hsv", "brightness", "vibrancy", "mold_percentage"}
+    assert "cached" not in body
+    # Reference data (unknown food, so not in the pack) and the assessment
+    assert fake_calls(app) - before == 2
+
+
+def test_repeat_upload_is_a_cache_hit(service, fresh_circuits):
+    app, client = service
+    data = jpeg(2)
+    first = predict(client, data, "starfruit").json()
+    calls = fake_calls(app)
+    second = predict(client, data, "starfruit").json()
+    assert second.pop("cached") is True
+    assert second == first
+    assert fake_calls(app) == calls
+    # Another name for the same photo is a different question
+    assert "cached" not in predict(client, data, "kiwano").json()
+
+
+def test_invalid_image_is_400(service):
+    _, client = service
+    response = predict(client, b"not an image", "starfruit")
+    assert response.status_code == 400
+    assert "corrupt" in response.json()["error"]
+
+
+def test_oversized_upload_is_413(service, monkeypatch):
+    import ingest
+    _, client = service
+    monkeypatch.setattr(ingest, "MAX_UPLOAD_BYTES", 100)
+    assert predict(client, jpeg(3), "starfruit").status_code == 413
+
+
+def test_image_over_the_llm_budget_is_413(service, fresh_circuits, monkeypatch):
+    import ingest
+    _, client = service
+    monkeypatch.setattr(ingest, "LLM_IMAGE_MAX_BYTES", 10)
+    response = predict(client, jpeg(4), "starfruit")
+    assert response.status_code == 413
+    assert "LLM_IMAGE_MAX_BYTES" in response.json()["error"]
+
+    files = [("files", ("a.jpg", jpeg(5), "image/jpeg")), ("files", ("b.jpg", b"not an image", "image/jpeg"))]
+    response = client.post("/predict/batch", files=files, data={"names": ["starfruit", "kiwano"]})
+    assert response.status_code == 200
+    assert [item["status"] for item in response.json()["results"]] == [413, 400]
+
+
+def test_oversized_file_fails_only_its_batch_item(service, fresh_circuits, monkeypatch):
+    import ingest
+    _, client = service
+    small, large = jpeg(6), jpeg(7) * 4
+    monkeypatch.setattr(ingest, "MAX_UPLOAD_BYTES", len(small) + 1)
+    files = [("files", ("a.jpg", small, "image/jpeg")), ("files", ("b.jpg", large, "image/jpeg"))]
+    response = client.post("/predict/batch", files=files, data={"names": ["starfruit", "kiwano"]})
+    assert response.status_code == 200
+    first, second = response.json()["results"]
+    assert first["assessment"] == "GOOD" and "error" not in first
+    assert second["index"] == 1 and second["status"] == 413
+
+
+def test_slow_provider_is_504(service, fresh_circuits, monkeypatch):
+    app, client = service
+    for gateway in app.gemini_gateways.values():
+        monkeypatch.setattr(gateway, "timeout", 0.05)
+    for model in app.gemini_models.values():
+        monkeypatch.setattr(model, "latency", 0.3)
+    response = predict(client, jpeg(4), "durian")
+    assert response.status_code == 504
+    assert "timed out" in response.json()["error"]
+    time.sleep(0.3)  # let the abandoned fake calls finish before the next test
+
+
+def test_full_provider_queue_is_503_with_retry_after(service, fresh_circuits, monkeypatch):
+    app, client = service
+    for gateway in app.gemini_gateways.values():
+        # Every slot taken and no room to wait
+        monkeypatch.setattr(gateway, "_semaphore", asyncio.Semaphore(0))
+        monkeypatch.setattr(gateway, "max_queue", 0)
+    response = predict(client, jpeg(5), "rambutan")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    assert "queue is full" in response.json()["error"]
+
+
+def test_failing_provider_is_503(service, fresh_circuits, monkeypatch):
+    app, client = service
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("500 Internal error")
+
+    for model in app.gemini_models.values():
+        monkeypatch.setattr(model, "generate_content", broken)
+    response = predict(client, jpeg(6), "apple")
+    assert response.status_code == 503
+    assert "No LLM provider available" in response.json()["error"]
@@ -0,0 +1,30 @@
+import logging
+
+import pytest
+
+from backends import BackendDisabledError, Backends
+
+
+@pytest.fixture
+def backends():
+    return Backends({"gemini": lambda: "gemini", "ollama": lambda: "ollama", "opencv": lambda: "cv2"},
+                    enabled={"gemini", "opencv"})
+
+
+def test_warm_up_names(backends):
+    assert backends.warm_up_names("") == []
+    assert backends.warm_up_names(" gemini , opencv") == ["gemini", "opencv"]
+    assert backends.warm_up_names("all") == ["gemini", "opencv"]
+
+
+def test_unknown_warm_up_name_fails_fast(backends):
+    with pytest.raises(ValueError, match="geminii"):
+        backends.warm_up_names("geminii,opencv")
+
+
+def test_disabled_warm_up_name_is_dropped(backends, caplog):
+    with caplog.at_level(logging.WARNING, logger="foodloop.backends"):
+        assert backends.warm_up_names("gemini,ollama") == ["gemini"]
+    assert "ollama" in caplog.text
+    with pytest.raises(BackendDisabledError):
+        backends.get("ollama")
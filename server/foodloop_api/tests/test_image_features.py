@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_features import _hsv_channels, extract_features
+
+
+def pil_hsv(rgb):
+    return np.asarray(Image.fromarray(rgb.reshape(1, -1, 3)).convert("HSV")).reshape(-1, 3)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_hsv_matches_pil_on_random_pixels(seed):
+    rgb = np.random.default_rng(seed).integers(0, 256, (90_000, 3), dtype=np.uint8)
+    h, s, v = _hsv_channels(rgb)
+    np.testing.assert_array_equal(np.stack([h, s, v], axis=1), pil_hsv(rgb))
+
+
+def test_hsv_matches_pil_on_every_colour_with_red_0_to_15():
+    # Hue edge cases sit where channels tie or nearly tie; this slice has every one of them for low red
+    r, g, b = np.meshgrid(np.arange(16), np.arange(256), np.arange(256), indexing="ij")
+    rgb = np.stack([r, g, b], axis=-1).astype(np.uint8).reshape(-1, 3)
+    h, s, v = _hsv_channels(rgb)
+    np.testing.assert_array_equal(np.stack([h, s, v], axis=1), pil_hsv(rgb))
+
+
+def test_average_hsv_matches_pil_conversion():
+    rgb = np.random.default_rng(7).integers(0, 256, (120, 160, 3), dtype=np.uint8)
+    image = Image.fromarray(rgb)
+    expected = np.asarray(image.convert("HSV"), dtype=np.float64).reshape(-1, 3).mean(axis=0)
+    assert extract_features(image)["avg_hsv"] == tuple(round(float(x), 2) for x in expected)
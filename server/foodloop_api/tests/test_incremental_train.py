@@ -0,0 +1,22 @@
+import torch
+from transformers import DistilBertConfig, DistilBertForSequenceClassification
+
+from incremental_train import load_encoder_with_new_head
+
+
+def test_head_is_replaced_even_when_the_label_count_matches(tmp_path):
+    config = DistilBertConfig(vocab_size=100, dim=32, hidden_dim=64, n_layers=1, n_heads=2,
+                              num_labels=3, id2label={0: "a", 1: "b", 2: "c"})
+    torch.manual_seed(0)
+    fine_tuned = DistilBertForSequenceClassification(config)
+    with torch.no_grad():
+        fine_tuned.classifier.weight.fill_(1.0)
+    fine_tuned.save_pretrained(tmp_path)
+
+    id2label = {0: "breakfast", 1: "lunch", 2: "dinner"}
+    model = load_encoder_with_new_head(str(tmp_path), id2label)
+
+    old, new = fine_tuned.state_dict(), model.state_dict()
+    assert all(torch.equal(old[name], new[name]) for name in old if name.startswith("distilbert."))
+    assert not torch.equal(old["classifier.weight"], new["classifier.weight"])
+    assert model.config.id2label == id2label and model.config.label2id["dinner"] == 2
@@ -0,0 +1,59 @@
+import os
+import secrets
+import stat
+import threading
+import time
+
+import pytest
+
+from inference_server import InferenceClient, InferenceServer, InferenceServerError
+
+KEY = secrets.token_hex(32).encode()
+
+
+def echo_models():
+    return {"echo": (lambda payload: [text.upper() for text in payload], {"backend": "test"})}
+
+
+def start_server(address, authkey=KEY):
+    server = InferenceServer(echo_models(), address=address, authkey=authkey)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not os.path.exists(address):
+        assert time.monotonic() < deadline, "server did not start"
+        time.sleep(0.01)
+    return server
+
+
+def test_authkey_has_no_default(monkeypatch):
+    monkeypatch.delenv("INFERENCE_SERVER_AUTHKEY", raising=False)
+    with pytest.raises(InferenceServerError, match="INFERENCE_SERVER_AUTHKEY"):
+        InferenceServer(echo_models())
+    with pytest.raises(InferenceServerError, match="INFERENCE_SERVER_AUTHKEY"):
+        InferenceClient("/nonexistent.sock")
+
+
+def test_tcp_needs_a_long_key():
+    server = InferenceServer(echo_models(), address="127.0.0.1:0", authkey=b"short")
+    with pytest.raises(InferenceServerError, match="Refusing"):
+        server.serve_forever()
+
+
+def test_socket_is_private_and_authenticated(tmp_path):
+    address = str(tmp_path / "run" / "inference.sock")
+    start_server(address)
+    assert stat.S_IMODE(os.stat(os.path.dirname(address)).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(address).st_mode) == 0o600
+
+    assert InferenceClient(address, authkey=KEY).predict("echo", ["soup"]) == ["SOUP"]
+    with pytest.raises(InferenceServerError, match="rejected"):
+        InferenceClient(address, authkey=b"wrong").predict("echo", ["soup"])
+
+
+def test_refuses_a_shared_socket_directory(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    server = InferenceServer(echo_models(), address=str(shared / "inference.sock"), authkey=KEY)
+    with pytest.raises(InferenceServerError, match="mode 0700"):
+        server.serve_forever()
@@ -0,0 +1,51 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import ingest
+from ingest import InvalidImageError, LLMPayloadTooLargeError, decode_image
+
+
+def jpeg(image, quality=95):
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def noise():
+    # Noise barely compresses, so it needs the most shrinking
+    pixels = np.random.default_rng(0).integers(0, 256, (1024, 1024, 3), dtype=np.uint8)
+    return decode_image(jpeg(Image.fromarray(pixels)))
+
+
+@pytest.mark.parametrize("budget", [300_000, 20_000, 2_000])
+def test_llm_payload_always_fits_the_budget(noise, monkeypatch, budget):
+    monkeypatch.setattr(ingest, "LLM_IMAGE_MAX_BYTES", budget)
+    payload = noise.llm_jpeg()
+    assert len(payload) <= budget
+    assert max(Image.open(io.BytesIO(payload)).size) <= ingest.LLM_IMAGE_MAX_SIDE
+
+
+def test_impossible_budget_raises(noise, monkeypatch):
+    monkeypatch.setattr(ingest, "LLM_IMAGE_MAX_BYTES", 10)
+    with pytest.raises(LLMPayloadTooLargeError, match="LLM_IMAGE_MAX_BYTES=10"):
+        noise.llm_jpeg()
+
+
+def test_small_jpeg_goes_out_untouched():
+    raw = jpeg(Image.new("RGB", (64, 48), "orange"))
+    assert decode_image(raw).llm_jpeg() == raw
+
+
+def test_decode_errors_keep_their_cause():
+    truncated = jpeg(Image.new("RGB", (640, 480), "green"))[:400]
+    with pytest.raises(InvalidImageError) as caught:
+        decode_image(truncated)
+    assert caught.value.__cause__ is not None
+
+    with pytest.raises(InvalidImageError) as caught:
+        decode_image(b"not an image")
+    assert caught.value.__cause__ is not None
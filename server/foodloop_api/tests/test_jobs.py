@@ -0,0 +1,241 @@
+import asyncio
+import socket
+import threading
+
+import pytest
+
+import jobs
+from jobs import DONE, FAILED, QUEUED, CallbackURLError, JobQueue, JobQueueFullError, check_callback_url
+
+
+@pytest.fixture
+def resolve(monkeypatch):
+    """Point hostnames at chosen addresses instead of asking DNS"""
+    table = {}
+    real = socket.getaddrinfo
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        if host in table:
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (table[host], port))]
+        return real(host, port, *args, **kwargs)
+
+    monkeypatch.setattr(jobs.socket, "getaddrinfo", getaddrinfo)
+    return table
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1:8000/hook",
+    "http://localhost/hook",
+    "http://169.254.169.254/latest/meta-data",
+    "http://10.1.2.3/",
+    "http://172.16.0.1/",
+    "http://192.168.0.10/",
+    "http://[::1]/",
+    "http://[::ffff:127.0.0.1]/",
+    "http://0.0.0.0/",
+    "ftp://example.com/",
+    "not a url",
+])
+def test_refuses_internal_and_non_http_callbacks(url):
+    with pytest.raises(CallbackURLError):
+        check_callback_url(url)
+
+
+def test_refuses_names_resolving_inward(resolve):
+    resolve["hooks.example.com"] = "10.0.0.7"
+    with pytest.raises(CallbackURLError, match="non-public"):
+        check_callback_url("https://hooks.example.com/done")
+
+
+def test_accepts_public_and_allowlisted_hosts(resolve):
+    resolve["hooks.example.com"] = "93.184.216.34"
+    check_callback_url("https://hooks.example.com/done")
+    check_callback_url("http://8.8.8.8/done")
+    # Trusted internal receivers are configured explicitly, never resolved
+    check_callback_url("http://receiver.internal:9000/done", ["receiver.internal"])
+    check_callback_url("http://a.b.corp/done", [".corp"])
+    with pytest.raises(CallbackURLError):
+        check_callback_url("http://evilcorp/done", [".corp"])
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_depth_limit_holds_under_concurrent_submitters(tmp_path):
+    # Separate queues on one file stand in for uvicorn workers sharing JOB_DB
+    db_path = str(tmp_path / "jobs.db")
+    queues = [JobQueue(None, db_path=db_path, max_depth=20) for _ in range(4)]
+    accepted, rejected = [], []
+    barrier = threading.Barrier(16)
+
+    def submitter(queue):
+        barrier.wait()
+        for _ in range(5):
+            try:
+                accepted.append(queue._submit({"name": "apple"}, b"x" * 1000, 0, None))
+            except JobQueueFullError:
+                rejected.append(1)
+
+    threads = [threading.Thread(target=submitter, args=(queues[i % 4],)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(accepted) == 20 and len(rejected) == 60
+    assert queues[0].counts()[QUEUED] == 20
+
+
+def test_jobs_run_retry_and_finish():
+    attempts = []
+
+    async def handler(payload, data):
+        attempts.append(payload["name"])
+        if payload["name"] == "flaky" and attempts.count("flaky") < 2:
+            raise TimeoutError("provider timed out")
+        if payload["name"] == "broken":
+            raise ValueError("not an image")
+        return {"food_name": payload["name"], "bytes": len(data)}
+
+    async def scenario():
+        queue = JobQueue(handler, workers=2, backoff=0.01, retry_on=(TimeoutError,), poll_interval=0.01)
+        queue.start()
+        try:
+            jobs_ = [await queue.submit({"name": name}, b"abc") for name in ("apple", "flaky", "broken")]
+            for _ in range(500):
+                states = [await queue.get(job["job_id"]) for job in jobs_]
+                if all(state["status"] in (DONE, FAILED) for state in states):
+                    return states, await queue.snapshot()
+                await asyncio.sleep(0.01)
+            raise AssertionError(f"jobs did not finish: {states}")
+        finally:
+            await queue.stop()
+
+    (apple, flaky, broken), snapshot = run(scenario())
+    assert apple["status"] == DONE and apple["result"] == {"food_name": "apple", "bytes": 3}
+    assert flaky["status"] == DONE and flaky["attempts"] == 2
+    assert broken["status"] == FAILED and broken["error"] == "not an image"
+    assert snapshot["done"] == 2 and snapshot["failed"] == 1 and snapshot["depth"] == 0
+
+
+def test_full_queue_rejects_submissions():
+    async def scenario():
+        queue = JobQueue(None, max_depth=1)
+        await queue.submit({"name": "apple"}, b"")
+        with pytest.raises(JobQueueFullError):
+            await queue.submit({"name": "pear"}, b"")
+
+    run(scenario())
+
+
+def wait_until(queue, job_id, done, attempts=500):
+    async def poll():
+        for _ in range(attempts):
+            job = await queue.get(job_id)
+            if done(job):
+                return job
+            await asyncio.sleep(0.01)
+        raise AssertionError(f"job never got there: {job}")
+    return poll()
+
+
+def test_heartbeat_keeps_a_long_job_leased(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+
+    async def slow(payload, data):
+        await asyncio.sleep(0.8)
+        return {"ok": True}
+
+    async def scenario():
+        queue = JobQueue(slow, db_path=db_path, workers=1, lease=0.3, poll_interval=0.01)
+        other = JobQueue(None, db_path=db_path)
+        queue.start()
+        try:
+            job = await queue.submit({"name": "apple"}, b"")
+            await asyncio.sleep(0.6)
+            # Two leases' worth in: without renewal another worker would take it over here
+            assert await asyncio.to_thread(other._claim) is None
+            return await wait_until(queue, job["job_id"], lambda job: job["status"] == DONE)
+        finally:
+            await queue.stop()
+
+    job = run(scenario())
+    assert job["attempts"] == 1 and job["result"] == {"ok": True}
+
+
+def test_run_that_lost_its_lease_cannot_overwrite_its_successor(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def handler(payload, data):
+            await gate.wait()
+            return {"by": "first"}
+
+        queue = JobQueue(handler, db_path=db_path, workers=1, poll_interval=0.01)
+        other = JobQueue(None, db_path=db_path)
+        queue.start()
+        try:
+            job = await queue.submit({"name": "apple"}, b"")
+            await wait_until(queue, job["job_id"], lambda job: job["status"] == "running")
+            # The first worker stalls past its lease and a second one takes the job over and finishes it
+            other._update("UPDATE jobs SET run_after = 0", ())
+            claimed = other._claim()
+            assert claimed[0] == job["job_id"]
+            assert other._finish(job["job_id"], claimed[1], DONE, result={"by": "second"})
+            gate.set()
+            await asyncio.sleep(0.1)
+            return await queue.get(job["job_id"])
+        finally:
+            await queue.stop()
+
+    job = run(scenario())
+    assert job["status"] == DONE and job["result"] == {"by": "second"} and job["attempts"] == 2
+
+
+def test_pin_url():
+    assert jobs.pin_url("https://hooks.example.com/done?x=1", "93.184.216.34") == (
+        "https://93.184.216.34/done?x=1", {"Host": "hooks.example.com"}, {"sni_hostname": "hooks.example.com"})
+    assert jobs.pin_url("http://user@hooks.example.com:8080/", "2606:2800:220:1::1")[:2] == (
+        "http://[2606:2800:220:1::1]:8080/", {"Host": "hooks.example.com:8080"})
+
+
+def test_callback_goes_to_the_checked_address(monkeypatch):
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    seen = []
+
+    class Receiver(BaseHTTPRequestHandler):
+        def do_POST(self):
+            seen.append((self.headers["Host"], self.rfile.read(int(self.headers["Content-Length"]))))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Receiver)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    # The name does not resolve at all here, so the POST only arrives if it uses the checked address
+    monkeypatch.setattr(jobs, "check_callback_url", lambda url, hosts: "127.0.0.1")
+
+    async def handler(payload, data):
+        return {"ok": True}
+
+    async def scenario():
+        queue = JobQueue(handler, workers=1, poll_interval=0.01)
+        queue.start()
+        try:
+            job = await queue.submit({"name": "apple"}, b"", callback_url=f"http://hooks.invalid:{port}/done")
+            return await wait_until(queue, job["job_id"], lambda job: job["callback"]["status"] is not None)
+        finally:
+            await queue.stop()
+
+    try:
+        job = run(scenario())
+    finally:
+        server.shutdown()
+    assert job["callback"]["status"] == "delivered (204)"
+    assert len(seen) == 1 and seen[0][0] == f"hooks.invalid:{port}"
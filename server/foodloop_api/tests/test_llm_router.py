@@ -0,0 +1,171 @@
+import asyncio
+import time
+
+import pytest
+
+from llm_gateway import LLMTimeoutError
+from llm_router import (CLOSED, HALF_OPEN, OPEN, LLMRouter, NoProviderAvailableError,
+                        NoProvidersConfiguredError)
+
+
+class Provider:
+    """Scripted provider: answers after ``latency`` seconds, or raises while ``failing``"""
+
+    def __init__(self, name, latency=0.0, failing=False):
+        self.name = name
+        self.latency = latency
+        self.failing = failing
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self, request):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.failing:
+            raise RuntimeError(f"{self.name} is down")
+        return f"{self.name}: {request}"
+
+
+def router(*providers, **options):
+    return LLMRouter("test", {p.name: p for p in providers}, [p.name for p in providers], **options)
+
+
+def call(route, request="apple"):
+    return asyncio.run(route.call(request))
+
+
+# Hedging
+
+def test_slow_primary_is_hedged_and_the_hedge_wins():
+    slow, fast = Provider("slow", latency=1.0), Provider("fast", latency=0.01)
+    route = router(slow, fast, hedge_delay=0.05)
+    start = time.perf_counter()
+    outcome = call(route)
+    assert time.perf_counter() - start < 0.5
+    assert outcome == {"result": "fast: apple", "provider": "fast", "hedged": True, "fallback": False}
+    assert slow.cancelled == 1 and route.stats["hedged"] == 1
+    # The loser's running time still counts towards its latency
+    assert route.health["slow"].latency(50) >= 0.05
+
+
+def test_fast_primary_is_not_hedged():
+    primary, backup = Provider("primary", latency=0.01), Provider("backup")
+    outcome = call(router(primary, backup, hedge_delay=0.5))
+    assert outcome["provider"] == "primary" and outcome["hedged"] is False
+    assert backup.calls == 0
+
+
+def test_hedging_can_be_switched_off():
+    slow, fast = Provider("slow", latency=0.2), Provider("fast")
+    outcome = call(router(slow, fast, hedge=False, hedge_delay=0.01))
+    assert outcome["provider"] == "slow" and fast.calls == 0
+
+
+def test_failure_moves_on_without_waiting():
+    broken, backup = Provider("broken", failing=True), Provider("backup")
+    outcome = call(router(broken, backup, hedge_delay=5))
+    assert outcome["provider"] == "backup" and outcome["hedged"] is False
+
+
+def test_fastest_provider_is_tried_first():
+    slow, fast = Provider("slow", latency=0.05), Provider("fast", latency=0.0)
+    route = router(slow, fast, hedge=False)
+    call(route)
+    call(route)  # fast has no samples yet, so it is tried (and measured) next
+    slow.calls = fast.calls = 0
+    assert call(route)["provider"] == "fast" and slow.calls == 0
+
+
+# Circuit breaker
+
+def test_breaker_opens_half_opens_and_closes():
+    flaky, backup = Provider("flaky", failing=True), Provider("backup")
+    route = router(flaky, backup, max_consecutive_failures=3, cooldown=0.1)
+    for _ in range(3):
+        assert call(route)["provider"] == "backup"
+    assert route.health["flaky"].state == OPEN
+
+    # Open: skipped entirely
+    call(route)
+    assert flaky.calls == 3
+
+    # After the cooldown one probe goes through; it fails, so the breaker opens again
+    time.sleep(0.12)
+    assert route.health["flaky"].available() and route.health["flaky"].state == HALF_OPEN
+    assert call(route)["provider"] == "backup"
+    assert flaky.calls == 4 and route.health["flaky"].state == OPEN
+
+    # Next probe succeeds and closes it
+    time.sleep(0.12)
+    flaky.failing = False
+    assert call(route)["provider"] == "flaky"
+    assert route.health["flaky"].state == CLOSED
+
+
+def test_half_open_lets_one_probe_through_at_a_time():
+    flaky, backup = Provider("flaky", latency=0.1), Provider("backup", latency=0.01)
+    route = router(flaky, backup, hedge=False, cooldown=0.0)
+    health = route.health["flaky"]
+    health.state, health.opened_at = OPEN, time.monotonic()
+
+    async def together():
+        return await asyncio.gather(route.call("a"), route.call("b"))
+
+    outcomes = asyncio.run(together())
+    assert sorted(outcome["provider"] for outcome in outcomes) == ["backup", "flaky"]
+    assert flaky.calls == 1 and health.state == CLOSED
+
+
+def test_error_rate_opens_the_breaker():
+    provider = Provider("p")
+    route = router(provider, min_samples=4, error_threshold=0.5, max_consecutive_failures=99)
+    health = route.health["p"]
+    for ok in (True, False, True, False):
+        health.record(0.01, ok)
+    assert health.state == OPEN
+
+
+# Running out of providers
+
+def test_all_circuits_open():
+    provider = Provider("p")
+    route = router(provider)
+    route.health["p"].state, route.health["p"].opened_at = OPEN, time.monotonic()
+    with pytest.raises(NoProviderAvailableError, match="all circuits open"):
+        call(route)
+    assert provider.calls == 0
+
+
+def test_route_without_providers_says_so():
+    route = LLMRouter("empty", {"p": Provider("p")}, [])
+    with pytest.raises(NoProvidersConfiguredError, match="No providers configured for route empty"):
+        call(route)
+
+
+def test_route_without_providers_uses_its_fallback():
+    async def local(request):
+        return "local answer"
+
+    outcome = call(LLMRouter("empty", {}, [], fallback=local))
+    assert outcome["result"] == "local answer" and outcome["fallback"] is True
+
+
+def test_failures_fall_back_then_raise():
+    broken = Provider("broken", failing=True)
+
+    async def local(request):
+        return "local answer"
+
+    assert call(router(broken, fallback=local))["provider"] == "local"
+    with pytest.raises(NoProviderAvailableError, match="broken is down"):
+        call(router(Provider("broken", failing=True)))
+
+
+def test_timeouts_everywhere_stay_timeouts():
+    route = router(Provider("a", latency=1.0), Provider("b", latency=1.0), hedge_delay=0.01, timeout=0.05)
+    with pytest.raises(LLMTimeoutError):
+        call(route)
@@ -0,0 +1,148 @@
+"""OllamaClient against fake_providers.py served on a loopback port, so httpx timeouts are real"""
+import asyncio
+import socket
+import threading
+import time
+
+import httpx
+import pytest
+import uvicorn
+
+import fake_providers
+from llm_gateway import LLMTimeoutError, QueueFullError
+from metrics import LLM_CALLS
+from ollama_client import OllamaClient
+
+
+@pytest.fixture(scope="module")
+def fake_url():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(fake_providers.app, log_level="warning"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        assert time.monotonic() < deadline, "fake providers did not start"
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{sock.getsockname()[1]}"
+    server.should_exit = True
+    thread.join(timeout=10)
+
+
+@pytest.fixture(autouse=True)
+def fast_fake(monkeypatch):
+    monkeypatch.setenv("FAKE_OLLAMA_LATENCY", "0.01")
+    monkeypatch.setattr(fake_providers, "LATENCY", 0.01)
+    monkeypatch.setattr(fake_providers, "TOKEN_DELAY", 0.001)
+
+
+def run(client: OllamaClient, coroutine):
+    async def scenario():
+        try:
+            return await coroutine
+        finally:
+            await client.aclose()
+    return asyncio.run(scenario())
+
+
+def test_generate_reuses_one_pooled_client(fake_url):
+    client = OllamaClient(fake_url, "llama3")
+
+    async def twice():
+        first = await client.generate("prompt")
+        pool = client.client
+        second = await client.generate("prompt")
+        return first, second, pool is client.client
+
+    first, second, same_pool = run(client, twice())
+    assert first == second and first.startswith("The fruit looks fresh")
+    assert same_pool
+
+
+def test_stream_yields_tokens(fake_url):
+    client = OllamaClient(fake_url, "llama3")
+
+    async def collect():
+        return [token async for token in client.stream("prompt")]
+
+    tokens = run(client, collect())
+    assert len(tokens) > 5
+    assert "".join(tokens).strip().startswith("The fruit looks fresh")
+
+
+def calls(outcome: str) -> float:
+    return LLM_CALLS._values.get(("ollama", outcome), 0.0)
+
+
+def test_leaving_a_stream_early_is_not_a_provider_error(fake_url):
+    client = OllamaClient(fake_url, "llama3")
+
+    async def first_token():
+        stream = client.stream("prompt")
+        token = await stream.__anext__()
+        await stream.aclose()  # what StreamingResponse does when the client disconnects
+        return token
+
+    errors, cancelled = calls("error"), calls("cancelled")
+    assert run(client, first_token())
+    assert calls("error") == errors and calls("cancelled") == cancelled + 1
+
+
+def test_total_timeout_raises_llm_timeout(fake_url, monkeypatch):
+    monkeypatch.setenv("FAKE_OLLAMA_LATENCY", "1.0")
+    client = OllamaClient(fake_url, "llama3", total_timeout=0.1)
+    with pytest.raises(LLMTimeoutError):
+        run(client, client.generate("prompt"))
+    assert client.in_flight == 0 and not client._semaphore.locked()
+
+
+def test_stalled_stream_raises_llm_timeout(fake_url, monkeypatch):
+    monkeypatch.setattr(fake_providers, "TOKEN_DELAY", 1.0)
+    client = OllamaClient(fake_url, "llama3", read_timeout=0.1)
+
+    async def collect():
+        return [token async for token in client.stream("prompt")]
+
+    with pytest.raises(LLMTimeoutError, match="stopped streaming"):
+        run(client, collect())
+
+
+def test_concurrency_cap_and_queue_limit(fake_url, monkeypatch):
+    monkeypatch.setenv("FAKE_OLLAMA_LATENCY", "0.2")
+    client = OllamaClient(fake_url, "llama3", max_concurrency=1, max_queue=1)
+    peak = 0
+
+    async def watch():
+        nonlocal peak
+        while True:
+            peak = max(peak, client.in_flight)
+            await asyncio.sleep(0.005)
+
+    async def burst():
+        watcher = asyncio.create_task(watch())
+        calls = [asyncio.create_task(client.generate("prompt")) for _ in range(3)]
+        outcomes = await asyncio.gather(*calls, return_exceptions=True)
+        watcher.cancel()
+        return outcomes
+
+    outcomes = run(client, burst())
+    # One runs, one waits for the slot, the third finds the queue full and fails at once
+    assert sum(isinstance(outcome, str) for outcome in outcomes) == 2
+    assert sum(isinstance(outcome, QueueFullError) for outcome in outcomes) == 1
+    assert peak == 1
+    assert client.waiting == 0 and client.in_flight == 0
+
+
+def test_provider_error_frees_the_slot(fake_url, monkeypatch):
+    client = OllamaClient(fake_url, "llama3", max_concurrency=1)
+
+    async def fail_then_succeed():
+        monkeypatch.setenv("FAKE_OLLAMA_ERROR_RATE", "1")
+        with pytest.raises(httpx.HTTPStatusError) as error:
+            await client.generate("prompt")
+        monkeypatch.setenv("FAKE_OLLAMA_ERROR_RATE", "0")
+        return error.value.response.status_code, await client.generate("prompt")
+
+    status, text = run(client, fail_then_succeed())
+    assert status == 503 and text
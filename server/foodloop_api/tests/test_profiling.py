@@ -0,0 +1,57 @@
+import glob
+import os
+import threading
+import time
+
+import profiling
+from profiling import SlowRequestProfiler
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def wait_for(condition, timeout=5.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_finish_writes_off_the_calling_thread(tmp_path, monkeypatch):
+    profiler = SlowRequestProfiler(sample_rate=1.0, slow_ms=0, interval_ms=1, output_dir=str(tmp_path))
+    disk = threading.Event()
+    makedirs = os.makedirs
+
+    def slow_disk(*args, **kwargs):
+        disk.wait(5)
+        return makedirs(*args, **kwargs)
+
+    monkeypatch.setattr(profiling.os, "makedirs", slow_disk)
+    sampler = profiler.start()
+    busy(0.05)
+    start = time.perf_counter()
+    profiler.finish(sampler, "GET /predict", 0.05)
+    assert time.perf_counter() - start < 0.1
+    # Still writing: the next request is not sampled
+    assert profiler.start() is None
+
+    disk.set()
+    assert wait_for(lambda: profiler.stats["saved"] == 1)
+    [path] = glob.glob(str(tmp_path / "*GET_predict.folded"))
+    with open(path) as f:
+        assert any("busy (test_profiling.py" in line for line in f)
+    assert wait_for(lambda: profiler._busy.acquire(blocking=False))
+
+
+def test_fast_requests_are_dropped(tmp_path):
+    profiler = SlowRequestProfiler(sample_rate=1.0, slow_ms=1000, interval_ms=1, output_dir=str(tmp_path))
+    sampler = profiler.start()
+    profiler.finish(sampler, "GET /health", 0.01)
+    assert wait_for(lambda: not sampler.is_alive())
+    assert wait_for(lambda: profiler.start() is not None)
+    assert profiler.stats == {"sampled": 2, "saved": 0} and not os.listdir(tmp_path)
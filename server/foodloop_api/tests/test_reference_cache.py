@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from reference_cache import ReferenceCache
+
+
+class Loader:
+    def __init__(self, delay=0.05, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self, key):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return {"food": key}
+
+
+def test_cancelling_the_leader_does_not_fail_followers():
+    cache, loader = ReferenceCache(), Loader()
+
+    async def scenario():
+        leader = asyncio.create_task(cache.get_or_load("Apple", loader, {}))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_load("apple", loader, {}))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == {"food": "apple"}
+    assert loader.calls == 1 and cache.stats["coalesced"] == 1
+    assert cache.get("apple") == {"food": "apple"}
+
+
+def test_load_finishes_after_every_caller_left():
+    cache, loader = ReferenceCache(), Loader()
+
+    async def scenario():
+        caller = asyncio.create_task(cache.get_or_load("pear", loader, {}))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.1)
+        return await cache.get_or_load("pear", loader, {})
+
+    assert asyncio.run(scenario()) == {"food": "pear"}
+    assert loader.calls == 1 and cache.stats["hits"] == 1
+
+
+def test_failures_are_shared():
+    cache = ReferenceCache()
+
+    async def scenario(loader, **kwargs):
+        return await asyncio.gather(*(cache.get_or_load("kiwi", loader, {"fallback": True}, **kwargs)
+                                      for _ in range(3)), return_exceptions=True)
+
+    # Passthrough errors reach every caller and cache nothing
+    outcomes = asyncio.run(scenario(Loader(error=TimeoutError("slow")), passthrough=(TimeoutError,)))
+    assert all(isinstance(outcome, TimeoutError) for outcome in outcomes) and "kiwi" not in cache
+    # Anything else is negatively cached as the fallback
+    assert asyncio.run(scenario(Loader(error=ValueError("bad")))) == [{"fallback": True}] * 3
+    assert cache.stats["load_errors"] == 1
+
+
+def test_entries_persist_across_instances(tmp_path):
+    path = str(tmp_path / "reference.db")
+    loader = Loader(delay=0)
+    assert asyncio.run(ReferenceCache(db_path=path).get_or_load("Plum", loader, {})) == {"food": "plum"}
+
+    fresh = ReferenceCache(db_path=path)
+    assert asyncio.run(fresh.get_or_load("plum", loader, {})) == {"food": "plum"}
+    assert loader.calls == 1 and fresh.stats["disk_hits"] == 1 and fresh.stats["hits"] == 1
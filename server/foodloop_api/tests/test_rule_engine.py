@@ -0,0 +1,72 @@
+import itertools
+
+import pytest
+
+from meal_data import DEFAULT_DATA_PATH, load_food_items
+from rule_engine import RuleEngine
+
+# assess_quality_rule_based before the rule engine, kept as the reference
+LEGACY_KEYWORDS = {
+    "meat": ["chicken", "mutton", "fish", "egg", "prawn", "beef"],
+    "dairy": ["paneer", "milk", "cheese", "cream", "butter", "lassi", "yogurt", "curd"],
+    "fried": ["samosa", "vada", "pakora", "bhaji"],
+    "rice": ["rice", "biryani", "pulao", "fried rice", "chawal"],
+}
+
+
+def legacy_assess(food_name, meal_type, hours_old, storage):
+    food, meal_type, storage = food_name.lower(), meal_type.lower(), storage.lower()
+    is_meat, is_dairy, is_fried, is_rice_based = (
+        any(word in food for word in LEGACY_KEYWORDS[category]) for category in ("meat", "dairy", "fried", "rice"))
+    max_safe_hours = 4 if storage == "room temp" else 24
+    if meal_type == "breakfast":
+        max_safe_hours = 3 if storage == "room temp" else 18
+    elif meal_type in ["lunch", "dinner"]:
+        max_safe_hours = 7 if storage == "room temp" else 24
+    elif meal_type == "snacks":
+        max_safe_hours = 9 if storage == "room temp" else 36
+    if is_meat:
+        max_safe_hours -= 2
+    if is_dairy:
+        max_safe_hours -= 1
+    if is_fried:
+        max_safe_hours -= 1
+    if is_rice_based and storage == "room temp":
+        max_safe_hours -= 0.5
+    if hours_old > max_safe_hours:
+        return "Spoiled"
+    elif hours_old >= (max_safe_hours * 0.8):
+        return "Check Manually"
+    return "Good"
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return RuleEngine.from_file()
+
+
+def test_matches_legacy_rules_on_every_known_food(engine):
+    foods = load_food_items(DEFAULT_DATA_PATH)["text"].tolist()
+    cases = list(itertools.product(foods, ["breakfast", "lunch", "dinner", "snacks", "other"],
+                                   [0, 1.5, 2.4, 3, 4.5, 5.6, 7, 20, 30], ["room temp", "fridge"]))
+    expected = [legacy_assess(*case) for case in cases]
+    actual = engine.evaluate(*zip(*cases))
+    mismatches = [(case, want, got) for case, want, got in zip(cases, expected, actual) if want != got]
+    assert not mismatches, mismatches[:10]
+
+
+@pytest.mark.parametrize("food, categories", [
+    ("milkshake", {"dairy"}),
+    ("buttermilk", {"dairy"}),
+    ("cheesecake", {"dairy"}),
+    ("ice cream", {"dairy"}),
+    ("scrambled eggs", {"meat"}),
+    ("catfish curry", {"meat"}),
+    ("chicken fried rice", {"meat", "rice"}),
+    ("eggplant curry", set()),
+    ("veggie wrap", set()),
+    ("butternut squash soup", set()),
+])
+def test_keyword_categories(engine, food, categories):
+    flags = engine.category_flags([food])[0]
+    assert {category for category, flag in zip(engine.categories, flags) if flag} == categories
@@ -0,0 +1,113 @@
+"""Worker pool for CPU-bound image analysis, so the event loop only awaits it.
+
+CPU_POOL_KIND picks the executor: "thread" (default; NumPy and OpenCV release
+the GIL for most of the work) or "process" for pure-Python heavy code.
+CPU_POOL_SIZE defaults to the cores this process may run on. With several
+web workers per box, divide the cores between them.
+
+In process mode, arrays of at least SHARED_MEMORY_MIN_BYTES are copied once
+into a shared memory block. The worker maps that block instead of receiving
+a pickled copy through a pipe. Functions passed to ``run`` must be
+importable module-level functions (see image_features.py).
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from metrics import REGISTRY
+
+CPU_POOL_KIND = os.getenv("CPU_POOL_KIND", "thread")
+CPU_POOL_SIZE = int(os.getenv("CPU_POOL_SIZE", "0"))
+SHARED_MEMORY_MIN_BYTES = int(os.getenv("SHARED_MEMORY_MIN_BYTES", str(64 * 1024)))
+
+_pools = []
+REGISTRY.collect("foodloop_cpu_pool_tasks", "Image analysis tasks submitted and not yet finished", "gauge",
+                 ["kind"], lambda: {(pool.kind,): pool.pending for pool in _pools})
+
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _call_shared(fn: Callable, name: str, shape, dtype: str, args) -> Any:
+    """Runs in the worker process: map the block, call ``fn`` on it, unmap"""
+    # Pool workers share the parent's resource tracker, so only the parent's unlink is tracked
+    shm = SharedMemory(name=name)
+    try:
+        array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        array.flags.writeable = False
+        result = fn(array, *args)
+        del array
+        return result
+    finally:
+        shm.close()
+
+
+def _noop() -> None:
+    return None
+
+
+class CPUPool:
+    """``await pool.run(fn, array, *args)`` runs ``fn(array, *args)`` off the event loop"""
+
+    def __init__(self, kind: str = "thread", size: int = 0):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"CPU_POOL_KIND must be 'thread' or 'process', not {kind!r}")
+        self.kind = kind
+        self.size = size or available_cores()
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+        _pools.append(self)
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                # Not fork: the parent already runs event loop and executor threads
+                self._executor = ProcessPoolExecutor(self.size, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._executor = ThreadPoolExecutor(self.size, thread_name_prefix="cpu")
+        return self._executor
+
+    def warm_up(self):
+        """Start every worker now rather than on the first requests"""
+        for future in [self.executor.submit(_noop) for _ in range(self.size)]:
+            future.result()
+
+    async def run(self, fn: Callable, array: np.ndarray, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        try:
+            if self.kind == "thread" or array.nbytes < SHARED_MEMORY_MIN_BYTES:
+                return await loop.run_in_executor(self.executor, fn, array, *args)
+            shm = SharedMemory(create=True, size=array.nbytes)
+            try:
+                np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+                return await loop.run_in_executor(
+                    self.executor, _call_shared, fn, shm.name, array.shape, array.dtype.str, args
+                )
+            finally:
+                shm.close()
+                shm.unlink()
+        except BrokenExecutor:
+            # A worker died (e.g. OOM-killed); start a fresh pool for the next call
+            self._executor = None
+            raise
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+cpu_pool = CPUPool(CPU_POOL_KIND, CPU_POOL_SIZE)